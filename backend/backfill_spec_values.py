@@ -0,0 +1,49 @@
+"""Parse product specs into numeric spec_values for existing products.
+
+Usage:
+    python backfill_spec_values.py [--batch-size 500] [--pause 0.1] [--dry-run]
+
+Safe to run while the API is serving traffic, and safe to re-run.
+"""
+
+import os
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from utils.migrations import backfill_spec_values
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+
+async def main(args: argparse.Namespace) -> None:
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'), tz_aware=True)
+    db = client[os.environ.get('DB_NAME', 'jonesaica_db')]
+    try:
+        result = await backfill_spec_values(
+            db.products,
+            batch_size=args.batch_size,
+            pause=args.pause,
+            dry_run=args.dry_run,
+        )
+        print(f"products: updated={result['updated']}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true")
+    asyncio.run(main(parser.parse_args()))
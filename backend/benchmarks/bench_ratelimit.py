@@ -0,0 +1,102 @@
+"""Per-request overhead of the rate limiter.
+
+Usage (from backend/):
+    python benchmarks/bench_ratelimit.py [--iterations 200000] [--keys 10000]
+
+Times RateLimitMiddleware around a no-op ASGI app against the bare app,
+for requests it only looks at (GET, unlimited POST) and for limited POSTs
+checked by IP only and by IP plus body email. Also times a bare
+MemoryBucketStore.take across --keys distinct buckets. Budgets are set
+high enough that nothing is rejected, so every run measures the allow
+path. Results are nanoseconds per request, minus the bare app's cost.
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.ratelimit import (  # noqa: E402
+    MemoryBucketStore,
+    RateLimiter,
+    RateLimitMiddleware,
+    RouteLimit,
+    parse_rules,
+)
+
+BODY = b'{"name":"A","email":"someone@example.com","phone":"1","parish":"p","district":"d","interest":"solar"}'
+
+
+async def noop_app(scope, receive, send):
+    pass
+
+
+async def send(message):
+    pass
+
+
+def scope(method: str, path: str, host: str) -> dict:
+    return {"type": "http", "method": method, "path": path, "headers": [], "client": (host, 50000)}
+
+
+def receiver():
+    async def receive():
+        return {"type": "http.request", "body": BODY, "more_body": False}
+
+    return receive
+
+
+async def per_request(app, scopes: list[dict], iterations: int) -> float:
+    receive = receiver()
+    count = len(scopes)
+    started = time.perf_counter()
+    for i in range(iterations):
+        await app(scopes[i % count], receive, send)
+    return (time.perf_counter() - started) * 1e9 / iterations
+
+
+def bench_store(keys: int, iterations: int) -> float:
+    store = MemoryBucketStore()
+    names = [f"/api/leads|ip:1000000/s|10.0.{i // 256}.{i % 256}" for i in range(keys)]
+    take = store.take
+    started = time.perf_counter()
+    for i in range(iterations):
+        take(names[i % keys], 1e12, 1e12, i * 1e-6)
+    return (time.perf_counter() - started) * 1e9 / iterations
+
+
+async def main(iterations: int, keys: int) -> None:
+    limiter = RateLimiter(
+        {
+            "/api/ip-only": RouteLimit(parse_rules("ip:1000000000/s")),
+            "/api/leads": RouteLimit(parse_rules("ip:1000000000/s,email:1000000000/s"), "email"),
+        },
+        enabled=True,
+    )
+    middleware = RateLimitMiddleware(noop_app, limiter)
+    hosts = [f"10.0.{i // 256}.{i % 256}" for i in range(keys)]
+
+    baseline = await per_request(noop_app, [scope("GET", "/api/products", "10.0.0.1")], iterations)
+    cases = [
+        ("GET (not limited)", [scope("GET", "/api/products", "10.0.0.1")]),
+        ("POST (not limited)", [scope("POST", "/api/sizing", "10.0.0.1")]),
+        ("POST ip rule", [scope("POST", "/api/ip-only", host) for host in hosts]),
+        ("POST ip + email rules", [scope("POST", "/api/leads", host) for host in hosts]),
+    ]
+    print(f"{iterations} requests, {keys} client keys; bare app {baseline:.0f} ns/request")
+    print(f"{'case':<24} {'overhead ns':>12}")
+    print(f"{'store.take':<24} {bench_store(keys, iterations):>12.0f}")
+    for name, scopes in cases:
+        elapsed = await per_request(middleware, scopes, iterations)
+        print(f"{name:<24} {elapsed - baseline:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--keys", type=int, default=10000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.keys))
@@ -0,0 +1,115 @@
+"""Memory and serialization cost of ProductRecord vs per-request pydantic models.
+
+Usage (from backend/):
+    python benchmarks/bench_records.py [--skus 10000] [--iterations 20]
+
+Builds a catalog of --skus products from the seed data, round-tripped
+through BSON so every document owns its strings, as it would coming off
+the wire from Mongo. Then compares:
+
+  pydantic    Product models validated from the stored documents on each
+              request, then dumped (the Mongo fallback path)
+  dicts       Product(...).model_dump() dicts held by the store (the
+              previous in-memory representation)
+  records     interned, slotted ProductRecords held by the store, dumped
+              with orjson
+
+"retained" is what the representation keeps alive (for pydantic, what
+every full-catalog request allocates in models before dumping), and
+"peak/request" the peak allocation while serving one full-catalog
+response, both measured with tracemalloc.
+"""
+
+import sys
+import gc
+import time
+import uuid
+import argparse
+import tracemalloc
+from pathlib import Path
+from datetime import datetime, timezone
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import bson  # noqa: E402
+
+from server import Product, product_list_adapter  # noqa: E402
+from utils.records import ProductRecord, dump_records  # noqa: E402
+from utils.seed import DEFAULT_PRODUCTS  # noqa: E402
+from utils.specs import normalize_specs  # noqa: E402
+
+
+def build_documents(skus: int) -> list[dict]:
+    docs = []
+    for i in range(skus):
+        data = DEFAULT_PRODUCTS[i % len(DEFAULT_PRODUCTS)]
+        doc = Product(**data).model_dump()
+        doc["id"] = str(uuid.uuid4())
+        doc["name"] = f"{doc['name']} #{i}"
+        doc["category"] = doc["category"].value
+        doc["spec_values"] = normalize_specs(doc["specs"])
+        doc["created_at"] = datetime.now(timezone.utc)
+        docs.append(bson.decode(bson.encode(doc), codec_options=bson.CodecOptions(tz_aware=True)))
+    return docs
+
+
+def measure(build) -> tuple[object, int]:
+    """Return build()'s result and the bytes it keeps alive."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    value = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return value, retained
+
+
+def per_request(fn, iterations: int) -> tuple[bytes, float, int]:
+    body = fn()
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return body, (time.perf_counter() - started) * 1000 / iterations, peak
+
+
+def main(skus: int, iterations: int) -> None:
+    docs = build_documents(skus)
+
+    models, models_retained = measure(lambda: product_list_adapter.validate_python(docs))
+    del models
+    dicts, dicts_retained = measure(lambda: [Product(**doc).model_dump() for doc in docs])
+    del dicts
+    records, records_retained = measure(lambda: [ProductRecord.from_product(Product(**doc).model_dump()) for doc in docs])
+
+    def pydantic_path():
+        return product_list_adapter.dump_json(product_list_adapter.validate_python(docs))
+
+    pydantic_body, pydantic_ms, pydantic_peak = per_request(pydantic_path, iterations)
+    records_body, records_ms, records_peak = per_request(lambda: dump_records(records), iterations)
+    assert pydantic_body == records_body, "records must serialize exactly like Product"
+
+    print(f"{skus} SKUs, {len(records_body) / 1e6:.1f} MB response")
+    print(f"{'representation':<15} {'retained MB':>12} {'B/SKU':>7} {'peak/request MB':>16} {'ms/request':>11}")
+    print(
+        f"{'pydantic':<15} {models_retained / 1e6:>12.1f} {models_retained // skus:>7} "
+        f"{pydantic_peak / 1e6:>16.1f} {pydantic_ms:>11.1f}"
+    )
+    print(f"{'dicts':<15} {dicts_retained / 1e6:>12.1f} {dicts_retained // skus:>7} {'-':>16} {'-':>11}")
+    print(
+        f"{'records':<15} {records_retained / 1e6:>12.1f} {records_retained // skus:>7} "
+        f"{records_peak / 1e6:>16.1f} {records_ms:>11.1f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--skus", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    main(args.skus, args.iterations)
@@ -0,0 +1,93 @@
+"""Serialization and compression cost of the product catalog response.
+
+Usage (from backend/):
+    python benchmarks/bench_serialization.py [--iterations 200]
+
+Compares the old path (pydantic validation + jsonable_encoder + stdlib
+json, what FastAPI does by default), pydantic's own dump_json, and raw
+orjson on the stored documents, for the seeded catalog scaled 1x/10x/100x.
+Reports bytes on the wire for identity, gzip and brotli encodings.
+"""
+
+import sys
+import gzip
+import json
+import time
+import uuid
+import argparse
+from pathlib import Path
+from datetime import datetime, timezone
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import orjson  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from server import Product, product_list_adapter  # noqa: E402
+from utils.seed import DEFAULT_PRODUCTS  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def build_catalog(scale: int) -> list[dict]:
+    docs = []
+    for i in range(scale):
+        for data in DEFAULT_PRODUCTS:
+            doc = Product(**data).model_dump()
+            doc["id"] = str(uuid.uuid4())
+            doc["name"] = f"{doc['name']} #{i}" if i else doc["name"]
+            doc["created_at"] = datetime.now(timezone.utc)
+            docs.append(doc)
+    return docs
+
+
+def fastapi_default(docs):
+    models = product_list_adapter.validate_python(docs)
+    return json.dumps(jsonable_encoder(models)).encode()
+
+
+def pydantic_dump(docs):
+    return product_list_adapter.dump_json(product_list_adapter.validate_python(docs))
+
+
+def orjson_trusted(docs):
+    return orjson.dumps(docs)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def bench(fn, docs, iterations: int) -> tuple[bytes, list[float]]:
+    body = fn(docs)
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn(docs)
+        samples.append((time.perf_counter() - started) * 1000)
+    return body, samples
+
+
+def main(iterations: int) -> None:
+    print(f"{'scale':>5} {'products':>8} {'serializer':<16} {'p50 ms':>8} {'p99 ms':>8} {'raw B':>9} {'gzip B':>8} {'br B':>8}")
+    for scale in (1, 10, 100):
+        docs = build_catalog(scale)
+        runs = max(10, iterations // scale)
+        for name, fn in (("fastapi-default", fastapi_default), ("pydantic-json", pydantic_dump), ("orjson-trusted", orjson_trusted)):
+            body, samples = bench(fn, docs, runs)
+            gz = len(gzip.compress(body, compresslevel=9))
+            br = len(brotli.compress(body, quality=4)) if brotli else "-"
+            print(
+                f"{scale:>5} {len(docs):>8} {name:<16} {percentile(samples, 0.5):>8.3f} "
+                f"{percentile(samples, 0.99):>8.3f} {len(body):>9} {gz:>8} {br:>8}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    main(parser.parse_args().iterations)
@@ -0,0 +1,65 @@
+"""Latency of the /api/sizing bundle search as the catalog grows.
+
+Usage (from backend/):
+    python benchmarks/bench_sizing.py [--iterations 200]
+
+Builds synthetic catalogs with N inverters, N batteries and N panels and
+times SizingCatalog.recommend() with a warm array cache.
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.sizing import SizingCatalog  # noqa: E402
+from utils.specs import normalize_specs  # noqa: E402
+
+
+def synthetic_catalog(n: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    products = []
+
+    def add(category: str, specs: dict, price: float):
+        products.append({
+            "id": f"{category}-{len(products)}",
+            "name": f"{category} {len(products)}",
+            "category": category,
+            "sale_price": price,
+            "in_stock": True,
+            "backorder": False,
+            "spec_values": normalize_specs(specs),
+        })
+
+    for _ in range(n):
+        kw = rng.choice([3, 5, 6, 8, 10, 12, 15, 20])
+        add("inverters", {"power": f"{kw}kW", "max_pv_input": f"{kw * 1.3:.1f}kW"}, kw * rng.uniform(28000, 45000))
+        kwh = rng.choice([2.4, 5.12, 10.24, 12, 15, 16])
+        add("batteries", {"capacity": f"{kwh}kWh"}, kwh * rng.uniform(30000, 50000))
+        watts = rng.choice([330, 400, 450, 545, 600, 625])
+        add("panels", {"power": f"{watts}W"}, watts * rng.uniform(35, 55))
+    return products
+
+
+def main(iterations: int) -> None:
+    print(f"{'SKUs/cat':>8} {'combos':>12} {'p50 ms':>8} {'p99 ms':>8}")
+    for n in (10, 50, 100, 200, 400):
+        catalog = SizingCatalog()
+        catalog.rebuild(synthetic_catalog(n))
+        catalog.arrays()
+        samples = []
+        for i in range(iterations):
+            started = time.perf_counter()
+            catalog.recommend(daily_kwh=10 + i % 30, autonomy_hours=12, budget=3_000_000, top_k=5)
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        print(f"{n:>8} {n ** 3:>12} {samples[len(samples) // 2]:>8.3f} {samples[int(len(samples) * 0.99)]:>8.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    main(parser.parse_args().iterations)
@@ -0,0 +1,96 @@
+"""Render cost of the order notification emails.
+
+Usage (from backend/):
+    python benchmarks/bench_templates.py [--iterations 20000] [--items 5]
+
+Compares the old inline f-string bodies (item list built once, two
+near-identical bodies, no escaping) against the compiled, autoescaping
+templates in utils/templates.py, per order (admin + customer email).
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.templates import TemplateRegistry, EMAIL_TEMPLATES  # noqa: E402
+
+
+def build_order(n_items: int) -> dict:
+    return {
+        "customer_name": "Jane <Doe>",
+        "customer_email": "jane@example.com",
+        "customer_phone": "876-555-0100",
+        "items": [
+            {"product_id": f"p{i}", "name": f"Deye 8kW Hybrid Inverter & Kit {i}", "quantity": i + 1, "price": 1299.0}
+            for i in range(n_items)
+        ],
+        "total": 1299.0 * sum(range(1, n_items + 1)),
+    }
+
+
+def fstring_bodies(order: dict) -> tuple[str, str]:
+    items_html = "".join(
+        f"<li>{item['quantity']} × {item['name']} — ${item['price']}</li>"
+        for item in order["items"]
+    )
+    admin_body = f"""
+    <h2>🛒 New Order Received</h2>
+    <p><strong>Name:</strong> {order['customer_name']}</p>
+    <p><strong>Email:</strong> {order['customer_email']}</p>
+    <p><strong>Phone:</strong> {order['customer_phone'] or "N/A"}</p>
+    <p><strong>Items:</strong></p>
+    <ul>{items_html}</ul>
+    <p><strong>Total:</strong> ${order['total']}</p>
+    """
+    customer_body = f"""
+    <h2>Thank you for your order!</h2>
+    <p>Hi {order['customer_name']},</p>
+    <p>We’ve received your order and will contact you shortly.</p>
+
+    <p><strong>Your Order:</strong></p>
+    <ul>{items_html}</ul>
+
+    <p><strong>Total:</strong> ${order['total']}</p>
+    """
+    return admin_body, customer_body
+
+
+def template_bodies(registry: TemplateRegistry, order: dict) -> tuple[str, str]:
+    context = {"order": order}
+    return registry.render("order_admin", context)[1], registry.render("order_customer", context)[1]
+
+
+def time_it(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--items", type=int, default=5)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    registry = TemplateRegistry(EMAIL_TEMPLATES)
+    registry.compile()
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    order = build_order(args.items)
+    fstring_us = time_it(lambda: fstring_bodies(order), args.iterations)
+    template_us = time_it(lambda: template_bodies(registry, order), args.iterations)
+
+    print(f"compile all templates: {compile_ms:.3f} ms (once per process)")
+    print(f"{'approach':<22}{'us/order':>10}")
+    print(f"{'inline f-strings':<22}{fstring_us:>10.2f}")
+    print(f"{'compiled templates':<22}{template_us:>10.2f}")
+    print(f"escaping/lookup overhead: {template_us - fstring_us:.2f} us per order ({args.items} items)")
+
+
+if __name__ == "__main__":
+    main()
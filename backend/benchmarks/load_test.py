@@ -0,0 +1,128 @@
+"""Throughput of the API under gunicorn as the worker count grows.
+
+Usage (from backend/, with MONGO_URL pointing at a seeded database):
+    python benchmarks/load_test.py [--workers 1 2 4] [--duration 10]
+        [--concurrency 64] [--path /api/products]
+
+For each worker count, starts `gunicorn server:app -c gunicorn.conf.py`
+on a local port, waits for readiness, then drives it with --concurrency
+keep-alive clients for --duration seconds and reports requests/s and
+latency percentiles. The load generator runs in this process, so on small
+machines it competes with the workers for CPU; read the scaling ratio, not
+the absolute numbers.
+"""
+
+import os
+import sys
+import time
+import signal
+import asyncio
+import argparse
+import subprocess
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "PORT": str(port), "GUNICORN_LOG_LEVEL": "warning"}
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "server:app", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        start_new_session=True,
+    )
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+async def wait_ready(base_url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/api/health/live")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not come up")
+
+
+async def drive(base_url: str, path: str, concurrency: int, duration: float) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        # Warm every worker's caches before measuring.
+        await asyncio.gather(*(client.get(path) for _ in range(concurrency * 2)))
+        deadline = time.monotonic() + duration
+
+        async def user():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path, headers={"Accept-Encoding": "identity"})
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.monotonic()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--path", default="/api/products")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    print(f"GET {args.path}, {args.concurrency} clients, {args.duration:.0f}s per run")
+    print(f"{'workers':>7} {'req/s':>9} {'scaling':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    baseline = None
+    for workers in args.workers:
+        process = start_server(workers, args.port)
+        try:
+            asyncio.run(wait_ready(base_url))
+            result = asyncio.run(drive(base_url, args.path, args.concurrency, args.duration))
+        finally:
+            stop_server(process)
+        baseline = baseline or result["rps"]
+        print(
+            f"{workers:>7} {result['rps']:>9.0f} {result['rps'] / baseline:>7.2f}x "
+            f"{result['p50']:>8.2f} {result['p99']:>8.2f} {result['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# Multi-worker mode: gunicorn supervises N uvicorn workers, one per core.
+# Each worker has its own Mongo pool, caches and in-memory indexes; catalog
+# writes reach the other workers through utils/catalog_sync.py.
+#
+#   gunicorn server:app -c gunicorn.conf.py
+#
+# WEB_CONCURRENCY overrides the worker count (set it to 1 for the old
+# single-process behaviour, or higher to scale past DEFAULT_WORKERS).
+#
+# /metrics is merged across workers through METRICS_DIR (see
+# utils/metrics.py), so any worker can answer a scrape.
+import os
+import glob
+import math
+import tempfile
+
+# Without WEB_CONCURRENCY, at most this many workers: every worker holds its
+# own copy of the catalog and indexes, so memory, not CPU, is usually what
+# runs out first on small containers.
+DEFAULT_WORKERS = int(os.getenv("GUNICORN_DEFAULT_WORKERS", "2"))
+
+
+def _cgroup_cpus():
+    """CPU quota of this container, or None when it has none."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>".
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1: a quota of -1 means unlimited.
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def _cpu_count() -> int:
+    try:
+        # Respects CPU pinning (taskset, container cpusets), but in most
+        # containers still reports every host core.
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_cpus()
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8001')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+# Async workers keep a core busy on their own, so one per core rather than
+# gunicorn's usual 2 * cores + 1.
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(_cpu_count(), DEFAULT_WORKERS))))
+
+# Rate limiting (utils/ratelimit.py) defaults for this deployment, set in
+# the master so every worker inherits them; explicit env vars win.
+#
+# Railway (like the Docker/Procfile setups) puts one proxy in front that
+# appends the client address to X-Forwarded-For; without trusting that
+# hop every user shares the proxy's IP bucket. Set RATE_LIMIT_PROXY_HOPS=0
+# if the port is ever exposed directly, or clients can pick their own IP.
+# (forwarded_allow_ips="*" is no substitute: uvicorn then takes the
+# left-most, client-supplied address.)
+os.environ.setdefault("RATE_LIMIT_PROXY_HOPS", "1")
+# In-memory buckets are per worker, so N workers would allow N times each
+# budget; share them through Mongo instead.
+if workers > 1:
+    os.environ.setdefault("RATE_LIMIT_STORE", "mongo")
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Recycle workers now and then to cap slow leaks; jitter so they don't all
+# restart together.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+
+# Not preloaded: Motor clients and asyncio state must be created inside
+# each worker, after the fork.
+preload_app = False
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+# Set here, in the master, so every forked worker inherits it.
+os.environ.setdefault("METRICS_DIR", tempfile.mkdtemp(prefix="metrics-"))
+
+
+def on_starting(server):
+    # Samples left by a previous run would be counted again.
+    for path in glob.glob(os.path.join(os.environ["METRICS_DIR"], "*.json")):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from utils.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid, os.environ["METRICS_DIR"])
@@ -1,29 +1,72 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, File, Header, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.middleware.gzip import GZipMiddleware
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, TypeAdapter, ValidationError
 from typing import List, Optional
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from utils.mailer import send_email
-from enum import Enum
-from fastapi.middleware.cors import CORSMiddleware
 
 ROOT_DIR = Path(__file__).parent
+# Before the utils imports: they read their settings at import time.
 load_dotenv(ROOT_DIR / '.env')
 
-mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'jonesaica_db')]
+from utils.auth import is_admin
+from utils.database import close_database, open_database
+from utils.mailer import open_http_client, close_http_client
+from utils.catalog_cache import catalog_cache, catalog_response
+from utils.catalog_store import catalog_store
+from utils.catalog_sync import catalog_sync
+from utils.export import EXPORT_FORMATS, created_at_filter, csv_rows, iter_documents, ndjson_rows
+from utils.health import DependencyCheck, check_mail_config, readiness
+from utils.idempotency import idempotency_store
+from utils.indexes import ensure_indexes, index_usage_report
+from utils.metrics import CONTENT_TYPE, MetricsMiddleware, metrics
+from utils.outbox import email_message, outbox
+from utils.seed import default_seed_data, is_seeded_with, parse_seed_data, record_seed, replace_catalog
+from utils.search import FACET_KEYS, SORTS, search_index
+from utils.pricing import price_order
+from utils.ratelimit import RateLimitMiddleware, rate_limiter
+from utils.records import ProductRecord, dump_records
+from utils.serialization import dump_documents, dump_raw
+from utils.sizing import DEFAULT_SUN_HOURS, sizing_catalog
+from utils.specs import normalize_specs, parse_spec, spec_index
+from utils.templates import email_templates
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page, page_response, parse_fields
+from enum import Enum
+from fastapi.middleware.cors import CORSMiddleware
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+# Bound by startup() (open_database) and released by shutdown().
+client = None
+db = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup()
+    try:
+        yield
+    finally:
+        await shutdown()
+
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 
 
+# Inside CORS, so browsers can read the 429 and its Retry-After.
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -36,8 +79,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified", "Idempotent-Replayed", "Retry-After"],
 )
 
+# Brotli when the client accepts it (with gzip fallback), plain gzip when
+# brotli-asgi isn't installed. Small bodies aren't worth compressing.
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MIN_SIZE, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+# Outermost, so latency includes compression and CORS handling.
+app.add_middleware(MetricsMiddleware)
+
 
 # Health check endpoint for Railway/deployment
 @api_router.get("/health")
@@ -45,6 +100,32 @@ async def health_check():
     return {"status": "healthy", "service": "jonesaica-backend"}
 
 
+# Liveness: the process is up and serving. Never touches dependencies, so a
+# database outage doesn't get the container restarted.
+@api_router.get("/health/live")
+async def health_live():
+    return {"status": "alive", "service": "jonesaica-backend"}
+
+
+async def ping_mongo():
+    await db.command("ping")
+
+
+health_checks = [
+    DependencyCheck("mongodb", ping_mongo),
+    # Mail goes through the outbox, so a bad config delays emails but
+    # doesn't stop the API from serving.
+    DependencyCheck("mail", check_mail_config, critical=False),
+]
+
+
+# Readiness: dependencies reachable, safe to route traffic here.
+@api_router.get("/health/ready")
+async def health_ready():
+    ready, report = await readiness(health_checks)
+    return ORJSONResponse(report, status_code=200 if ready else 503)
+
+
 class InterestType(str, Enum):
     SOLAR = "solar"
     PLUMBING = "plumbing"
@@ -75,6 +156,9 @@ class Lead(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+lead_list_adapter = TypeAdapter(List[Lead])
+
+
 class LeadCreate(BaseModel):
     name: str
     email: EmailStr
@@ -95,12 +179,17 @@ class Product(BaseModel):
     sale_price: float
     image_url: str
     specs: Optional[dict] = None
+    spec_values: Optional[dict] = None
     features: Optional[List[str]] = None
     in_stock: bool = True
     backorder: bool = False
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+product_adapter = TypeAdapter(Product)
+product_list_adapter = TypeAdapter(List[Product])
+
+
 class ProductCreate(BaseModel):
     name: str
     category: ProductCategory
@@ -129,6 +218,9 @@ class QuoteRequest(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+quote_list_adapter = TypeAdapter(List[QuoteRequest])
+
+
 class QuoteRequestCreate(BaseModel):
     name: str
     email: EmailStr
@@ -143,7 +235,7 @@ class QuoteRequestCreate(BaseModel):
 class OrderItem(BaseModel):
     product_id: str
     name: str
-    quantity: int
+    quantity: int = Field(gt=0, le=1000)
     price: float
 
 
@@ -151,7 +243,7 @@ class OrderCreate(BaseModel):
     customer_name: str
     customer_email: EmailStr
     customer_phone: Optional[str] = None
-    items: List[OrderItem]
+    items: List[OrderItem] = Field(min_length=1)
     total: float
     shipping_parish: Optional[str] = None
     shipping_district: Optional[str] = None
@@ -169,568 +261,411 @@ class Order(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+class SizingRequest(BaseModel):
+    daily_kwh: float = Field(gt=0, le=1000)
+    autonomy_hours: float = Field(default=12, ge=0, le=168)
+    budget: Optional[float] = Field(default=None, gt=0)
+    peak_kw: Optional[float] = Field(default=None, gt=0)
+    sun_hours: float = Field(default=DEFAULT_SUN_HOURS, gt=0, le=12)
+    top_k: int = Field(default=5, ge=1, le=20)
+
+
 @api_router.get("/")
 async def root():
     return {"message": "Jonesaica Infrastructure Solutions API"}
 
 
 @api_router.post("/leads", response_model=Lead)
-async def create_lead(input: LeadCreate):
+async def create_lead(
+    input: LeadCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    return await idempotency_store.run(db, "leads", idempotency_key, input, lambda: record_lead(input))
+
+
+async def record_lead(input: LeadCreate) -> Lead:
     lead_dict = input.model_dump()
     lead_obj = Lead(**lead_dict)
 
     doc = lead_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    await db.leads.insert_one(doc)
 
     admin_email = os.getenv("ADMIN_EMAIL")
+    context = {"lead": {**lead_obj.model_dump(mode="json"), "specific_needs": lead_obj.specific_needs or "N/A"}}
 
-    email_body = f"""
-    <h2>New Website Inquiry</h2>
-    <p><strong>Name:</strong> {lead_obj.name}</p>
-    <p><strong>Email:</strong> {lead_obj.email}</p>
-    <p><strong>Phone:</strong> {lead_obj.phone}</p>
-    <p><strong>Parish:</strong> {lead_obj.parish}</p>
-    <p><strong>District:</strong> {lead_obj.district}</p>
-    <p><strong>Interest:</strong> {lead_obj.interest}</p>
-    <p><strong>Details:</strong><br>{lead_obj.specific_needs or "N/A"}</p>
-    """
-
-    logger.info("📩 Lead endpoint hit — attempting email send")
-
+    messages = []
     if not admin_email:
         logger.error("ADMIN_EMAIL is not set — skipping lead email send")
     else:
-        try:
-            await send_email(
-                subject="New Website Inquiry",
-                recipients=[admin_email],
-                body=email_body,
-            )
-        except Exception as e:
-            logger.error(f"Lead email failed: {e}")
+        messages.append(email_message("lead_admin", [admin_email], context))
 
+    await outbox.insert(client, db, "leads", doc, messages)
     return lead_obj
 
 
 @api_router.get("/leads", response_model=List[Lead])
-async def get_leads():
-    leads = await db.leads.find({}, {"_id": 0}).to_list(1000)
-    for lead in leads:
-        if isinstance(lead.get('created_at'), str):
-            lead['created_at'] = datetime.fromisoformat(lead['created_at'])
-    return leads
+async def get_leads(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    projection = parse_fields(fields, Lead.model_fields)
+    leads, next_cursor = await fetch_page(db.leads, {}, limit, after, projection)
+    return page_response(leads, next_cursor, None if projection else lead_list_adapter)
 
 
 @api_router.post("/products", response_model=Product)
 async def create_product(input: ProductCreate):
     product_dict = input.model_dump()
-    product_obj = Product(**product_dict)
+    product_obj = Product(**product_dict, spec_values=normalize_specs(input.specs))
     doc = product_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.products.insert_one(doc)
+    # Visible to this worker's reads straight away; other workers get it
+    # from the change stream (or catalog_sync on a standalone server).
+    catalog_store.upsert(doc)
+    await catalog_sync.bump(db)
     return product_obj
 
 
 @api_router.get("/products", response_model=List[Product])
-async def get_products(category: Optional[ProductCategory] = None):
-    query = {}
-    if category:
-        query["category"] = category.value
-    products = await db.products.find(query, {"_id": 0}).to_list(1000)
-    for product in products:
-        if isinstance(product.get('created_at'), str):
-            product['created_at'] = datetime.fromisoformat(product['created_at'])
-    return products
+async def get_products(
+    request: Request,
+    category: Optional[ProductCategory] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    # Paged or projected reads go straight to Mongo; the plain catalog
+    # listing is what the storefront hits and is served from the cache.
+    if limit or after or fields:
+        query = {"category": category.value} if category else {}
+        projection = parse_fields(fields, Product.model_fields)
+        products, next_cursor = await fetch_page(
+            db.products, query, limit or DEFAULT_PAGE_SIZE, after, projection
+        )
+        return page_response(products, next_cursor, None if projection else product_list_adapter)
+
+    cache_key = category.value if category else "all"
+    cached = catalog_cache.get(cache_key)
+    if cached is None:
+        version = catalog_cache.version
+        if catalog_store.loaded:
+            # Records were validated when they were built; dump them as is.
+            body = dump_records(catalog_store.products(category.value if category else None))
+        else:
+            query = {"category": category.value} if category else {}
+            products = await db.products.find(query, {"_id": 0}).to_list(None)
+            body = dump_documents(products, product_list_adapter)
+        cached = catalog_cache.set(cache_key, body, version)
+    return catalog_response(request, cached)
+
+
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    return {"catalog": catalog_cache.stats(), "store": catalog_store.stats()}
+
+
+metrics.callback("catalog_cache_hits_total", "Catalog cache hits.", lambda: catalog_cache.hits, "counter")
+metrics.callback("catalog_cache_misses_total", "Catalog cache misses.", lambda: catalog_cache.misses, "counter")
+metrics.callback(
+    "catalog_cache_hit_ratio", "Catalog cache hit ratio (mean across workers).",
+    lambda: catalog_cache.stats()["hit_ratio"], aggregate="live_mean",
+)
+metrics.callback(
+    "idempotency_replays_total", "Requests answered from a stored Idempotency-Key.",
+    lambda: idempotency_store.replays, "counter",
+)
+metrics.callback(
+    "catalog_remote_changes_total", "Catalog refreshes triggered by other workers.",
+    lambda: catalog_sync.remote_changes, "counter",
+)
+metrics.callback("outbox_sent_total", "Outbox emails delivered.", lambda: outbox.sent, "counter")
+metrics.callback("outbox_dead_total", "Outbox emails dead-lettered.", lambda: outbox.dead, "counter")
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+
+@api_router.get("/outbox/stats")
+async def get_outbox_stats():
+    return await outbox.stats(db)
+
+
+@api_router.get("/rate-limit/stats")
+async def get_rate_limit_stats():
+    return rate_limiter.stats()
+
+
+@api_router.get("/indexes/stats")
+async def get_index_stats():
+    return await index_usage_report(db)
+
+
+@api_router.get("/products/search")
+async def search_products(
+    q: Optional[str] = None,
+    category: Optional[ProductCategory] = None,
+    power: Optional[str] = None,
+    capacity: Optional[str] = None,
+    chemistry: Optional[str] = None,
+    mount: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: Optional[bool] = None,
+    backorder: Optional[bool] = None,
+    sort: str = "relevance",
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    if sort not in SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(SORTS)}")
+    spec_filters = {"power": power, "capacity": capacity, "chemistry": chemistry, "mount": mount}
+    result = search_index.search(
+        q=q,
+        category=category.value if category else None,
+        facets={key: spec_filters[key] for key in FACET_KEYS if spec_filters[key]},
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        backorder=backorder,
+        sort=sort,
+        limit=limit,
+        offset=offset,
+    )
+    # Items are ProductRecords; dumped like /products so datetimes match.
+    return Response(dump_raw(result), media_type="application/json")
+
+
+def _compare_unit(spec: str, bounds: list[Optional[str]]) -> str:
+    # The unit written on the bounds picks which of the spec's units to
+    # compare in ("100Ah" vs "5kWh"); bare numbers use the spec's usual unit.
+    units = set()
+    for value in bounds:
+        parsed = parse_spec(value) if value is not None else None
+        if value is not None and parsed is None:
+            raise HTTPException(status_code=400, detail=f"Could not parse '{value}'")
+        if parsed and parsed["unit"]:
+            units.add(parsed["unit"])
+    if not units:
+        return spec_index.unit(spec)
+    known = spec_index.units(spec)
+    if len(units) > 1 or not units <= set(known):
+        raise HTTPException(status_code=400, detail=f"'{spec}' is given in {', '.join(known)}")
+    return units.pop()
+
+
+def _spec_bound(value: Optional[str]) -> Optional[float]:
+    return parse_spec(value)["value"] if value is not None else None
+
+
+@api_router.get("/products/compare")
+async def compare_products(
+    spec: str,
+    min: Optional[str] = None,
+    max: Optional[str] = None,
+    near: Optional[str] = None,
+    category: Optional[ProductCategory] = None,
+    limit: int = Query(20, ge=1, le=100),
+):
+    if spec_index.unit(spec) is None:
+        raise HTTPException(status_code=404, detail=f"No numeric spec '{spec}'. Known: {', '.join(spec_index.keys())}")
+    unit = _compare_unit(spec, [min, max, near])
+
+    if near is not None:
+        # Over-fetch when filtering by category so the top matches survive.
+        matches = spec_index.nearest(spec, _spec_bound(near), limit * 4 if category else limit, unit)
+    else:
+        matches = spec_index.range(spec, _spec_bound(min), _spec_bound(max), unit)
+
+    items = []
+    for product_id, value in matches:
+        product = search_index.get(product_id)
+        if product is None or (category and product["category"] != category.value):
+            continue
+        items.append(product)
+        if len(items) >= limit:
+            break
+    return Response(dump_raw({"spec": spec, "unit": unit, "items": items}), media_type="application/json")
 
 
 @api_router.get("/products/{product_id}", response_model=Product)
-async def get_product(product_id: str):
-    product = await db.products.find_one({"id": product_id}, {"_id": 0})
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    if isinstance(product.get('created_at'), str):
-        product['created_at'] = datetime.fromisoformat(product['created_at'])
-    return product
+async def get_product(request: Request, product_id: str):
+    cache_key = f"product:{product_id}"
+    cached = catalog_cache.get(cache_key)
+    if cached is None:
+        version = catalog_cache.version
+        record = catalog_store.get(product_id)
+        if record is not None:
+            body = dump_records(record)
+        else:
+            # Not loaded yet, or written by another worker a moment ago.
+            product = await db.products.find_one({"id": product_id}, {"_id": 0})
+            if not product:
+                raise HTTPException(status_code=404, detail="Product not found")
+            body = dump_documents(product, product_adapter)
+        cached = catalog_cache.set(cache_key, body, version)
+    return catalog_response(request, cached)
 
 
 @api_router.post("/quotes", response_model=QuoteRequest)
-async def create_quote(input: QuoteRequestCreate):
+async def create_quote(
+    input: QuoteRequestCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    return await idempotency_store.run(db, "quotes", idempotency_key, input, lambda: record_quote(input))
+
+
+async def record_quote(input: QuoteRequestCreate) -> QuoteRequest:
     quote_dict = input.model_dump()
     quote_obj = QuoteRequest(**quote_dict)
 
     doc = quote_obj.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
-    await db.quotes.insert_one(doc)
 
     # 🔔 EMAIL NOTIFICATION (ADMIN)
     admin_email = os.getenv("ADMIN_EMAIL")
-
-    product_list = "<br>".join(quote_obj.products) if quote_obj.products else "N/A"
-
-    email_body = f"""
-    <h2>New Quote Request</h2>
-    <p><strong>Name:</strong> {quote_obj.name}</p>
-    <p><strong>Email:</strong> {quote_obj.email}</p>
-    <p><strong>Phone:</strong> {quote_obj.phone}</p>
-    <p><strong>Parish:</strong> {quote_obj.parish}</p>
-    <p><strong>District:</strong> {quote_obj.district}</p>
-    <p><strong>Interest:</strong> {quote_obj.interest}</p>
-    <p><strong>Products:</strong><br>{product_list}</p>
-    <p><strong>Details:</strong><br>{quote_obj.specific_needs or "N/A"}</p>
-    """
-
+    context = {
+        "quote": {
+            **quote_obj.model_dump(mode="json"),
+            "products": [{"name": name} for name in quote_obj.products or ["N/A"]],
+            "specific_needs": quote_obj.specific_needs or "N/A",
+        }
+    }
+
+    messages = []
     if not admin_email:
         logger.error("ADMIN_EMAIL is not set — skipping quote email send")
     else:
-        try:
-            await send_email(
-                subject="New Quote Request",
-                recipients=[admin_email],
-                body=email_body,
-            )
-        except Exception as e:
-            logger.error(f"Quote email failed: {e}")
+        messages.append(email_message("quote_admin", [admin_email], context))
 
+    await outbox.insert(client, db, "quotes", doc, messages)
     return quote_obj
  
 
 @api_router.get("/quotes", response_model=List[QuoteRequest])
-async def get_quotes():
-    quotes = await db.quotes.find({}, {"_id": 0}).to_list(1000)
-    for quote in quotes:
-        if isinstance(quote.get('created_at'), str):
-            quote['created_at'] = datetime.fromisoformat(quote['created_at'])
-    return quotes
+async def get_quotes(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    projection = parse_fields(fields, QuoteRequest.model_fields)
+    quotes, next_cursor = await fetch_page(db.quotes, {}, limit, after, projection)
+    return page_response(quotes, next_cursor, None if projection else quote_list_adapter)
 
 
 @api_router.post("/orders", response_model=Order)
-async def create_order(input: OrderCreate):
-    order = Order(**input.model_dump())
+async def create_order(
+    input: OrderCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    return await idempotency_store.run(db, "orders", idempotency_key, input, lambda: record_order(input))
 
-    doc = order.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
-    await db.orders.insert_one(doc)
 
-    admin_email = os.getenv("ADMIN_EMAIL")
+async def record_order(input: OrderCreate) -> Order:
+    items, total = await price_order(db, input.items, input.total)
+    order = Order(**{**input.model_dump(), "items": items, "total": total})
 
-    # Build item list
-    items_html = "".join(
-        f"<li>{item.quantity} × {item.name} — ${item.price}</li>"
-        for item in order.items
-    )
+    doc = order.model_dump()
 
-    # 🔔 ADMIN EMAIL
-    admin_body = f"""
-    <h2>🛒 New Order Received</h2>
-    <p><strong>Name:</strong> {order.customer_name}</p>
-    <p><strong>Email:</strong> {order.customer_email}</p>
-    <p><strong>Phone:</strong> {order.customer_phone or "N/A"}</p>
-    <p><strong>Items:</strong></p>
-    <ul>{items_html}</ul>
-    <p><strong>Total:</strong> ${order.total}</p>
-    """
+    admin_email = os.getenv("ADMIN_EMAIL")
+    context = {"order": {**order.model_dump(mode="json"), "customer_phone": order.customer_phone or "N/A"}}
 
+    messages = []
     if not admin_email:
         logger.error("ADMIN_EMAIL is not set — skipping admin order email")
     else:
+        messages.append(email_message("order_admin", [admin_email], context))
+
+    # 📩 CUSTOMER CONFIRMATION EMAIL
+    messages.append(email_message("order_customer", [order.customer_email], context))
+
+    await outbox.insert(client, db, "orders", doc, messages)
+    return order
+
+
+@api_router.post("/sizing")
+async def size_system(input: SizingRequest):
+    return ORJSONResponse(sizing_catalog.recommend(**input.model_dump()))
+
+
+EXPORT_MODELS = {
+    "leads": Lead,
+    "quotes": QuoteRequest,
+    "orders": Order,
+}
+
+
+@api_router.get("/export/{collection}")
+async def export_collection(
+    collection: str,
+    format: str = "ndjson",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    authorization: Optional[str] = Header(None),
+):
+    # Every customer's contact details and address.
+    if not is_admin(authorization):
+        raise HTTPException(status_code=401, detail="Exports require an admin token")
+    model = EXPORT_MODELS.get(collection)
+    if model is None:
+        raise HTTPException(status_code=404, detail="Unknown export collection")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    docs = iter_documents(db[collection], created_at_filter(since, until))
+    rows = csv_rows(docs, model.model_fields) if format == "csv" else ndjson_rows(docs)
+    return StreamingResponse(
+        rows,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{collection}.{format}"'},
+    )
+
+
+@api_router.post("/seed-products")
+async def seed_products(
+    file: Optional[UploadFile] = File(None),
+    authorization: Optional[str] = Header(None),
+):
+    # Uploads and reseeds replace every product and price (which orders are
+    # charged at), so they need the admin token. Without it, the built-in
+    # catalog is only loaded into an empty database (first deploy).
+    if not is_admin(authorization):
+        if file is not None:
+            raise HTTPException(status_code=401, detail="Catalog uploads require an admin token")
+        if await db.products.find_one({}, {"_id": 1}) is not None:
+            return {"message": "Catalog already seeded"}
+
+    if file is not None:
+        fmt = Path(file.filename or "").suffix.lstrip(".").lower()
         try:
-            await send_email(
-                subject="New Order Received",
-                recipients=[admin_email],
-                body=admin_body,
-            )
-        except Exception as e:
-            logger.error(f"Admin order email failed: {e}")
-
-     # 📩 CUSTOMER CONFIRMATION EMAIL
-    customer_body = f"""
-    <h2>Thank you for your order!</h2>
-    <p>Hi {order.customer_name},</p>
-    <p>We’ve received your order and will contact you shortly.</p>
-
-    <p><strong>Your Order:</strong></p>
-    <ul>{items_html}</ul>
-
-    <p><strong>Total:</strong> ${order.total}</p>
-    """
+            products_data = parse_seed_data((await file.read()).decode("utf-8"), fmt)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid seed file: {e}")
+    else:
+        products_data = default_seed_data()
 
-    try:
-        await send_email(
-            subject="Your Order Confirmation",
-            recipients=[order.customer_email],
-            body=customer_body,
-        )
-    except Exception as e:
-        logger.error(f"Customer order email failed: {e}")
+    docs = []
+    for product_data in products_data:
+        try:
+            doc = Product(**product_data).model_dump()
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid product data: {e.errors()[0]}")
+        doc["spec_values"] = normalize_specs(doc["specs"])
+        if product_data.get("sku"):
+            doc["sku"] = str(product_data["sku"])
+        docs.append(doc)
 
-    return order_obj
+    if await is_seeded_with(db, docs):
+        # Same catalog as last time: skip the swap, which would make every
+        # worker drop its caches and reload.
+        return {"message": f"Catalog unchanged ({len(docs)} products)"}
 
+    await replace_catalog(db, docs)
 
-@api_router.post("/seed-products")
-async def seed_products():
-    await db.products.delete_many({})
-    
-    # PRODUCTS FROM COMPETITOR SITES - PRICES UNDERCUT SLIGHTLY
-    products_data = [
-        # ===== INVERTERS =====
-        # Deye 6kW - Enersave: Sale $295,000 / Reg $421,500 - We undercut
-        {
-            "name": "Deye SUN-6K-SG01LP1-US 6kW Hybrid Inverter",
-            "category": "inverters",
-            "description": "6000W Hybrid Solar Inverter with dual MPPT. Perfect for small to medium homes. Features colorful touch LCD, IP65 protection, and 5-year warranty.",
-            "regular_price": 415000,
-            "sale_price": 289000,
-            "image_url": "https://enersavesolutions.com/cdn/shop/files/SUN-6K-SG01LP1_grande.png?v=1763146513",
-            "specs": {
-                "power": "6000W",
-                "max_pv_input": "7800W",
-                "pv_voltage": "125-425V DC",
-                "frequency": "50/60Hz",
-                "efficiency": "97.6%",
-                "warranty": "5 Years"
-            },
-            "features": [
-                "Max PV Input Power - 7800W",
-                "Colorful touch LCD, IP65 protection",
-                "6 time periods for battery charging/discharging",
-                "Max charging/discharging current of 135A",
-                "DC & AC couple to retrofit existing solar",
-                "4ms fast transfer from on-grid to off-grid",
-                "Parallel up to 16 units"
-            ]
-        },
-        # Deye 8kW - Enersave: $510,000 (no sale) - We undercut
-        {
-            "name": "Deye SUN-8K-SG01LP1-US 8kW Hybrid Inverter",
-            "category": "inverters",
-            "description": "8000W Hybrid Solar Inverter ideal for medium-sized homes or EV-ready setups. High efficiency with dual MPPT and IP65 weatherproofing.",
-            "regular_price": 460000,
-            "sale_price": 324000,
-            "image_url": "https://enersavesolutions.com/cdn/shop/products/deye-inverter-1_grande.png?v=1652270688",
-            "specs": {
-                "power": "8000W",
-                "max_pv_input": "10400W",
-                "pv_voltage": "125-500V DC",
-                "frequency": "50/60Hz",
-                "efficiency": "97.6%",
-                "warranty": "5 Years"
-            },
-            "features": [
-                "Max PV Input Power - 10400W",
-                "Colorful touch LCD, IP65 protection",
-                "6 time periods for battery charging/discharging",
-                "Max charging/discharging current of 190A",
-                "Support storing energy from diesel generator",
-                "Smart Load application and Grid peak shaving",
-                "Parallel up to 16 units"
-            ]
-        },
-        # Deye 10kW - RezynTech: $340,000 - We undercut
-        {
-            "name": "Deye SUN-10K-SG01LP1-US 10kW Hybrid Inverter",
-            "category": "inverters",
-            "description": "10000W Hybrid Solar Inverter suited for large homes or light commercial use. 97.6% efficiency with dual MPPT and Wi-Fi monitoring.",
-            "regular_price": 530000,
-            "sale_price": 345000,
-            "image_url": "https://www.rezyntech.com/cdn/shop/files/DeyeInverter.jpg?v=1762354776&width=800",
-            "specs": {
-                "power": "10000W",
-                "max_pv_input": "13000W",
-                "pv_voltage": "125-500V DC",
-                "frequency": "50/60Hz",
-                "efficiency": "97.6%",
-                "warranty": "5 Years"
-            },
-            "features": [
-                "Max PV Input Power - 13000W",
-                "Split-phase 120/240V output",
-                "Dual MPPT for optimal efficiency",
-                "Wi-Fi/LAN monitoring included",
-                "Battery support (40-60V)",
-                "IP65 weatherproof design",
-                "Parallel scalability up to 16 units"
-            ]
-        },
-        # Deye 12kW - Enersave: Sale $390,000 / Reg $618,750 - We undercut
-        {
-            "name": "Deye SUN-12K-SG02LP2-US 12kW Hybrid Inverter",
-            "category": "inverters",
-            "description": "12000W Hybrid Solar Inverter built for high-demand residential and commercial installations. Maximum capacity for complete energy independence.",
-            "regular_price": 615000,
-            "sale_price": 385000,
-            "image_url": "https://enersavesolutions.com/cdn/shop/files/DEYE_SUN-12K-SG02LP2_grande.png?v=1721337309",
-            "specs": {
-                "power": "12000W",
-                "max_pv_input": "15600W",
-                "pv_voltage": "125-500V DC",
-                "frequency": "50/60Hz",
-                "efficiency": "97.6%",
-                "warranty": "5 Years"
-            },
-            "features": [
-                "Max PV Input Power - 15600W",
-                "Colorful touch LCD, IP65 protection",
-                "6 time periods for battery charging/discharging",
-                "Max charging/discharging current of 190A",
-                "DC & AC couple to retrofit existing solar",
-                "4ms fast transfer from on-grid to off-grid",
-                "Parallel up to 16 units"
-            ]
-        },
-        
-        # ===== BATTERIES =====
-        # Deye 5.12kWh - Your price: $185,000 sale / $320,000 original
-        {
-            "name": "Deye 5.12kWh LiFePO4 Rack-Mount Battery",
-            "category": "batteries",
-            "description": "Compact 5.12kWh LiFePO4 battery with 6000+ cycle life. Modular design with built-in intelligent BMS and 5-year warranty.",
-            "regular_price": 320000,
-            "sale_price": 185000,
-            "image_url": "https://www.rezyntech.com/cdn/shop/files/Deyebatteryunitonslatwallpanel_ced9114d-9295-4c4d-b415-cf43fd367442.png?v=1765550754&width=800",
-            "specs": {
-                "capacity": "5.12kWh",
-                "voltage": "51.2V",
-                "chemistry": "LiFePO4",
-                "cycles": "6000+",
-                "warranty": "5 Years"
-            },
-            "features": [
-                "LiFePO4 battery technology for high safety",
-                "6000+ cycle life for long-term performance",
-                "Modular & scalable design",
-                "Built-in intelligent BMS with safety protections",
-                "Flexible installation (wall, rack, floor, stacked)",
-                "Optimized for Deye hybrid inverters"
-            ]
-        },
-        # Deye 10.24kWh - Proportional pricing between 5.12 and 16kWh
-        {
-            "name": "Deye 10.24kWh LiFePO4 Rack-Mount Battery",
-            "category": "batteries",
-            "description": "Mid-range 10.24kWh LiFePO4 battery for average household needs. 6000+ cycle life with intelligent BMS protection.",
-            "regular_price": 600000,
-            "sale_price": 370000,
-            "image_url": "https://www.rezyntech.com/cdn/shop/files/WhatsAppImage2025-12-12at09.26.26_e999d824_35f0d8a1-ae03-4ef0-87fa-00890c251552.jpg?v=1765550754&width=800",
-            "specs": {
-                "capacity": "10.24kWh",
-                "voltage": "51.2V",
-                "chemistry": "LiFePO4",
-                "cycles": "6000+",
-                "warranty": "5 Years"
-            },
-            "features": [
-                "LiFePO4 battery technology for high safety",
-                "6000+ cycle life for long-term performance",
-                "Modular & scalable design",
-                "Built-in intelligent BMS",
-                "Smart monitoring (CAN/RS485, app support)",
-                "Optimized for Deye hybrid inverters"
-            ]
-        },
-        # Deye 12kWh - Proportional pricing
-        {
-            "name": "Deye 12kWh LiFePO4 Rack-Mount Battery",
-            "category": "batteries",
-            "description": "High-capacity 12kWh LiFePO4 battery for larger homes. Scalable modular design with comprehensive BMS protection.",
-            "regular_price": 680000,
-            "sale_price": 420000,
-            "image_url": "https://www.rezyntech.com/cdn/shop/files/WhatsAppImage2025-12-12at09.25.48_b1764910_07836b49-e61d-4652-92b1-b59e197a1656.jpg?v=1765550754&width=800",
-            "specs": {
-                "capacity": "12kWh",
-                "voltage": "51.2V",
-                "chemistry": "LiFePO4",
-                "cycles": "6000+",
-                "warranty": "5 Years"
-            },
-            "features": [
-                "LiFePO4 battery technology for high safety",
-                "6000+ cycle life for long-term performance",
-                "Modular & scalable design",
-                "Built-in intelligent BMS",
-                "High charge & discharge capability",
-                "Optimized for Deye hybrid inverters"
-            ]
-        },
-        # Deye 16kWh - Your price: $550,000 sale / $810,000 original
-        {
-            "name": "Deye 16kWh LiFePO4 Wall-Mount Battery",
-            "category": "batteries",
-            "description": "Maximum capacity 16kWh LiFePO4 wall-mounted battery for complete energy independence. Premium storage solution for high-demand systems.",
-            "regular_price": 825000,
-            "sale_price": 750000,
-            "image_url": "https://www.rezyntech.com/cdn/shop/files/Deyebatteryunitonslatwallpanel_ced9114d-9295-4c4d-b415-cf43fd367442.png?v=1765550754&width=800",
-            "specs": {
-                "capacity": "16kWh",
-                "voltage": "51.2V",
-                "chemistry": "LiFePO4",
-                "cycles": "6000+",
-                "mount": "Wall",
-                "warranty": "5 Years"
-            },
-            "features": [
-                "Maximum storage capacity",
-                "LiFePO4 technology for safety & longevity",
-                "6000+ cycle life",
-                "Wall-mounted for space efficiency",
-                "Built-in intelligent BMS",
-                "Smart monitoring & communication"
-            ]
-        },
-        # BSL 5.12kWh Rack - RezynTech: $200,000
-        {
-            "name": "BSL 5.12kWh LiFePO4 Rack-Mount Battery",
-            "category": "batteries",
-            "description": "BSL B-LFP48-100E compact rack-mount battery. 6000+ cycle life with advanced BMS. Compatible with most hybrid inverters including Deye.",
-            "regular_price": 360000,
-            "sale_price": 220000,
-            "image_url": "https://www.rezyntech.com/cdn/shop/files/BSL_2.png?v=1762357657&width=800",
-            "specs": {
-                "capacity": "5.12kWh",
-                "voltage": "48V",
-                "chemistry": "LiFePO4",
-                "cycles": "6000+",
-                "mount": "Rack"
-            },
-            "features": [
-                "Compact 48V / 5kWh LiFePO4 rack-mount",
-                "Scalable for growing energy needs",
-                "6000+ cycle life",
-                "Safe and maintenance-free design",
-                "Compatible with Deye and other inverters"
-            ]
-        },
-        # BSL 10.24kWh Rack - RezynTech: $200,000 base
-        {
-            "name": "BSL 10.24kWh LiFePO4 Rack-Mount Battery",
-            "category": "batteries",
-            "description": "BSL B-LFP48-200E high-capacity rack-mount battery. Ideal for larger residential or light commercial solar systems.",
-            "regular_price": 320000,
-            "sale_price": 400000,
-            "image_url": "https://www.rezyntech.com/cdn/shop/files/BSL.png?v=1762358246&width=800",
-            "specs": {
-                "capacity": "10.24kWh",
-                "voltage": "48V",
-                "chemistry": "LiFePO4",
-                "cycles": "6000+",
-                "mount": "Rack"
-            },
-            "features": [
-                "High-capacity 48V / 10kWh rack-mount",
-                "Modular design for expansion",
-                "6000+ cycle life",
-                "Compatible with most hybrid inverters",
-                "Long-life reliability"
-            ]
-        },
-        # BSL Li-Pro 10.24kWh Wall
-        {
-            "name": "BSL Li-Pro 10.24kWh LiFePO4 Wall-Mount Battery",
-            "category": "batteries",
-            "description": "BSL Li-Pro 10240 sleek wall-mounted battery with IP65 protection. Perfect for indoor or outdoor installation.",
-            "regular_price": 650000,
-            "sale_price": 570000,
-            "image_url": "https://www.rezyntech.com/cdn/shop/files/BSL_Li_3_05174485-c78f-4d37-8c22-6c7621e562ef.png?v=1762373784&width=800",
-            "specs": {
-                "capacity": "10.24kWh",
-                "voltage": "48V",
-                "chemistry": "LiFePO4",
-                "cycles": "6000+",
-                "mount": "Wall",
-                "protection": "IP65"
-            },
-            "features": [
-                "Sleek wall-mounted design",
-                "IP65 rated for indoor/outdoor use",
-                "Expandable for greater storage",
-                "6000+ cycle life",
-                "High safety LiFePO4 chemistry"
-            ]
-        },
-        
-        # ===== SOLAR PANELS =====
-        # SunPower P7 450W - User price: $18,000 sale / $21,000 original
-        {
-            "name": "SunPower P7 450W BiFacial Black Solar Panel",
-            "category": "panels",
-            "description": "SunPower Maxeon Performance 7 series bifacial panel. Premium all-black design with 25-year warranty. Captures sunlight from both sides.",
-            "regular_price": 21000,
-            "sale_price": 18000,
-            "image_url": "https://www.rezyntech.com/cdn/shop/files/blackpanel.png?v=1750092550&width=800",
-            "specs": {
-                "power": "450W",
-                "type": "Bifacial",
-                "cells": "Monocrystalline",
-                "brand": "SunPower Maxeon",
-                "warranty": "25 Years"
-            },
-            "features": [
-                "Bifacial Technology - captures sunlight from both sides",
-                "All-Black Design for sleek aesthetics",
-                "Superior Reliability - solid copper foundation",
-                "High Efficiency Maxeon cells",
-                "25-Year product and power warranty",
-                "Climate-Ready for shading, heat, humidity"
-            ]
-        },
-        # SunPower P7 545W - SOLD OUT per user
-        {
-            "name": "SunPower P7 545W BiFacial Solar Panel",
-            "category": "panels",
-            "description": "SunPower Maxeon Performance 7 series high-output bifacial panel. N-type TOPCon cells for maximum efficiency. 25-year warranty.",
-            "regular_price": 25000,
-            "sale_price": 20000,
-            "image_url": "https://www.rezyntech.com/cdn/shop/files/ChatGPT_Image_Nov_20_2025_02_23_29_PM.png?v=1763667027&width=800",
-            "specs": {
-                "power": "545W",
-                "type": "Bifacial",
-                "cells": "N-type TOPCon",
-                "brand": "SunPower Maxeon",
-                "warranty": "25 Years"
-            },
-            "features": [
-                "Bifacial Technology - up to 30% additional gain",
-                "N-type TOPCon cells for highest efficiency",
-                "High Power Output - ideal for commercial",
-                "Glass-Glass construction for durability",
-                "25-Year comprehensive warranty",
-                "Climate efficient design"
-            ],
-            "in_stock": False
-        },
-        # TW 625W - Backorder Available per user
-        {
-            "name": "TW Solar 625W BiFacial Panel",
-            "category": "panels",
-            "description": "TW Solar 625W high-output bifacial panel for maximum power generation. Industry-leading wattage for large installations. Available on backorder.",
-            "regular_price": 38000,
-            "sale_price": 28000,
-            "image_url": "https://images.unsplash.com/photo-1509391366360-2e959784a276?w=800",
-            "specs": {
-                "power": "625W",
-                "type": "Bifacial",
-                "cells": "Monocrystalline",
-                "brand": "TW Solar"
-            },
-            "features": [
-                "Industry-leading 625W output",
-                "Bifacial technology for extra generation",
-                "Ideal for large-scale installations",
-                "High efficiency cells",
-                "Durable construction"
-            ],
-            "in_stock": True,
-            "backorder": True
-        },
-    ]
-    
-    for product_data in products_data:
-        product = Product(**product_data)
-        doc = product.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        await db.products.insert_one(doc)
-    
-    return {"message": f"Successfully seeded {len(products_data)} products"}
+    await catalog_store.reload(db)
+    version = await catalog_sync.bump(db)
+    await record_seed(db, docs, version)
+    return {"message": f"Successfully seeded {len(docs)} products"}
 
 
 app.include_router(api_router)
@@ -743,6 +678,56 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+def build_product(doc: dict) -> ProductRecord:
+    return ProductRecord.from_product(Product(**doc).model_dump())
+
+
+def on_catalog_change(upserted: list, removed: list):
+    catalog_cache.invalidate()
+    for product in upserted:
+        search_index.add(product)
+        spec_index.add(product)
+        sizing_catalog.add(product)
+    for product_id in removed:
+        search_index.remove(product_id)
+        spec_index.remove(product_id)
+        sizing_catalog.remove(product_id)
+
+
+def on_catalog_reload():
+    catalog_cache.invalidate()
+    products = catalog_store.products()
+    search_index.rebuild(products)
+    spec_index.rebuild(products)
+    sizing_catalog.rebuild(products)
+
+
+async def refresh_catalog():
+    # Another worker changed the catalog. With a change stream the store
+    # already has the change.
+    if not catalog_store.watching:
+        await catalog_store.reload(db)
+
+
+async def startup():
+    global client, db
+    client, db = await open_database()
+    await ensure_indexes(db)
+    # Read the shared version before loading the catalog, so a write that
+    # lands during the load is still picked up by the first poll.
+    await catalog_sync.start(db, refresh_catalog)
+    await catalog_store.start(db, build_product, on_catalog_change, on_catalog_reload)
+    email_templates.compile()
+    open_http_client()
+    outbox.start(db)
+    rate_limiter.start(db)
+    metrics.start()
+
+
+async def shutdown():
+    await metrics.stop()
+    await catalog_store.stop()
+    await catalog_sync.stop()
+    await outbox.stop()
+    await close_http_client()
+    close_database(client)
@@ -0,0 +1,17 @@
+import os
+import hmac
+from typing import Optional
+
+# Bearer token for admin-only operations (catalog uploads and reseeds,
+# data exports).
+# Unset disables them entirely.
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+
+
+def is_admin(authorization: Optional[str]) -> bool:
+    if not ADMIN_API_TOKEN or not authorization:
+        return False
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer":
+        return False
+    return hmac.compare_digest(token.strip().encode(), ADMIN_API_TOKEN.encode())
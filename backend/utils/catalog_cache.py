@@ -0,0 +1,131 @@
+import os
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "256"))
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "public, max-age=60, stale-while-revalidate=300")
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    last_modified: str
+
+
+class CatalogCache:
+    """Versioned cache of pre-serialized catalog responses.
+
+    Entries are keyed per category ("all" for the full catalog) or per
+    product ("product:<id>") and hold the exact response bytes. Any catalog
+    write bumps the version, which makes every older entry unreachable
+    without having to walk the cache.
+    """
+
+    def __init__(self, ttl: float = CATALOG_CACHE_TTL, max_entries: int = CATALOG_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = 0
+        self.modified_at = time.time()
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple[int, float, CachedResponse]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            version, stored_at, cached = entry
+            if version == self.version and time.monotonic() - stored_at < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: str, body: bytes, version: Optional[int] = None) -> CachedResponse:
+        # Derived from the exact bytes, so it is stable across restarts and
+        # workers as long as the catalog is unchanged. Weak, because the
+        # compression middleware sends these bytes as br, gzip or identity
+        # under the same tag, and a strong tag must differ per encoding.
+        cached = CachedResponse(
+            body=body,
+            etag=f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+            last_modified=formatdate(self.modified_at, usegmt=True),
+        )
+        # A read that started before an invalidation must not repopulate
+        # the cache with the old catalog.
+        if version is not None and version != self.version:
+            return cached
+        self._entries[key] = (self.version, time.monotonic(), cached)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self.modified_at = time.time()
+        self._entries.clear()
+        logger.info(f"Catalog cache invalidated (version {self.version})")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+catalog_cache = CatalogCache()
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x".
+    opaque = etag.removeprefix("W/")
+    candidates = (tag.strip() for tag in header.split(","))
+    return any(tag.removeprefix("W/") == opaque for tag in candidates)
+
+
+def _not_modified_since(header: str, last_modified: str) -> bool:
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+
+
+def is_not_modified(request: Request, cached: CachedResponse) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, cached.etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        return _not_modified_since(if_modified_since, cached.last_modified)
+    return False
+
+
+def catalog_response(request: Request, cached: CachedResponse) -> Response:
+    headers = {
+        "ETag": cached.etag,
+        "Last-Modified": cached.last_modified,
+        "Cache-Control": CATALOG_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if is_not_modified(request, cached):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
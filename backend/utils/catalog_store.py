@@ -0,0 +1,282 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from .catalog_sync import COLLECTION as META_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+TOKEN_ID = "products_resume_token"
+
+CATALOG_STORE_MAX_AWAIT_MS = int(os.getenv("CATALOG_STORE_MAX_AWAIT_MS", "1000"))
+# Resume tokens are written at most this often; replaying a few seconds of
+# events on restart is harmless, as every event is applied idempotently.
+CATALOG_TOKEN_SAVE_INTERVAL = float(os.getenv("CATALOG_TOKEN_SAVE_INTERVAL", "5"))
+CATALOG_WATCH_RETRY_DELAY = float(os.getenv("CATALOG_WATCH_RETRY_DELAY", "5"))
+# How long startup waits for the first load before serving (reads fall
+# back to Mongo until it completes).
+CATALOG_STORE_START_TIMEOUT = float(os.getenv("CATALOG_STORE_START_TIMEOUT", "30"))
+
+# $changeStream is only supported on replica sets / sharded clusters.
+CHANGE_STREAMS_UNSUPPORTED = {40573, 40324}
+# Resume token no longer in the oplog, or the stream can't be resumed.
+CHANGE_STREAM_LOST = {136, 260, 280, 286}
+# Events after which the collection as we knew it is gone (the seed
+# endpoint swaps in a new collection with renameCollection).
+RELOAD_EVENTS = {"drop", "rename", "dropDatabase", "invalidate"}
+
+
+def _stored(value):
+    # Mongo keeps datetimes to the millisecond.
+    if isinstance(value, datetime):
+        return value.replace(microsecond=value.microsecond // 1000 * 1000, tzinfo=None)
+    return value
+
+
+def _same_write(written: dict, stored: dict) -> bool:
+    """Whether `stored` (read back from Mongo) is the document we wrote."""
+    return written.keys() == stored.keys() and all(_stored(written[k]) == _stored(stored[k]) for k in written)
+
+
+class CatalogStore:
+    """The products collection, held in memory.
+
+    Loaded once at startup, then kept current by a change stream on
+    `products`. On deployments without change streams (standalone mongod)
+    it is reloaded whenever catalog_sync reports a write from another
+    worker, and updated directly by this worker's own writes. Products are
+    held as whatever `build` returns (ProductRecord in the app), built once
+    per write rather than per request.
+
+    Every applied change is passed on as on_change(upserted, removed_ids),
+    so indexes can update the products that changed; on_reload() follows a
+    full load.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.watching = False
+        self.events = 0
+        self.reloads = 0
+        self._build: Callable[[dict], dict] = dict
+        self._on_change: Callable[[list, list], None] = lambda upserted, removed: None
+        self._on_reload: Callable[[], None] = lambda: None
+        self._by_id: dict[str, dict] = {}
+        self._ids: dict = {}  # Mongo _id -> product id, for delete events
+        # Mongo _id -> document this worker wrote and already applied, so
+        # its own change event can be skipped.
+        self._local: dict = {}
+        self._by_category: Optional[dict[str, list[dict]]] = None
+        self._all: Optional[list[dict]] = None
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+        self._token_saved_at = 0.0
+        self._ready = asyncio.Event()
+
+    def get(self, product_id: str) -> Optional[dict]:
+        return self._by_id.get(product_id)
+
+    def products(self, category: Optional[str] = None) -> list[dict]:
+        if self._all is None:
+            self._all = list(self._by_id.values())
+            by_category: dict[str, list[dict]] = {}
+            for product in self._all:
+                by_category.setdefault(product.get("category"), []).append(product)
+            self._by_category = by_category
+        if category is None:
+            return self._all
+        return self._by_category.get(category, [])
+
+    def _put(self, doc: dict):
+        mongo_id = doc.pop("_id", None)
+        product = self._build(doc)
+        self._by_id[product["id"]] = product
+        if mongo_id is not None:
+            self._ids[mongo_id] = product["id"]
+        self._all = None
+        return product
+
+    def _delete(self, mongo_id) -> Optional[str]:
+        self._local.pop(mongo_id, None)
+        product_id = self._ids.pop(mongo_id, None)
+        if product_id is not None and self._by_id.pop(product_id, None) is not None:
+            self._all = None
+            return product_id
+        return None
+
+    def upsert(self, doc: dict) -> None:
+        """Apply this worker's own write right away (read-your-writes)."""
+        if self.watching and "_id" in doc:
+            self._local[doc["_id"]] = dict(doc)
+        self._on_change([self._put(dict(doc))], [])
+
+    async def reload(self, db=None) -> None:
+        db = db or self._db
+        by_id, ids = {}, {}
+        async for doc in db.products.find({}):
+            mongo_id = doc.pop("_id")
+            product = self._build(doc)
+            by_id[product["id"]] = product
+            ids[mongo_id] = product["id"]
+        self._by_id, self._ids, self._all = by_id, ids, None
+        self._local = {}
+        self.loaded = True
+        self._ready.set()
+        self.reloads += 1
+        logger.info(f"Catalog store loaded {len(by_id)} products")
+        self._on_reload()
+
+    async def start(
+        self,
+        db,
+        build: Callable[[dict], dict],
+        on_change: Callable[[list, list], None],
+        on_reload: Callable[[], None],
+    ) -> None:
+        self._db = db
+        self._build = build
+        self._on_change = on_change
+        self._on_reload = on_reload
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch(), name="catalog-store")
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=CATALOG_STORE_START_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error("Catalog store not loaded yet; serving product reads from MongoDB meanwhile")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.watching = False
+
+    async def _load_token(self):
+        doc = await self._db[META_COLLECTION].find_one({"_id": TOKEN_ID})
+        return doc["token"] if doc else None
+
+    async def _save_token(self, token) -> None:
+        if token is None or time.monotonic() - self._token_saved_at < CATALOG_TOKEN_SAVE_INTERVAL:
+            return
+        await self._db[META_COLLECTION].update_one(
+            {"_id": TOKEN_ID},
+            {"$set": {"token": token, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        self._token_saved_at = time.monotonic()
+
+    async def _clear_token(self) -> None:
+        await self._db[META_COLLECTION].delete_one({"_id": TOKEN_ID})
+        self._token_saved_at = 0.0
+
+    def _apply(self, change: dict, upserted: dict, removed: set) -> bool:
+        """Apply one change event, collecting what changed by product id.
+
+        Returns False if the store must be reloaded.
+        """
+        operation = change["operationType"]
+        if operation in RELOAD_EVENTS:
+            return False
+        if operation == "delete":
+            product_id = self._delete(change["documentKey"]["_id"])
+            if product_id is not None:
+                upserted.pop(product_id, None)
+                removed.add(product_id)
+        elif change.get("fullDocument") is not None:
+            doc = change["fullDocument"]
+            written = self._local.pop(doc.get("_id"), None)
+            if written is not None and _same_write(written, doc):
+                # Our own write, already applied by upsert().
+                return True
+            product = self._put(doc)
+            removed.discard(product["id"])
+            upserted[product["id"]] = product
+        else:
+            # Updated then deleted before the lookup ran; a delete event follows.
+            pass
+        return True
+
+    async def _watch(self) -> None:
+        try:
+            token = await self._load_token()
+        except PyMongoError as e:
+            logger.error(f"Catalog resume token read failed: {e}")
+            token = None
+
+        while True:
+            try:
+                # Open the stream before loading, so no write between the
+                # load and the first event can be missed. Events already
+                # reflected in the load are re-applied harmlessly.
+                async with self._db.products.watch(
+                    full_document="updateLookup",
+                    resume_after=token,
+                    max_await_time_ms=CATALOG_STORE_MAX_AWAIT_MS,
+                ) as stream:
+                    self.watching = True
+                    await self.reload()
+                    while stream.alive:
+                        change = await stream.try_next()
+                        upserted: dict = {}
+                        removed: set = set()
+                        while change is not None:
+                            self.events += 1
+                            if not self._apply(change, upserted, removed):
+                                break
+                            change = await stream.try_next() if stream.alive else None
+                        token = stream.resume_token
+                        if change is not None:
+                            # Collection dropped or swapped: start over
+                            # with a fresh stream and a full load.
+                            logger.info(f"Catalog {change['operationType']} event; reloading")
+                            token = None
+                            await self._clear_token()
+                            break
+                        if upserted or removed:
+                            self._on_change(list(upserted.values()), list(removed))
+                        await self._save_token(token)
+                continue
+            except asyncio.CancelledError:
+                raise
+            except NotImplementedError:
+                return await self._polling_fallback("change streams are not available")
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                    return await self._polling_fallback(str(e))
+                if e.code in CHANGE_STREAM_LOST:
+                    logger.warning(f"Catalog change stream can't resume ({e}); reloading")
+                    token = None
+                    continue
+                logger.error(f"Catalog change stream failed: {e}")
+            except Exception as e:
+                logger.error(f"Catalog change stream failed: {e}")
+            self.watching = False
+            await asyncio.sleep(CATALOG_WATCH_RETRY_DELAY)
+
+    async def _polling_fallback(self, reason: str) -> None:
+        self.watching = False
+        logger.warning(f"Catalog change stream unavailable ({reason}); relying on catalog_sync polling")
+        try:
+            await self.reload()
+        except Exception as e:
+            logger.error(f"Catalog store load failed: {e}")
+        finally:
+            # Don't hold up startup; catalog_sync retries the load.
+            self._ready.set()
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "mode": "change_stream" if self.watching else "polling",
+            "products": len(self._by_id),
+            "events": self.events,
+            "reloads": self.reloads,
+        }
+
+
+catalog_store = CatalogStore()
@@ -0,0 +1,93 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "catalog_meta"
+VERSION_ID = "catalog_version"
+
+# How quickly other workers notice a catalog write. One _id lookup per
+# interval per worker.
+CATALOG_SYNC_INTERVAL = float(os.getenv("CATALOG_SYNC_INTERVAL", "1"))
+
+
+class CatalogSync:
+    """Cross-worker catalog invalidation through a shared version counter.
+
+    Every worker keeps its own caches and in-memory indexes. Writers bump
+    the counter in catalog_meta; every worker polls it and runs its
+    on_change callback when the counter moves past what it last saw.
+    """
+
+    def __init__(self, interval: float = CATALOG_SYNC_INTERVAL):
+        self.interval = interval
+        self.version: Optional[int] = None
+        self.remote_changes = 0
+        self._db = None
+        self._on_change: Optional[Callable[[], Awaitable[None]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _read(self) -> int:
+        doc = await self._db[COLLECTION].find_one({"_id": VERSION_ID}, {"version": 1})
+        return doc["version"] if doc else 0
+
+    async def bump(self, db) -> int:
+        """Record a catalog write. The caller has already refreshed its own caches."""
+        doc = await db[COLLECTION].find_one_and_update(
+            {"_id": VERSION_ID},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        # Only skip our own write if nobody else wrote in between; otherwise
+        # let the poller pick up the other change as well.
+        if self.version is not None and doc["version"] == self.version + 1:
+            self.version = doc["version"]
+        return doc["version"]
+
+    async def start(self, db, on_change: Callable[[], Awaitable[None]]) -> None:
+        if self._task is not None:
+            return
+        self._db = db
+        self._on_change = on_change
+        try:
+            self.version = await self._read()
+        except Exception as e:
+            logger.error(f"Catalog version read failed: {e}")
+        self._task = asyncio.create_task(self._run(), name="catalog-sync")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def poll_once(self) -> bool:
+        version = await self._read()
+        if version == self.version:
+            return False
+        logger.info(f"Catalog changed in another worker ({self.version} -> {version}); refreshing")
+        # Only mark the version seen once the refresh worked, so a failed
+        # rebuild is retried on the next poll.
+        await self._on_change()
+        self.version = version
+        self.remote_changes += 1
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Catalog sync poll failed: {e}")
+
+
+catalog_sync = CatalogSync()
@@ -0,0 +1,106 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from .metrics import MongoCommandMetrics, MongoPoolMetrics
+
+logger = logging.getLogger(__name__)
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DB_NAME = os.environ.get("DB_NAME", "jonesaica_db")
+
+MONGO_APP_NAME = os.getenv("MONGO_APP_NAME", "jonesaica-backend")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "5"))
+MONGO_MAX_CONNECTING = int(os.getenv("MONGO_MAX_CONNECTING", "2"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+# Fail a request quickly instead of queueing forever behind a full pool.
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+# Comma-separated, in order of preference. Compressors whose library isn't
+# installed are dropped; the server picks the first one it also supports.
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+
+
+def _compressor_available(name: str) -> bool:
+    module = {"zstd": "zstandard", "snappy": "snappy"}.get(name)
+    if module is None:
+        return name == "zlib"
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def available_compressors(setting: str = MONGO_COMPRESSORS) -> list[str]:
+    return [name for name in (c.strip() for c in setting.split(",")) if name and _compressor_available(name)]
+
+
+def client_options() -> dict:
+    options = {
+        # tz_aware so created_at comes back as an aware UTC datetime,
+        # matching what the models produce on write.
+        "tz_aware": True,
+        "appname": MONGO_APP_NAME,
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxConnecting": MONGO_MAX_CONNECTING,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "readPreference": MONGO_READ_PREFERENCE,
+        "event_listeners": [MongoCommandMetrics(), MongoPoolMetrics()],
+    }
+    compressors = available_compressors()
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+
+def create_client(url: str = MONGO_URL) -> AsyncIOMotorClient:
+    # No I/O here; Motor connects on first use.
+    return AsyncIOMotorClient(url, **client_options())
+
+
+async def warm_pool(db, connections: int = MONGO_MIN_POOL_SIZE) -> None:
+    """Open `connections` pooled connections before taking traffic.
+
+    Concurrent pings each need their own connection, so the first burst of
+    requests doesn't wait on TCP/TLS handshakes and auth.
+    """
+    if connections <= 0:
+        return
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(db.command("ping") for _ in range(connections)))
+    except Exception as e:
+        logger.error(f"MongoDB pool warm-up failed: {e}")
+        return
+    logger.info(f"MongoDB pool warmed with {connections} connections in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+async def open_database(url: str = MONGO_URL, name: str = DB_NAME) -> tuple[AsyncIOMotorClient, object]:
+    """Create the client and warm its pool; called from the app's lifespan.
+
+    Never at import time: each gunicorn worker must build its own client
+    after the fork, inside its own event loop.
+    """
+    client = create_client(url)
+    db = client[name]
+    await warm_pool(db)
+    return client, db
+
+
+def close_database(client: Optional[AsyncIOMotorClient]) -> None:
+    if client is not None:
+        client.close()
@@ -0,0 +1,88 @@
+import io
+import os
+import csv
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterable, Optional
+
+import orjson
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+# Rows are grouped into chunks of roughly this size before being written
+# to the socket, instead of one send per document.
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def created_at_filter(since: Optional[datetime], until: Optional[datetime]) -> dict:
+    bounds = {}
+    if since:
+        bounds["$gte"] = _as_utc(since)
+    if until:
+        bounds["$lt"] = _as_utc(until)
+    return {"created_at": bounds} if bounds else {}
+
+
+async def iter_documents(collection, query: dict, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[dict]:
+    cursor = collection.find(query, {"_id": 0}).sort("created_at", 1).batch_size(batch_size)
+    async for doc in cursor:
+        yield doc
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+async def ndjson_rows(docs: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    chunk = []
+    size = 0
+    async for doc in docs:
+        line = orjson.dumps(doc, default=_json_default, option=orjson.OPT_APPEND_NEWLINE)
+        chunk.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield b"".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b"".join(chunk)
+
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=_json_default, ensure_ascii=False)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def csv_rows(docs: AsyncIterator[dict], columns: Iterable[str]) -> AsyncIterator[bytes]:
+    columns = list(columns)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> bytes:
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow(columns)
+    async for doc in docs:
+        writer.writerow([_csv_cell(doc.get(column)) for column in columns])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield flush()
+    yield flush()
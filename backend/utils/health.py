@@ -0,0 +1,81 @@
+import os
+import time
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from . import mailer
+
+# A probe every second costs at most one ping per TTL per process.
+HEALTH_CHECK_TTL = float(os.getenv("HEALTH_CHECK_TTL", "5"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+
+
+class DependencyCheck:
+    """One dependency probe with a cached result.
+
+    Results are reused for `ttl` seconds, and concurrent callers share a
+    single in-flight probe, so readiness polling never piles up on the
+    dependency.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        probe: Callable[[], Awaitable[None]],
+        critical: bool = True,
+        ttl: float = HEALTH_CHECK_TTL,
+        timeout: float = HEALTH_CHECK_TIMEOUT,
+    ):
+        self.name = name
+        self.probe = probe
+        self.critical = critical
+        self.ttl = ttl
+        self.timeout = timeout
+        self.result: Optional[dict] = None
+        self._checked_at = 0.0
+        self._inflight: Optional[asyncio.Task] = None
+
+    async def _run(self) -> dict:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.probe(), timeout=self.timeout)
+            ok, error = True, None
+        except asyncio.TimeoutError:
+            ok, error = False, f"timed out after {self.timeout}s"
+        except Exception as e:
+            ok, error = False, str(e) or type(e).__name__
+        result = {
+            "ok": ok,
+            "critical": self.critical,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            "checked_at": time.time(),
+        }
+        if error:
+            result["error"] = error
+        self.result = result
+        self._checked_at = time.monotonic()
+        return result
+
+    async def check(self) -> dict:
+        if self.result is not None and time.monotonic() - self._checked_at < self.ttl:
+            return {**self.result, "cached": True}
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._run())
+            self._inflight.add_done_callback(lambda _: setattr(self, "_inflight", None))
+        # shield() so a caller that gives up doesn't cancel the shared probe.
+        return {**await asyncio.shield(self._inflight), "cached": False}
+
+
+async def check_mail_config() -> None:
+    missing = [name for name in ("RESEND_API_KEY", "FROM_EMAIL") if not getattr(mailer, name)]
+    if missing:
+        raise RuntimeError(f"{', '.join(missing)} not set")
+
+
+async def readiness(checks: list[DependencyCheck]) -> tuple[bool, dict]:
+    results = await asyncio.gather(*(check.check() for check in checks))
+    report = {check.name: result for check, result in zip(checks, results)}
+    ready = all(result["ok"] for result in results if result["critical"])
+    degraded = not all(result["ok"] for result in results)
+    status = "ready" if not degraded else ("degraded" if ready else "unavailable")
+    return ready, {"status": status, "checks": report}
@@ -0,0 +1,166 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "1000"))
+# How long another worker may hold a key before it's presumed dead.
+IDEMPOTENCY_PENDING_TIMEOUT = float(os.getenv("IDEMPOTENCY_PENDING_TIMEOUT", "30"))
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "10"))
+MAX_KEY_LENGTH = 255
+
+COLLECTION = "idempotency_keys"
+
+
+def fingerprint(payload: BaseModel) -> str:
+    canonical = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Mongo-backed record of completed requests with an in-process LRU in front.
+
+    Concurrent duplicates inside one process queue on a per-key lock; across
+    processes the unique _id on the pending record decides who does the work.
+    """
+
+    def __init__(self, cache_size: int = IDEMPOTENCY_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.replays = 0
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._waiters: dict[str, int] = {}
+
+    def _remember(self, record_id: str, record: dict) -> None:
+        self._cache[record_id] = record
+        self._cache.move_to_end(record_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _replay(self, record: dict, request_fingerprint: str) -> ORJSONResponse:
+        if record["fingerprint"] != request_fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        self.replays += 1
+        return ORJSONResponse(
+            record["response"],
+            status_code=record.get("status_code", 200),
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    async def _wait_for_other(self, collection, record_id: str) -> Optional[dict]:
+        # Another worker holds the key; poll until it finishes or looks dead.
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + IDEMPOTENCY_WAIT
+        delay = 0.05
+        while loop.time() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+            record = await collection.find_one({"_id": record_id})
+            if record is None or record["status"] == "done":
+                return record
+        return None
+
+    async def _claim(self, collection, record_id: str, request_fingerprint: str) -> Optional[dict]:
+        """Insert a pending record. Returns the existing record if someone else has the key."""
+        now = datetime.now(timezone.utc)
+        pending = {
+            "_id": record_id,
+            "fingerprint": request_fingerprint,
+            "status": "pending",
+            "locked_at": now,
+            "created_at": now,
+        }
+        for _ in range(3):
+            try:
+                await collection.insert_one(pending)
+                return None
+            except DuplicateKeyError:
+                pass
+            # Take over keys whose owner died mid-request.
+            stale = await collection.find_one_and_update(
+                {
+                    "_id": record_id,
+                    "status": "pending",
+                    "locked_at": {"$lt": now - timedelta(seconds=IDEMPOTENCY_PENDING_TIMEOUT)},
+                },
+                {"$set": {"locked_at": now, "fingerprint": request_fingerprint}},
+            )
+            if stale is not None:
+                return None
+            existing = await collection.find_one({"_id": record_id})
+            if existing is None:
+                continue  # expired between the insert and the read; try again
+            if existing["status"] == "pending":
+                existing = await self._wait_for_other(collection, record_id)
+                if existing is None:
+                    continue
+            return existing
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+
+    async def run(
+        self,
+        db,
+        scope: str,
+        key: Optional[str],
+        payload: BaseModel,
+        handler: Callable[[], Awaitable[BaseModel]],
+    ):
+        if not key:
+            return await handler()
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+        record_id = f"{scope}:{key}"
+        request_fingerprint = fingerprint(payload)
+
+        lock = self._locks.setdefault(record_id, asyncio.Lock())
+        self._waiters[record_id] = self._waiters.get(record_id, 0) + 1
+        try:
+            async with lock:
+                cached = self._cache.get(record_id)
+                if cached is not None:
+                    return self._replay(cached, request_fingerprint)
+
+                collection = db[COLLECTION]
+                existing = await self._claim(collection, record_id, request_fingerprint)
+                if existing is not None:
+                    self._remember(record_id, existing)
+                    return self._replay(existing, request_fingerprint)
+
+                try:
+                    result = await handler()
+                except BaseException:
+                    # Let the client retry with the same key.
+                    await collection.delete_one({"_id": record_id, "status": "pending"})
+                    raise
+
+                record = {
+                    "fingerprint": request_fingerprint,
+                    "status": "done",
+                    "status_code": 200,
+                    "response": jsonable_encoder(result),
+                }
+                await collection.update_one({"_id": record_id}, {"$set": record})
+                self._remember(record_id, record)
+                return result
+        finally:
+            self._waiters[record_id] -= 1
+            if not self._waiters[record_id]:
+                del self._waiters[record_id]
+                del self._locks[record_id]
+
+
+idempotency_store = IdempotencyStore()
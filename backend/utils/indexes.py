@@ -0,0 +1,103 @@
+import time
+import logging
+
+from pymongo import ASCENDING, IndexModel
+
+from .idempotency import COLLECTION as IDEMPOTENCY_COLLECTION, IDEMPOTENCY_TTL
+from .outbox import COLLECTION as OUTBOX_COLLECTION, OUTBOX_RETENTION
+from .ratelimit import COLLECTION as RATE_LIMIT_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+
+def _by_id() -> IndexModel:
+    return IndexModel([("id", ASCENDING)], name="id_unique", unique=True)
+
+
+def _by_created_at() -> IndexModel:
+    # Matches the (created_at, id) keyset order used for pagination, and
+    # serves plain created_at range filters as its prefix.
+    return IndexModel([("created_at", ASCENDING), ("id", ASCENDING)], name="created_at_id")
+
+
+INDEX_SPECS = {
+    "products": [
+        _by_id(),
+        IndexModel([("category", ASCENDING)], name="category"),
+        # Seed upsert key; products created through the API have no sku.
+        IndexModel(
+            [("sku", ASCENDING)],
+            name="sku_unique",
+            unique=True,
+            partialFilterExpression={"sku": {"$exists": True}},
+        ),
+        _by_created_at(),
+        IndexModel(
+            [("category", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)],
+            name="category_created_at_id",
+        ),
+    ],
+    "leads": [_by_id(), _by_created_at()],
+    "quotes": [_by_id(), _by_created_at()],
+    "orders": [_by_id(), _by_created_at()],
+    IDEMPOTENCY_COLLECTION: [
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=IDEMPOTENCY_TTL),
+    ],
+    OUTBOX_COLLECTION: [
+        # Dispatcher lease query: due pending rows and expired leases.
+        IndexModel([("status", ASCENDING), ("available_at", ASCENDING)], name="status_available_at"),
+        IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)], name="status_lease_until"),
+        IndexModel([("lease_token", ASCENDING)], name="lease_token", sparse=True),
+        # Only delivered rows carry sent_at, so pending and dead ones are kept.
+        IndexModel([("sent_at", ASCENDING)], name="sent_at_ttl", expireAfterSeconds=OUTBOX_RETENTION),
+    ],
+    # Buckets set expires_at to when they would be full again.
+    RATE_LIMIT_COLLECTION: [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+# Result of the most recent ensure_indexes() run, for the stats endpoint.
+last_build_report: list[dict] = []
+
+
+async def create_collection_indexes(collection, models: list[IndexModel]) -> dict:
+    started = time.perf_counter()
+    entry = {"collection": collection.name, "indexes": [m.document["name"] for m in models]}
+    try:
+        await collection.create_indexes(models)
+        entry["ok"] = True
+    except Exception as e:
+        entry["ok"] = False
+        entry["error"] = str(e)
+        logger.error(f"Index build on '{collection.name}' failed: {e}")
+    entry["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    if entry["ok"]:
+        logger.info(f"Indexes on '{collection.name}' ready in {entry['duration_ms']}ms")
+    return entry
+
+
+async def ensure_indexes(db, specs: dict = INDEX_SPECS) -> list[dict]:
+    # create_indexes is a no-op for indexes that already exist with the same
+    # definition, so this is safe to run on every startup.
+    report = [await create_collection_indexes(db[name], models) for name, models in specs.items()]
+    last_build_report[:] = report
+    return report
+
+
+async def index_usage_report(db, specs: dict = INDEX_SPECS) -> dict:
+    usage = {}
+    for name in specs:
+        try:
+            stats = await db[name].aggregate([{"$indexStats": {}}]).to_list(None)
+        except Exception as e:
+            usage[name] = {"error": str(e)}
+            continue
+        usage[name] = {
+            stat["name"]: {
+                "ops": stat.get("accesses", {}).get("ops", 0),
+                "since": stat.get("accesses", {}).get("since"),
+            }
+            for stat in stats
+        }
+    return {"builds": last_build_report, "usage": usage}
@@ -1,36 +1,230 @@
 import os
+import time
+import random
+import hashlib
 import logging
+from dataclasses import dataclass
+from typing import Optional
+
 import httpx
 
+from .metrics import email_failures, email_sends
+
 logger = logging.getLogger(__name__)
 
 RESEND_API_KEY = os.getenv("RESEND_API_KEY")
 FROM_EMAIL = os.getenv("FROM_EMAIL")
 
+RESEND_API_URL = os.getenv("RESEND_API_URL", "https://api.resend.com").rstrip("/")
+RESEND_BATCH_LIMIT = 100
+RESEND_TIMEOUT = float(os.getenv("RESEND_TIMEOUT", "20"))
+RESEND_MAX_CONNECTIONS = int(os.getenv("RESEND_MAX_CONNECTIONS", "10"))
+RESEND_MAX_KEEPALIVE = int(os.getenv("RESEND_MAX_KEEPALIVE", "5"))
+RESEND_KEEPALIVE_EXPIRY = float(os.getenv("RESEND_KEEPALIVE_EXPIRY", "30"))
+
+MAIL_RETRY_BASE_DELAY = float(os.getenv("MAIL_RETRY_BASE_DELAY", "1"))
+MAIL_RETRY_MAX_DELAY = float(os.getenv("MAIL_RETRY_MAX_DELAY", "60"))
+
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def open_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=RESEND_TIMEOUT,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=RESEND_MAX_CONNECTIONS,
+                max_keepalive_connections=RESEND_MAX_KEEPALIVE,
+                keepalive_expiry=RESEND_KEEPALIVE_EXPIRY,
+            ),
+        )
+        logger.info(f"Mail HTTP client opened (http2={HTTP2_AVAILABLE}, max_connections={RESEND_MAX_CONNECTIONS})")
+    return _http_client
 
-async def send_email(subject: str, recipients: list[str], body: str):
-    if not RESEND_API_KEY:
-        raise RuntimeError("RESEND_API_KEY not set")
 
-    payload = {
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _auth_headers(idempotency_key: Optional[str] = None) -> dict:
+    headers = {
+        "Authorization": f"Bearer {RESEND_API_KEY}",
+        "Content-Type": "application/json",
+    }
+    if idempotency_key:
+        # Resend drops a repeat of a request it already accepted with the
+        # same key (within 24h), e.g. a retry after a timeout.
+        headers["Idempotency-Key"] = idempotency_key
+    return headers
+
+
+def _payload(subject: str, recipients: list[str], body: str) -> dict:
+    return {
         "from": FROM_EMAIL,
         "to": recipients,
         "subject": subject,
         "html": body,
     }
 
-    async with httpx.AsyncClient(timeout=20) as client:
+
+async def send_email(subject: str, recipients: list[str], body: str, idempotency_key: Optional[str] = None):
+    if not RESEND_API_KEY:
+        raise RuntimeError("RESEND_API_KEY not set")
+
+    # Falls back to opening the shared client lazily when used outside the
+    # app lifecycle (scripts, shell).
+    client = open_http_client()
+    started = time.perf_counter()
+    try:
         response = await client.post(
-            "https://api.resend.com/emails",
-            headers={
-                "Authorization": f"Bearer {RESEND_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json=payload,
+            f"{RESEND_API_URL}/emails",
+            headers=_auth_headers(idempotency_key),
+            json=_payload(subject, recipients, body),
         )
+    except httpx.HTTPError:
+        email_failures.inc("emails")
+        raise
+    finally:
+        email_sends.observe(time.perf_counter() - started, "emails")
 
     if response.status_code >= 400:
+        email_failures.inc("emails")
         logger.error(f"Resend error: {response.text}")
         raise RuntimeError("Email send failed")
 
     logger.info("✅ Email sent via Resend")
+    return response.json().get("id")
+
+
+@dataclass
+class OutgoingEmail:
+    subject: str
+    recipients: list[str]
+    body: str
+    # Stable across retries of the same message (the outbox row id).
+    idempotency_key: Optional[str] = None
+
+    def key(self) -> str:
+        if self.idempotency_key:
+            return self.idempotency_key
+        content = "\x1f".join([self.subject, ",".join(self.recipients), self.body])
+        return hashlib.sha256(content.encode()).hexdigest()
+
+
+@dataclass
+class EmailResult:
+    ok: bool
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+
+async def _send_single(message: OutgoingEmail) -> EmailResult:
+    try:
+        email_id = await send_email(
+            subject=message.subject,
+            recipients=message.recipients,
+            body=message.body,
+            idempotency_key=message.key(),
+        )
+        return EmailResult(ok=True, id=email_id)
+    except Exception as e:
+        return EmailResult(ok=False, error=str(e))
+
+
+def batch_idempotency_key(messages: list[OutgoingEmail]) -> str:
+    # Same messages in the same order -> same key, so re-sending a batch
+    # that timed out after Resend accepted it doesn't deliver it twice.
+    digest = hashlib.sha256("\n".join(m.key() for m in messages).encode()).hexdigest()
+    return f"batch-{digest}"
+
+
+async def _send_chunk(messages: list[OutgoingEmail]) -> list[EmailResult]:
+    client = open_http_client()
+    started = time.perf_counter()
+    try:
+        response = await client.post(
+            f"{RESEND_API_URL}/emails/batch",
+            # Permissive mode sends the valid messages and reports the
+            # invalid ones by index instead of rejecting the whole batch.
+            headers={**_auth_headers(batch_idempotency_key(messages)), "x-batch-validation": "permissive"},
+            json=[_payload(m.subject, m.recipients, m.body) for m in messages],
+        )
+    except httpx.HTTPError as e:
+        email_sends.observe(time.perf_counter() - started, "batch")
+        email_failures.inc("batch")
+        # The provider may have accepted the batch before the timeout, and
+        # resending now would hit the same outage; fail it and let the
+        # caller retry the batch with backoff (same idempotency key).
+        logger.error(f"Resend batch request failed: {e!r}")
+        return [EmailResult(ok=False, error=f"batch request failed: {e!r}") for _ in messages]
+    email_sends.observe(time.perf_counter() - started, "batch")
+
+    if response.status_code >= 400:
+        # 429/5xx/auth: every message failed the same way. Individual sends
+        # would only add load (or be rate-limited too); back off instead.
+        email_failures.inc("batch")
+        logger.error(f"Resend batch error {response.status_code}: {response.text}")
+        error = f"batch rejected with {response.status_code}: {response.text}"
+        return [EmailResult(ok=False, error=error) for _ in messages]
+
+    data = response.json()
+    sent = data.get("data") or []
+    failed = {err.get("index"): err.get("message") for err in data.get("errors") or []}
+
+    results: list[Optional[EmailResult]] = [None] * len(messages)
+    sent_iter = iter(sent)
+    for index in range(len(messages)):
+        if index not in failed:
+            item = next(sent_iter, None)
+            if item is not None:
+                results[index] = EmailResult(ok=True, id=item.get("id"))
+
+    retry = [i for i, result in enumerate(results) if result is None]
+    if retry:
+        email_failures.inc("batch", amount=len(retry))
+        logger.warning(f"Resend batch rejected {len(retry)} of {len(messages)} messages, sending individually")
+        for index in retry:
+            results[index] = await _send_single(messages[index])
+    return results
+
+
+async def send_email_batch(messages: list[OutgoingEmail]) -> list[EmailResult]:
+    """Send messages through Resend's batch endpoint.
+
+    Returns one result per message, in order. Messages the provider rejected
+    from an otherwise accepted batch are retried once as individual sends;
+    if the whole batch call fails, every message is returned as failed for
+    the caller to retry with backoff.
+    """
+    if not messages:
+        return []
+    if not RESEND_API_KEY:
+        return [EmailResult(ok=False, error="RESEND_API_KEY not set") for _ in messages]
+    if len(messages) == 1:
+        return [await _send_single(messages[0])]
+
+    results: list[EmailResult] = []
+    for start in range(0, len(messages), RESEND_BATCH_LIMIT):
+        results.extend(await _send_chunk(messages[start:start + RESEND_BATCH_LIMIT]))
+    logger.info(f"✅ Batch of {len(messages)} emails processed via Resend ({sum(r.ok for r in results)} sent)")
+    return results
+
+
+def backoff_delay(attempt: int, base: float = MAIL_RETRY_BASE_DELAY, cap: float = MAIL_RETRY_MAX_DELAY) -> float:
+    # "Full jitter": uniform over [0, min(cap, base * 2^attempt)] so retries
+    # from a burst of failures don't hit the provider in lockstep.
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
@@ -0,0 +1,475 @@
+import os
+import glob
+import json
+import time
+import asyncio
+import logging
+import threading
+from bisect import bisect_left
+from typing import Callable, Optional
+
+from pymongo import monitoring
+
+# Prometheus' default buckets, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Mongo commands are usually sub-millisecond.
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+# Shared directory for multi-worker mode (gunicorn.conf.py sets it). Each
+# worker writes its samples to <pid>.json every METRICS_FLUSH_INTERVAL
+# seconds; /metrics, served by whichever worker gets the scrape, merges all
+# of them. Unset: a single process reporting only its own samples.
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+ARCHIVE_FILE = "archive.json"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Sharded:
+    """Per-thread storage so the hot path never takes a lock.
+
+    Each thread (the event loop, Motor's executor threads) writes only to its
+    own shard; a scrape sums across shards. The lock is taken once per
+    thread, when its shard is created.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshots(self) -> list[dict]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # dict.copy() is atomic under the GIL, so a concurrent write can't
+        # break the iteration.
+        return [shard.copy() for shard in shards]
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Sharded):
+    kind = "counter"
+    # How samples from several workers combine: "sum" keeps exited
+    # workers' totals (so counters never go backwards), "live_sum" and
+    # "live_mean" only count workers that are still running.
+    aggregate = "sum"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def totals(self) -> dict[tuple, float]:
+        totals: dict[tuple, float] = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def render(self, totals: dict) -> list[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+            for labels, value in sorted(totals.items())
+        ]
+
+    def collect(self) -> list[str]:
+        return self.render(self.totals())
+
+
+class Gauge(Counter):
+    """Up/down gauge. Shards hold deltas, so inc and dec may run on any thread."""
+
+    kind = "gauge"
+    aggregate = "live_sum"
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+    aggregate = "sum"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        shard = self._shard()
+        row = shard.get(labels)
+        if row is None:
+            # One slot per bucket, one for +Inf, then sum.
+            row = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def totals(self) -> dict[tuple, list]:
+        totals: dict[tuple, list] = {}
+        for shard in self._snapshots():
+            for labels, row in shard.items():
+                row = list(row)
+                total = totals.get(labels)
+                totals[labels] = row if total is None else [a + b for a, b in zip(total, row)]
+        return totals
+
+    def collect(self) -> list[str]:
+        return self.render(self.totals())
+
+    def render(self, totals: dict) -> list[str]:
+        lines = self.header()
+        bounds = [*self.buckets, float("inf")]
+        for labels, row in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, row):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(row[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class CallbackGauge:
+    """Gauge or counter read from existing state at scrape time."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], float], kind: str = "gauge", aggregate: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.kind = kind
+        self.aggregate = aggregate or ("sum" if kind == "counter" else "live_sum")
+
+    def totals(self) -> dict[tuple, float]:
+        return {(): self.fn()}
+
+    def render(self, totals: dict) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.kind}",
+            *(f"{self.name} {_format_value(value)}" for value in totals.values()),
+        ]
+
+    def collect(self) -> list[str]:
+        return self.render(self.totals())
+
+
+def _add(a, b):
+    if isinstance(a, list):
+        return [x + y for x, y in zip(a, b)]
+    return a + b
+
+
+def _merge_into(target: dict, samples: dict) -> None:
+    """Add one process's {metric: [[labels, value], ...]} into `target`."""
+    for name, rows in samples.items():
+        merged = target.setdefault(name, {})
+        for labels, value in rows:
+            labels = tuple(labels)
+            merged[labels] = value if labels not in merged else _add(merged[labels], value)
+
+
+def _read(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write(path: str, data: dict) -> None:
+    # Readers in other workers must never see a half-written file.
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(
+        self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def callback(
+        self, name: str, help: str, fn: Callable[[], float], kind: str = "gauge", aggregate: Optional[str] = None
+    ) -> CallbackGauge:
+        return self._register(CallbackGauge(name, help, fn, kind, aggregate))
+
+    def snapshot(self) -> dict:
+        # "archive" names the metrics the master keeps once we exit; it
+        # never imports the app, so it can't look them up in a registry.
+        return {
+            "archive": [name for name, metric in self._metrics.items() if metric.aggregate == "sum"],
+            "samples": {
+                name: [[list(labels), value] for labels, value in metric.totals().items()]
+                for name, metric in self._metrics.items()
+            },
+        }
+
+    def flush(self, directory: Optional[str] = METRICS_DIR) -> None:
+        if directory:
+            _write(os.path.join(directory, f"{os.getpid()}.json"), self.snapshot())
+
+    def render(self, directory: Optional[str] = METRICS_DIR) -> str:
+        if not directory:
+            lines = []
+            for metric in self._metrics.values():
+                lines.extend(metric.collect())
+            return "\n".join(lines) + "\n"
+
+        # Our own samples are current; other workers' are at most one flush
+        # interval old.
+        self.flush(directory)
+        live = [_read(path).get("samples", {}) for path in glob.glob(os.path.join(directory, "[0-9]*.json"))]
+        archive = _read(os.path.join(directory, ARCHIVE_FILE))
+        lines = []
+        for name, metric in self._metrics.items():
+            totals: dict = {}
+            for samples in live:
+                _merge_into(totals, {name: samples.get(name, [])})
+            if metric.aggregate == "sum":
+                _merge_into(totals, {name: archive.get(name, [])})
+            merged = totals.get(name, {})
+            if metric.aggregate == "live_mean" and live:
+                merged = {labels: value / len(live) for labels, value in merged.items()}
+            lines.extend(metric.render(merged))
+        return "\n".join(lines) + "\n"
+
+    def start(self) -> None:
+        if METRICS_DIR and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            # Final samples, for the master to archive when we exit.
+            self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except OSError as e:
+                logger.error(f"Metrics flush failed: {e}")
+
+
+def mark_process_dead(pid: int, directory: Optional[str] = METRICS_DIR) -> None:
+    """Fold an exited worker's counters into the archive and drop its gauges.
+
+    Called by the gunicorn master (child_exit), the only writer of the
+    archive, so there is no lost update between workers.
+    """
+    if not directory:
+        return
+    path = os.path.join(directory, f"{pid}.json")
+    snapshot = _read(path)
+    if snapshot:
+        archive_path = os.path.join(directory, ARCHIVE_FILE)
+        archive: dict = {}
+        _merge_into(archive, _read(archive_path))
+        _merge_into(archive, {name: snapshot["samples"].get(name, []) for name in snapshot["archive"]})
+        _write(archive_path, {
+            name: [[list(labels), value] for labels, value in rows.items()] for name, rows in archive.items()
+        })
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+metrics = MetricsRegistry()
+
+http_requests = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status")
+)
+http_in_flight = metrics.gauge("http_requests_in_flight", "HTTP requests currently being served.")
+mongo_commands = metrics.histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency.", ("command",), MONGO_BUCKETS
+)
+mongo_failures = metrics.counter("mongodb_command_failures_total", "Failed MongoDB commands.", ("command",))
+pool_checkout_wait = metrics.histogram(
+    "mongodb_pool_checkout_wait_seconds", "Time spent waiting for a pooled MongoDB connection.",
+    buckets=MONGO_BUCKETS + (2.5, 5.0),
+)
+pool_checkout_failures = metrics.counter(
+    "mongodb_pool_checkout_failures_total", "Connection checkouts that failed, by reason.", ("reason",)
+)
+pool_connections = metrics.gauge("mongodb_pool_connections", "Open pooled MongoDB connections.")
+pool_checked_out = metrics.gauge("mongodb_pool_checked_out", "MongoDB connections currently in use.")
+email_sends = metrics.histogram("email_send_duration_seconds", "Resend API call latency.", ("endpoint",))
+email_failures = metrics.counter(
+    "email_send_failures_total", "Failed Resend calls and messages rejected from a batch.", ("endpoint",)
+)
+rate_limited = metrics.counter(
+    "rate_limited_requests_total", "Requests rejected by the rate limiter, by route and bucket key.", ("route", "key")
+)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener; pass in the client's event_listeners."""
+
+    def started(self, event) -> None:
+        pass
+
+    def succeeded(self, event) -> None:
+        mongo_commands.observe(event.duration_micros / 1e6, event.command_name)
+
+    def failed(self, event) -> None:
+        mongo_commands.observe(event.duration_micros / 1e6, event.command_name)
+        mongo_failures.inc(event.command_name)
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool listener recording how long checkouts wait.
+
+    A checkout starts and finishes on the same thread, so the start time is
+    kept thread-local. Newer pymongo versions report the duration directly.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event) -> None:
+        self._local.started = time.perf_counter()
+
+    def _waited(self, event) -> float:
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            return duration
+        started = getattr(self._local, "started", None)
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def connection_checked_out(self, event) -> None:
+        pool_checkout_wait.observe(self._waited(event))
+        pool_checked_out.inc()
+
+    def connection_check_out_failed(self, event) -> None:
+        pool_checkout_wait.observe(self._waited(event))
+        pool_checkout_failures.inc(str(event.reason))
+
+    def connection_checked_in(self, event) -> None:
+        pool_checked_out.dec()
+
+    def connection_created(self, event) -> None:
+        pool_connections.inc()
+
+    def connection_closed(self, event) -> None:
+        pool_connections.dec()
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request.
+
+    Requests are labelled with the route template (/api/products/{product_id})
+    rather than the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Optional[dict] = None
+
+    def _route_label(self, scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._route_paths is None:
+            router = scope["app"].router
+            self._route_paths = {
+                getattr(r, "endpoint", None): r.path for r in router.routes if hasattr(r, "path")
+            }
+        return self._route_paths.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            http_requests.observe(
+                time.perf_counter() - started, scope["method"], self._route_label(scope), str(status)
+            )
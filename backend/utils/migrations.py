@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+from .specs import normalize_specs
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMPED_COLLECTIONS = ["products", "leads", "quotes", "orders"]
+
+
+def parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+async def migrate_created_at(
+    collection,
+    batch_size: int = 500,
+    pause: float = 0.0,
+    dry_run: bool = False,
+) -> dict:
+    """Rewrite string created_at values on one collection as BSON dates.
+
+    Works in batches so it can run against a live database. Each update is
+    conditional on the old string still being there, so documents written or
+    modified concurrently are never clobbered.
+    """
+    query = {"created_at": {"$type": "string"}}
+    converted = 0
+    skipped = []
+    last_id = None
+
+    while True:
+        # Walk by _id so unparseable documents (left as strings) are not
+        # picked up again on the next batch.
+        batch_query = {**query, "_id": {"$gt": last_id}} if last_id is not None else query
+        docs = await (
+            collection.find(batch_query, {"_id": 1, "created_at": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+            .to_list(batch_size)
+        )
+        if not docs:
+            break
+        last_id = docs[-1]["_id"]
+
+        updates = []
+        for doc in docs:
+            try:
+                value = parse_timestamp(doc["created_at"])
+            except ValueError:
+                skipped.append(str(doc["_id"]))
+                continue
+            updates.append(
+                UpdateOne(
+                    {"_id": doc["_id"], "created_at": doc["created_at"]},
+                    {"$set": {"created_at": value}},
+                )
+            )
+
+        if updates and not dry_run:
+            result = await collection.bulk_write(updates, ordered=False)
+            converted += result.modified_count
+        else:
+            converted += len(updates)
+
+        logger.info(f"{collection.name}: {converted} timestamps converted so far")
+        if pause:
+            await asyncio.sleep(pause)
+
+    if skipped:
+        logger.warning(f"{collection.name}: {len(skipped)} unparseable created_at values left as-is")
+    return {"collection": collection.name, "converted": converted, "skipped": skipped, "dry_run": dry_run}
+
+
+async def backfill_spec_values(collection, batch_size: int = 500, pause: float = 0.0, dry_run: bool = False) -> dict:
+    """Store parsed spec_values on products written before they existed."""
+    updated = 0
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        docs = await (
+            collection.find(query, {"_id": 1, "specs": 1, "spec_values": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+            .to_list(batch_size)
+        )
+        if not docs:
+            break
+        last_id = docs[-1]["_id"]
+
+        updates = []
+        for doc in docs:
+            spec_values = normalize_specs(doc.get("specs"))
+            if doc.get("spec_values") != spec_values:
+                # Guard on specs so a concurrent edit isn't overwritten with
+                # values parsed from the old specs.
+                updates.append(
+                    UpdateOne(
+                        {"_id": doc["_id"], "specs": doc.get("specs")},
+                        {"$set": {"spec_values": spec_values}},
+                    )
+                )
+        if updates and not dry_run:
+            result = await collection.bulk_write(updates, ordered=False)
+            updated += result.modified_count
+        else:
+            updated += len(updates)
+
+        logger.info(f"{collection.name}: {updated} products backfilled so far")
+        if pause:
+            await asyncio.sleep(pause)
+
+    return {"collection": collection.name, "updated": updated, "dry_run": dry_run}
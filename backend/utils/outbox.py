@@ -0,0 +1,235 @@
+import os
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+from .mailer import EmailResult, OutgoingEmail, backoff_delay, send_email_batch
+from .templates import TemplateError, email_templates
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "outbox"
+
+OUTBOX_TRANSACTIONS = os.getenv("OUTBOX_TRANSACTIONS", "true").lower() in ("1", "true", "yes")
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETENTION = int(os.getenv("OUTBOX_RETENTION", str(7 * 24 * 3600)))
+
+# Server error code for "Transaction numbers are only allowed on a replica
+# set member or mongos", i.e. a standalone deployment.
+ILLEGAL_OPERATION = 20
+
+
+def email_message(template: str, recipients: list[str], context: dict) -> dict:
+    # Rendered at send time, so the row stays small and template fixes
+    # apply to anything still queued.
+    return {"kind": "email", "template": template, "recipients": recipients, "context": context}
+
+
+def _render(doc: dict) -> OutgoingEmail:
+    if "template" not in doc:
+        message = OutgoingEmail(subject=doc["subject"], recipients=doc["recipients"], body=doc["html"])
+    else:
+        message = email_templates.email(doc["template"], doc["recipients"], doc["context"])
+    message.idempotency_key = f"outbox-{doc['_id']}"
+    return message
+
+
+def _outbox_docs(messages: list[dict], source: dict) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "_id": str(uuid.uuid4()),
+            **message,
+            "source": source,
+            "status": "pending",
+            "attempts": 0,
+            "available_at": now,
+            "created_at": now,
+        }
+        for message in messages
+    ]
+
+
+class Outbox:
+    """Writes records together with their notifications, and delivers them.
+
+    On a replica set the record and its outbox rows are written in one
+    transaction. On a standalone server (no transactions) the outbox rows are
+    written straight after the record.
+    """
+
+    def __init__(self):
+        self.transactions = OUTBOX_TRANSACTIONS
+        self.sent = 0
+        self.failed = 0
+        self.dead = 0
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._owner = uuid.uuid4().hex
+
+    async def insert(self, client, db, collection: str, doc: dict, messages: list[dict]) -> None:
+        outbox_docs = _outbox_docs(messages, {"collection": collection, "id": doc.get("id")})
+        if self.transactions:
+            try:
+                async with await client.start_session() as session:
+                    async with session.start_transaction():
+                        await db[collection].insert_one(doc, session=session)
+                        if outbox_docs:
+                            await db[COLLECTION].insert_many(outbox_docs, session=session)
+                self._wakeup.set()
+                return
+            except OperationFailure as e:
+                if e.code != ILLEGAL_OPERATION:
+                    raise
+                logger.warning("MongoDB deployment doesn't support transactions; writing outbox rows separately")
+                self.transactions = False
+                # The transaction was aborted, so nothing was written.
+                doc.pop("_id", None)
+
+        await db[collection].insert_one(doc)
+        if outbox_docs:
+            await db[COLLECTION].insert_many(outbox_docs)
+        self._wakeup.set()
+
+    def start(self, db) -> None:
+        if self._task is None:
+            self._db = db
+            self._task = asyncio.create_task(self._run(), name="outbox-dispatcher")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                delivered = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox dispatch failed: {e}")
+                delivered = 0
+            if delivered:
+                continue  # there may be more waiting
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _lease(self, collection, limit: int) -> list[dict]:
+        now = datetime.now(timezone.utc)
+        due = {
+            "$or": [
+                {"status": "pending", "available_at": {"$lte": now}},
+                # Lease expired: the worker that took it died mid-send.
+                {"status": "leased", "lease_until": {"$lt": now}},
+            ]
+        }
+        candidates = await collection.find(due, {"_id": 1}).sort([("available_at", 1), ("_id", 1)]).limit(limit).to_list(limit)
+        if not candidates:
+            return []
+        token = f"{self._owner}:{uuid.uuid4().hex}"
+        await collection.update_many(
+            {"$and": [{"_id": {"$in": [doc["_id"] for doc in candidates]}}, due]},
+            {"$set": {
+                "status": "leased",
+                "lease_token": token,
+                "lease_until": now + timedelta(seconds=OUTBOX_LEASE_SECONDS),
+            }},
+        )
+        return await collection.find({"lease_token": token, "status": "leased"}).to_list(limit)
+
+    async def dispatch_once(self, limit: int = OUTBOX_BATCH_SIZE) -> int:
+        collection = self._db[COLLECTION]
+        batch = await self._lease(collection, limit)
+        if not batch:
+            return 0
+
+        results: list[Optional[EmailResult]] = [None] * len(batch)
+        messages, positions, broken = [], [], set()
+        for i, doc in enumerate(batch):
+            try:
+                messages.append(_render(doc))
+                positions.append(i)
+            except TemplateError as e:
+                # Retrying won't fix a broken template; dead-letter it now.
+                broken.add(i)
+                results[i] = EmailResult(ok=False, error=str(e))
+        if messages:
+            for i, result in zip(positions, await send_email_batch(messages)):
+                results[i] = result
+
+        now = datetime.now(timezone.utc)
+        updates = []
+        # One jittered delay per attempt count, so rows that failed together
+        # (a whole failed batch) come due together and are re-sent as the
+        # same batch, under the same idempotency key.
+        delays: dict[int, float] = {}
+        for i, (doc, result) in enumerate(zip(batch, results)):
+            match = {"_id": doc["_id"], "lease_token": doc["lease_token"]}
+            attempts = doc.get("attempts", 0) + 1
+            if result.ok:
+                self.sent += 1
+                updates.append(UpdateOne(match, {
+                    "$set": {"status": "sent", "sent_at": now, "attempts": attempts, "provider_id": result.id},
+                    "$unset": {"lease_token": "", "lease_until": ""},
+                }))
+            elif attempts >= OUTBOX_MAX_ATTEMPTS or i in broken:
+                self.dead += 1
+                logger.error(f"Outbox message {doc['_id']} dead-lettered after {attempts} attempts: {result.error}")
+                updates.append(UpdateOne(match, {
+                    "$set": {"status": "dead", "attempts": attempts, "last_error": result.error, "failed_at": now},
+                    "$unset": {"lease_token": "", "lease_until": ""},
+                }))
+            else:
+                self.failed += 1
+                delay = delays.setdefault(attempts, backoff_delay(attempts - 1))
+                updates.append(UpdateOne(match, {
+                    "$set": {
+                        "status": "pending",
+                        "attempts": attempts,
+                        "last_error": result.error,
+                        "available_at": now + timedelta(seconds=delay),
+                    },
+                    "$unset": {"lease_token": "", "lease_until": ""},
+                }))
+        await collection.bulk_write(updates, ordered=False)
+        return len(batch)
+
+    async def stats(self, db) -> dict:
+        collection = db[COLLECTION]
+        counts = {
+            row["_id"]: row["count"]
+            async for row in collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
+        }
+        oldest = await collection.find_one(
+            {"status": {"$in": ["pending", "leased"]}}, {"created_at": 1}, sort=[("created_at", 1)]
+        )
+        oldest_age = None
+        if oldest is not None:
+            created_at = oldest["created_at"]
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)
+            oldest_age = round((datetime.now(timezone.utc) - created_at).total_seconds(), 3)
+        return {
+            "depth": counts.get("pending", 0) + counts.get("leased", 0),
+            "oldest_pending_age_seconds": oldest_age,
+            "by_status": counts,
+            "dispatched": {"sent": self.sent, "retried": self.failed, "dead": self.dead},
+            "transactions": self.transactions,
+        }
+
+
+outbox = Outbox()
@@ -0,0 +1,105 @@
+import json
+import base64
+from datetime import datetime
+from typing import Iterable, Optional
+
+from fastapi import HTTPException, Response
+from pydantic import TypeAdapter
+
+from .serialization import dump_documents, dump_raw
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Keyset order shared by every paginated collection. Ascending matches the
+# insertion order the unpaginated endpoints have always returned.
+SORT_KEYS = [("created_at", 1), ("id", 1)]
+
+# Mongo sorts missing/null created_at before ISO strings (documents not yet
+# converted by migrate_created_at.py) and strings before dates, but $gt
+# only matches values of the cursor's own type. A page ending on a legacy
+# document must also reach every later type, or nothing written since the
+# string -> date switch would ever be paged to.
+LATER_TYPES = {type(None): ["string", "date"], str: ["date"]}
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(doc: dict) -> str:
+    raw = json.dumps([_encode_value(doc.get("created_at")), doc.get("id")], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(padded))
+        return _decode_value(created_at), doc_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[dict]:
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    # The cursor is built from these two, so they are always returned.
+    projection = {"_id": 0, "id": 1, "created_at": 1}
+    projection.update({f: 1 for f in requested})
+    return projection
+
+
+async def fetch_page(
+    collection,
+    query: dict,
+    limit: int,
+    after: Optional[str] = None,
+    projection: Optional[dict] = None,
+) -> tuple[list[dict], Optional[str]]:
+    if after:
+        created_at, doc_id = decode_cursor(after)
+        keyset = {
+            "$or": [
+                {"created_at": {"$gt": created_at}},
+                {"created_at": created_at, "id": {"$gt": doc_id}},
+            ]
+        }
+        for bson_type in LATER_TYPES.get(type(created_at), ()):
+            keyset["$or"].append({"created_at": {"$type": bson_type}})
+        query = {"$and": [query, keyset]} if query else keyset
+
+    # Fetch one extra document to learn whether another page exists
+    # without a separate count query.
+    cursor = collection.find(query, projection or {"_id": 0}).sort(SORT_KEYS).limit(limit + 1)
+    docs = await cursor.to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1])
+    return docs, next_cursor
+
+
+def page_response(docs: list[dict], next_cursor: Optional[str], adapter: Optional[TypeAdapter] = None) -> Response:
+    # Full documents go through the response model as before; projected
+    # ones are partial and are returned as stored.
+    if adapter is not None:
+        body = dump_documents(docs, adapter)
+    else:
+        body = dump_raw(docs)
+    response = Response(content=body, media_type="application/json")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
@@ -0,0 +1,86 @@
+from typing import Iterable
+
+from fastapi import HTTPException
+
+from .catalog_store import catalog_store
+
+# Client prices are floats from JS; allow rounding noise, nothing more.
+PRICE_TOLERANCE = 0.01
+
+PRICE_FIELDS = {"_id": 0, "id": 1, "name": 1, "sale_price": 1, "in_stock": 1, "backorder": 1}
+
+
+class PriceTable:
+    """Product id -> current price and stock flags.
+
+    Read from the in-memory catalog store, which its change stream keeps
+    current. Ids it doesn't hold (not loaded yet, or just written by
+    another worker) are fetched with a single $in query, so pricing an
+    order costs at most one round-trip however many lines it has.
+    """
+
+    def __init__(self, store=catalog_store):
+        self.store = store
+
+    async def resolve(self, db, product_ids: Iterable[str]) -> dict[str, dict]:
+        result = {}
+        missing = []
+        for product_id in set(product_ids):
+            product = self.store.get(product_id)
+            if product is None:
+                missing.append(product_id)
+            else:
+                result[product_id] = product
+        if missing:
+            found = await db.products.find({"id": {"$in": missing}}, PRICE_FIELDS).to_list(len(missing))
+            for product in found:
+                result[product["id"]] = product
+        return result
+
+
+price_table = PriceTable()
+
+
+async def price_order(db, items: list, client_total: float) -> tuple[list[dict], float]:
+    """Re-price order lines from the catalog and reject anything that doesn't match.
+
+    Returns the line items with catalog names and prices, and the
+    recomputed total.
+    """
+    catalog = await price_table.resolve(db, (item.product_id for item in items))
+
+    errors = []
+    priced = []
+    for item in items:
+        product = catalog.get(item.product_id)
+        if product is None:
+            errors.append({"product_id": item.product_id, "error": "unknown product"})
+            continue
+        if not product.get("in_stock", True) and not product.get("backorder", False):
+            errors.append({"product_id": item.product_id, "error": "out of stock"})
+            continue
+        if abs(item.price - product["sale_price"]) > PRICE_TOLERANCE:
+            errors.append({
+                "product_id": item.product_id,
+                "error": "price changed",
+                "price": product["sale_price"],
+            })
+            continue
+        priced.append({
+            "product_id": item.product_id,
+            "name": product["name"],
+            "quantity": item.quantity,
+            "price": product["sale_price"],
+        })
+
+    if errors:
+        status = 422 if any(e["error"] == "unknown product" for e in errors) else 409
+        raise HTTPException(status_code=status, detail={"message": "Order could not be priced", "items": errors})
+
+    total = round(sum(line["price"] * line["quantity"] for line in priced), 2)
+    if abs(total - client_total) > PRICE_TOLERANCE:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Order total does not match item prices", "total": total},
+        )
+    return priced, total
@@ -0,0 +1,342 @@
+import os
+import math
+import time
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from .metrics import rate_limited
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "rate_limits"
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# "memory" keeps buckets per worker: every worker enforces the full budget,
+# so N workers allow up to N times each limit below. "mongo" shares them
+# across workers and instances (gunicorn.conf.py picks it for > 1 worker).
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory")
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "64"))
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "100000"))
+# Number of reverse proxies in front of the app that append to
+# X-Forwarded-For. 0 uses the socket peer address, which behind a proxy is
+# the proxy's (gunicorn.conf.py defaults this to 1 for Railway).
+RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "0"))
+# Larger bodies are still passed on, just not parsed for the email key.
+RATE_LIMIT_MAX_BODY = int(os.getenv("RATE_LIMIT_MAX_BODY", str(64 * 1024)))
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A token bucket: `capacity` requests at once, refilled at `rate` per second."""
+
+    name: str
+    key: str  # "ip" or "email"
+    capacity: float
+    rate: float
+
+
+def parse_rules(spec: str) -> tuple[Rule, ...]:
+    """Parse "ip:10/10m,email:5/h" (count per period, period in s/m/h/d)."""
+    rules = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        key, _, budget = part.partition(":")
+        count, _, period = budget.partition("/")
+        unit = period[-1:]
+        if key not in ("ip", "email") or unit not in PERIODS:
+            raise ValueError(f"Invalid rate limit rule: {part!r}")
+        seconds = float(period[:-1] or 1) * PERIODS[unit]
+        rules.append(Rule(part, key, float(count), float(count) / seconds))
+    return tuple(rules)
+
+
+@dataclass(frozen=True)
+class RouteLimit:
+    rules: tuple[Rule, ...]
+    # JSON body field holding the submitter's email, for "email" rules.
+    email_field: Optional[str] = None
+
+
+# Unauthenticated POSTs that write to Mongo and send paid email.
+RATE_LIMITS = {
+    "/api/leads": RouteLimit(parse_rules(os.getenv("RATE_LIMIT_LEADS", "ip:10/10m,email:5/h")), "email"),
+    "/api/quotes": RouteLimit(parse_rules(os.getenv("RATE_LIMIT_QUOTES", "ip:10/10m,email:5/h")), "email"),
+    "/api/orders": RouteLimit(
+        parse_rules(os.getenv("RATE_LIMIT_ORDERS", "ip:20/10m,email:10/h")), "customer_email"
+    ),
+}
+
+
+class MemoryBucketStore:
+    """Per-process token buckets, split into shards by key hash.
+
+    Each bucket is [tokens, updated_at, full_at]. A bucket past full_at is
+    the same as no bucket, so it can be dropped. Sharding keeps that cleanup
+    cheap: when a shard fills up, only that shard is swept (at most once a
+    second), and if it is still full its oldest buckets are evicted.
+    """
+
+    asynchronous = False
+
+    def __init__(self, shards: int = RATE_LIMIT_SHARDS, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        shards = 1 << max(0, shards - 1).bit_length()  # power of two, for masking
+        self._shards: list[dict[str, list]] = [{} for _ in range(shards)]
+        self._swept_at = [0.0] * shards
+        self._mask = shards - 1
+        self._shard_size = max(1, max_buckets // shards)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> float:
+        """Take one token. Returns 0 if allowed, else seconds until a token is available."""
+        index = hash(key) & self._mask
+        shard = self._shards[index]
+        bucket = shard.get(key)
+        if bucket is None:
+            if len(shard) >= self._shard_size:
+                self._make_room(index, now)
+            shard[key] = [capacity - 1, now, now + 1 / rate]
+            return 0.0
+        tokens = bucket[0] + (now - bucket[1]) * rate
+        if tokens > capacity:
+            tokens = capacity
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return (1 - tokens) / rate
+        bucket[0] = tokens - 1
+        bucket[2] = now + (capacity - bucket[0]) / rate
+        return 0.0
+
+    def _make_room(self, index: int, now: float) -> None:
+        shard = self._shards[index]
+        if now - self._swept_at[index] >= 1:
+            self._swept_at[index] = now
+            for key in [key for key, bucket in shard.items() if bucket[2] <= now]:
+                del shard[key]
+        # Still full: a flood of distinct keys. Evict the oldest buckets.
+        while len(shard) >= self._shard_size:
+            del shard[next(iter(shard))]
+
+
+class MongoBucketStore:
+    """Token buckets shared by every worker, one document per bucket.
+
+    Refill and take happen in a single pipeline upsert, so concurrent
+    requests from different workers can't both spend the last token. Idle
+    buckets expire through a TTL index on expires_at.
+    """
+
+    asynchronous = True
+
+    def __init__(self, db):
+        self._collection = db[COLLECTION]
+
+    async def take(self, key: str, capacity: float, rate: float, now: float) -> float:
+        now = time.time()  # wall clock, shared across processes
+        elapsed = {"$max": [0, {"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}]}
+        refilled = {"$min": [capacity, {"$add": [{"$ifNull": ["$tokens", capacity]}, {"$multiply": [elapsed, rate]}]}]}
+        pipeline = [
+            {"$set": {
+                "tokens": refilled,
+                "updated_at": now,
+                "expires_at": datetime.now(timezone.utc) + timedelta(seconds=capacity / rate),
+            }},
+            {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+            {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]}}},
+        ]
+        for attempt in range(2):
+            try:
+                doc = await self._collection.find_one_and_update(
+                    {"_id": key},
+                    pipeline,
+                    projection={"tokens": 1, "allowed": 1},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                )
+                break
+            except DuplicateKeyError:
+                # Two workers created the bucket at once; the retry updates it.
+                if attempt:
+                    raise
+        return 0.0 if doc["allowed"] else (1 - doc["tokens"]) / rate
+
+
+class RateLimiter:
+    def __init__(self, limits: dict[str, RouteLimit] = RATE_LIMITS, enabled: bool = RATE_LIMIT_ENABLED):
+        self.limits = limits
+        self.enabled = enabled
+        self.store = MemoryBucketStore()
+        self.rejected = 0
+        self.store_errors = 0
+        # (path, key) -> ((bucket key prefix, capacity, rate), ...), so a
+        # check is a lookup and one string concatenation per rule.
+        self._buckets: dict[tuple[str, str], tuple[tuple[str, float, float], ...]] = {}
+        for path, route in limits.items():
+            for key in ("ip", "email"):
+                self._buckets[path, key] = tuple(
+                    (f"{path}|{rule.name}|", rule.capacity, rule.rate) for rule in route.rules if rule.key == key
+                )
+
+    def start(self, db) -> None:
+        if RATE_LIMIT_STORE == "mongo":
+            self.store = MongoBucketStore(db)
+        logger.info(f"Rate limiting {'enabled' if self.enabled else 'disabled'} ({RATE_LIMIT_STORE} store)")
+
+    def hit(self, path: str, key: str, value: str) -> float:
+        """Spend one token from every `key` bucket of the route.
+
+        Returns the longest wait in seconds, 0 if allowed. In-memory store
+        only; see hit_shared.
+        """
+        wait = 0.0
+        now = time.monotonic()
+        take = self.store.take
+        for prefix, capacity, rate in self._buckets[path, key]:
+            rule_wait = take(prefix + value, capacity, rate, now)
+            if rule_wait > wait:
+                wait = rule_wait
+        return wait
+
+    async def hit_shared(self, path: str, key: str, value: str) -> float:
+        """hit() against an asynchronous (Mongo) store."""
+        wait = 0.0
+        for prefix, capacity, rate in self._buckets[path, key]:
+            try:
+                rule_wait = await self.store.take(prefix + value, capacity, rate, 0.0)
+            except PyMongoError as e:
+                # Fail open: an outage of the limiter store shouldn't take
+                # the lead forms down with it.
+                self.store_errors += 1
+                logger.error(f"Rate limit store failed: {e}")
+                rule_wait = 0.0
+            if rule_wait > wait:
+                wait = rule_wait
+        return wait
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "store": RATE_LIMIT_STORE,
+            "buckets": len(self.store) if isinstance(self.store, MemoryBucketStore) else None,
+            "rejected": self.rejected,
+            "store_errors": self.store_errors,
+        }
+
+
+def client_ip(scope, proxy_hops: int = RATE_LIMIT_PROXY_HOPS) -> str:
+    if proxy_hops:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                # The right-most entries were added by our own proxies;
+                # anything left of them is client-controlled.
+                hops = [hop.strip() for hop in value.decode("latin-1").split(",")]
+                return hops[max(0, len(hops) - proxy_hops)]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def body_email(body: bytes, field: str) -> Optional[str]:
+    if not body or len(body) > RATE_LIMIT_MAX_BODY:
+        return None
+    try:
+        data = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None  # the endpoint will reject it with a 422
+    value = data.get(field) if isinstance(data, dict) else None
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return value.strip().lower()
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying per-route token buckets to POST requests.
+
+    The client IP is checked before the body is read, so floods are turned
+    away without buffering anything. Routes with an email rule then buffer
+    the JSON body to find the address and replay it to the endpoint. Other
+    requests pass through after one dict lookup.
+    """
+
+    def __init__(self, app, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        limiter = self.limiter
+        path = scope["path"]
+        route = limiter.limits.get(path)
+        if route is None or not limiter.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        shared = limiter.store.asynchronous
+        ip = client_ip(scope)
+        wait = await limiter.hit_shared(path, "ip", ip) if shared else limiter.hit(path, "ip", ip)
+        if wait:
+            await self._reject(scope, receive, send, path, "ip", wait)
+            return
+
+        if route.email_field is not None:
+            body, disconnect = await _read_body(receive)
+            if disconnect is not None:
+                return  # client went away mid-upload
+            receive = _replay(body, receive)
+            email = body_email(body, route.email_field)
+            if email is not None:
+                wait = await limiter.hit_shared(path, "email", email) if shared else limiter.hit(path, "email", email)
+                if wait:
+                    await self._reject(scope, receive, send, path, "email", wait)
+                    return
+
+        await self.app(scope, receive, send)
+
+    async def _reject(self, scope, receive, send, path: str, key: str, wait: float) -> None:
+        self.limiter.rejected += 1
+        rate_limited.inc(path, key)
+        retry_after = max(1, math.ceil(wait))
+        response = ORJSONResponse(
+            {"detail": f"Too many requests. Try again in {retry_after} seconds."},
+            status_code=429,
+            headers={"Retry-After": str(retry_after)},
+        )
+        await response(scope, receive, send)
+
+
+async def _read_body(receive) -> tuple[bytes, Optional[dict]]:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return b"".join(chunks), message
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks), None
+
+
+def _replay(body: bytes, receive):
+    pending = True
+
+    async def replay():
+        nonlocal pending
+        if pending:
+            pending = False
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,86 @@
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from .serialization import dump_raw
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _intern_dict(values: Optional[dict]) -> Optional[dict]:
+    if values is None:
+        return None
+    return {sys.intern(key): _intern(value) for key, value in values.items()}
+
+
+@dataclass(frozen=True, slots=True)
+class ProductRecord:
+    """Read-only, slotted copy of a validated Product.
+
+    Built once per product write (the catalog store holds one per SKU) and
+    shared by every request and index until the product changes. Values
+    that repeat across the catalog — category, spec keys and values such as
+    the warranty text, units, features — are interned, so 10k SKUs share a
+    few hundred strings instead of holding their own copies.
+
+    Supports read-only mapping access (record["id"], record.get("specs"))
+    so the search, spec and sizing indexes take records or dicts alike.
+    """
+
+    id: str
+    name: str
+    category: str
+    description: str
+    regular_price: float
+    sale_price: float
+    image_url: str
+    specs: Optional[dict]
+    spec_values: Optional[dict]
+    features: Optional[list]
+    in_stock: bool
+    backorder: bool
+    created_at: datetime
+
+    @classmethod
+    def from_product(cls, product: dict) -> "ProductRecord":
+        """Build from Product(...).model_dump() output."""
+        spec_values = product.get("spec_values")
+        if spec_values is not None:
+            spec_values = {sys.intern(key): _intern_dict(value) for key, value in spec_values.items()}
+        features = product.get("features")
+        return cls(
+            id=product["id"],
+            name=product["name"],
+            # str() drops the enum wrapper; the value is what gets compared and serialized.
+            category=sys.intern(str(getattr(product["category"], "value", product["category"]))),
+            description=product["description"],
+            regular_price=product["regular_price"],
+            sale_price=product["sale_price"],
+            image_url=product["image_url"],
+            specs=_intern_dict(product.get("specs")),
+            spec_values=spec_values,
+            features=[_intern(feature) for feature in features] if features is not None else None,
+            in_stock=product["in_stock"],
+            backorder=product["backorder"],
+            created_at=product["created_at"],
+        )
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+
+def dump_records(records) -> bytes:
+    """Serialize one record or a list of them to the Product JSON shape.
+
+    orjson walks the slots directly; no per-request model instances.
+    """
+    return dump_raw(records)
@@ -0,0 +1,195 @@
+import re
+import bisect
+from collections import defaultdict
+from typing import Iterable, Optional
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*[a-z0-9]*")
+
+# Relative weight of a match in each text field.
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "features": 1.0,
+    "description": 1.0,
+}
+
+FACET_KEYS = ("power", "capacity", "chemistry", "mount")
+
+SORTS = ("relevance", "price_asc", "price_desc", "newest", "name")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def _facet_value(value) -> str:
+    return str(value).strip().lower()
+
+
+class ProductSearchIndex:
+    """In-memory inverted index over the product catalog.
+
+    Text postings map token -> {product id: score}. Facets map spec key ->
+    normalized value -> ids. Products can be added or replaced one at a time,
+    so a single create doesn't require a full rebuild.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self) -> None:
+        self._products: dict[str, dict] = {}
+        self._postings: dict[str, dict[str, float]] = defaultdict(dict)
+        self._doc_tokens: dict[str, set[str]] = {}
+        self._facets: dict[str, dict[str, set[str]]] = {key: defaultdict(set) for key in FACET_KEYS}
+        self._vocabulary: list[str] = []
+        self._vocabulary_dirty = False
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def get(self, product_id: str) -> Optional[dict]:
+        return self._products.get(product_id)
+
+    def rebuild(self, products: Iterable[dict]) -> None:
+        self._reset()
+        for product in products:
+            self.add(product)
+
+    def add(self, product: dict) -> None:
+        product_id = product["id"]
+        if product_id in self._products:
+            self.remove(product_id)
+        self._products[product_id] = product
+
+        scores: dict[str, float] = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            value = product.get(field)
+            if not value:
+                continue
+            text = " ".join(value) if isinstance(value, list) else value
+            for token in tokenize(text):
+                scores[token] += weight
+        for token, score in scores.items():
+            if token not in self._postings:
+                self._vocabulary_dirty = True
+            self._postings[token][product_id] = score
+        self._doc_tokens[product_id] = set(scores)
+
+        specs = product.get("specs") or {}
+        for key in FACET_KEYS:
+            if key in specs:
+                self._facets[key][_facet_value(specs[key])].add(product_id)
+
+    def remove(self, product_id: str) -> None:
+        product = self._products.pop(product_id, None)
+        if product is None:
+            return
+        for token in self._doc_tokens.pop(product_id, ()):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(product_id, None)
+                if not postings:
+                    del self._postings[token]
+                    self._vocabulary_dirty = True
+        specs = product.get("specs") or {}
+        for key in FACET_KEYS:
+            if key in specs:
+                self._facets[key][_facet_value(specs[key])].discard(product_id)
+
+    def _expand(self, token: str) -> list[str]:
+        # Prefix match against the sorted vocabulary, so "lifep" finds
+        # "lifepo4" and partial words work while typing.
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect.bisect_left(self._vocabulary, token)
+        matches = []
+        for candidate in self._vocabulary[start:]:
+            if not candidate.startswith(token):
+                break
+            matches.append(candidate)
+        return matches
+
+    def _text_scores(self, query: str) -> Optional[dict[str, float]]:
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        scores: Optional[dict[str, float]] = None
+        # Every query token must match (AND); scores add up across tokens.
+        for token in tokens:
+            token_scores: dict[str, float] = defaultdict(float)
+            for term in self._expand(token):
+                exact = 1.0 if term == token else 0.5
+                for product_id, score in self._postings[term].items():
+                    token_scores[product_id] = max(token_scores[product_id], score * exact)
+            if scores is None:
+                scores = dict(token_scores)
+            else:
+                scores = {pid: scores[pid] + s for pid, s in token_scores.items() if pid in scores}
+            if not scores:
+                return {}
+        return scores
+
+    def search(
+        self,
+        q: Optional[str] = None,
+        category: Optional[str] = None,
+        facets: Optional[dict[str, str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: Optional[bool] = None,
+        backorder: Optional[bool] = None,
+        sort: str = "relevance",
+        limit: int = 20,
+        offset: int = 0,
+    ) -> dict:
+        scores = self._text_scores(q) if q else None
+        candidates = set(scores) if scores is not None else set(self._products)
+
+        for key, value in (facets or {}).items():
+            candidates &= self._facets[key].get(_facet_value(value), set())
+
+        matched = []
+        for product_id in candidates:
+            product = self._products[product_id]
+            if category and product.get("category") != category:
+                continue
+            price = product.get("sale_price", 0)
+            if min_price is not None and price < min_price:
+                continue
+            if max_price is not None and price > max_price:
+                continue
+            if in_stock is not None and bool(product.get("in_stock")) != in_stock:
+                continue
+            if backorder is not None and bool(product.get("backorder")) != backorder:
+                continue
+            matched.append(product)
+
+        if sort == "price_asc":
+            matched.sort(key=lambda p: (p.get("sale_price", 0), p["id"]))
+        elif sort == "price_desc":
+            matched.sort(key=lambda p: (-p.get("sale_price", 0), p["id"]))
+        elif sort == "newest":
+            matched.sort(key=lambda p: (p.get("created_at"), p["id"]), reverse=True)
+        elif sort == "name":
+            matched.sort(key=lambda p: (p.get("name", "").lower(), p["id"]))
+        elif scores is not None:
+            matched.sort(key=lambda p: (-scores[p["id"]], p["id"]))
+        else:
+            matched.sort(key=lambda p: (p.get("name", "").lower(), p["id"]))
+
+        facet_counts = {key: defaultdict(int) for key in FACET_KEYS}
+        for product in matched:
+            specs = product.get("specs") or {}
+            for key in FACET_KEYS:
+                if key in specs:
+                    facet_counts[key][str(specs[key])] += 1
+
+        return {
+            "total": len(matched),
+            "items": matched[offset:offset + limit],
+            "facets": {key: dict(counts) for key, counts in facet_counts.items()},
+        }
+
+
+search_index = ProductSearchIndex()
@@ -0,0 +1,535 @@
+import io
+import os
+import csv
+import json
+import re
+import uuid
+import hashlib
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+
+import orjson
+from pymongo import UpdateOne
+
+from .catalog_sync import COLLECTION as META_COLLECTION, VERSION_ID
+from .indexes import INDEX_SPECS, create_collection_indexes
+
+logger = logging.getLogger(__name__)
+
+SEED_PRODUCTS_FILE = os.getenv("SEED_PRODUCTS_FILE")
+
+SEED_HASH_ID = "seed_hash"
+
+# PRODUCTS FROM COMPETITOR SITES - PRICES UNDERCUT SLIGHTLY
+DEFAULT_PRODUCTS = [
+    # ===== INVERTERS =====
+    # Deye 6kW - Enersave: Sale $295,000 / Reg $421,500 - We undercut
+    {
+        "name": "Deye SUN-6K-SG01LP1-US 6kW Hybrid Inverter",
+        "category": "inverters",
+        "description": "6000W Hybrid Solar Inverter with dual MPPT. Perfect for small to medium homes. Features colorful touch LCD, IP65 protection, and 5-year warranty.",
+        "regular_price": 415000,
+        "sale_price": 289000,
+        "image_url": "https://enersavesolutions.com/cdn/shop/files/SUN-6K-SG01LP1_grande.png?v=1763146513",
+        "specs": {
+            "power": "6000W",
+            "max_pv_input": "7800W",
+            "pv_voltage": "125-425V DC",
+            "frequency": "50/60Hz",
+            "efficiency": "97.6%",
+            "warranty": "5 Years"
+        },
+        "features": [
+            "Max PV Input Power - 7800W",
+            "Colorful touch LCD, IP65 protection",
+            "6 time periods for battery charging/discharging",
+            "Max charging/discharging current of 135A",
+            "DC & AC couple to retrofit existing solar",
+            "4ms fast transfer from on-grid to off-grid",
+            "Parallel up to 16 units"
+        ]
+    },
+    # Deye 8kW - Enersave: $510,000 (no sale) - We undercut
+    {
+        "name": "Deye SUN-8K-SG01LP1-US 8kW Hybrid Inverter",
+        "category": "inverters",
+        "description": "8000W Hybrid Solar Inverter ideal for medium-sized homes or EV-ready setups. High efficiency with dual MPPT and IP65 weatherproofing.",
+        "regular_price": 460000,
+        "sale_price": 324000,
+        "image_url": "https://enersavesolutions.com/cdn/shop/products/deye-inverter-1_grande.png?v=1652270688",
+        "specs": {
+            "power": "8000W",
+            "max_pv_input": "10400W",
+            "pv_voltage": "125-500V DC",
+            "frequency": "50/60Hz",
+            "efficiency": "97.6%",
+            "warranty": "5 Years"
+        },
+        "features": [
+            "Max PV Input Power - 10400W",
+            "Colorful touch LCD, IP65 protection",
+            "6 time periods for battery charging/discharging",
+            "Max charging/discharging current of 190A",
+            "Support storing energy from diesel generator",
+            "Smart Load application and Grid peak shaving",
+            "Parallel up to 16 units"
+        ]
+    },
+    # Deye 10kW - RezynTech: $340,000 - We undercut
+    {
+        "name": "Deye SUN-10K-SG01LP1-US 10kW Hybrid Inverter",
+        "category": "inverters",
+        "description": "10000W Hybrid Solar Inverter suited for large homes or light commercial use. 97.6% efficiency with dual MPPT and Wi-Fi monitoring.",
+        "regular_price": 530000,
+        "sale_price": 345000,
+        "image_url": "https://www.rezyntech.com/cdn/shop/files/DeyeInverter.jpg?v=1762354776&width=800",
+        "specs": {
+            "power": "10000W",
+            "max_pv_input": "13000W",
+            "pv_voltage": "125-500V DC",
+            "frequency": "50/60Hz",
+            "efficiency": "97.6%",
+            "warranty": "5 Years"
+        },
+        "features": [
+            "Max PV Input Power - 13000W",
+            "Split-phase 120/240V output",
+            "Dual MPPT for optimal efficiency",
+            "Wi-Fi/LAN monitoring included",
+            "Battery support (40-60V)",
+            "IP65 weatherproof design",
+            "Parallel scalability up to 16 units"
+        ]
+    },
+    # Deye 12kW - Enersave: Sale $390,000 / Reg $618,750 - We undercut
+    {
+        "name": "Deye SUN-12K-SG02LP2-US 12kW Hybrid Inverter",
+        "category": "inverters",
+        "description": "12000W Hybrid Solar Inverter built for high-demand residential and commercial installations. Maximum capacity for complete energy independence.",
+        "regular_price": 615000,
+        "sale_price": 385000,
+        "image_url": "https://enersavesolutions.com/cdn/shop/files/DEYE_SUN-12K-SG02LP2_grande.png?v=1721337309",
+        "specs": {
+            "power": "12000W",
+            "max_pv_input": "15600W",
+            "pv_voltage": "125-500V DC",
+            "frequency": "50/60Hz",
+            "efficiency": "97.6%",
+            "warranty": "5 Years"
+        },
+        "features": [
+            "Max PV Input Power - 15600W",
+            "Colorful touch LCD, IP65 protection",
+            "6 time periods for battery charging/discharging",
+            "Max charging/discharging current of 190A",
+            "DC & AC couple to retrofit existing solar",
+            "4ms fast transfer from on-grid to off-grid",
+            "Parallel up to 16 units"
+        ]
+    },
+
+    # ===== BATTERIES =====
+    # Deye 5.12kWh - Your price: $185,000 sale / $320,000 original
+    {
+        "name": "Deye 5.12kWh LiFePO4 Rack-Mount Battery",
+        "category": "batteries",
+        "description": "Compact 5.12kWh LiFePO4 battery with 6000+ cycle life. Modular design with built-in intelligent BMS and 5-year warranty.",
+        "regular_price": 320000,
+        "sale_price": 185000,
+        "image_url": "https://www.rezyntech.com/cdn/shop/files/Deyebatteryunitonslatwallpanel_ced9114d-9295-4c4d-b415-cf43fd367442.png?v=1765550754&width=800",
+        "specs": {
+            "capacity": "5.12kWh",
+            "voltage": "51.2V",
+            "chemistry": "LiFePO4",
+            "cycles": "6000+",
+            "warranty": "5 Years"
+        },
+        "features": [
+            "LiFePO4 battery technology for high safety",
+            "6000+ cycle life for long-term performance",
+            "Modular & scalable design",
+            "Built-in intelligent BMS with safety protections",
+            "Flexible installation (wall, rack, floor, stacked)",
+            "Optimized for Deye hybrid inverters"
+        ]
+    },
+    # Deye 10.24kWh - Proportional pricing between 5.12 and 16kWh
+    {
+        "name": "Deye 10.24kWh LiFePO4 Rack-Mount Battery",
+        "category": "batteries",
+        "description": "Mid-range 10.24kWh LiFePO4 battery for average household needs. 6000+ cycle life with intelligent BMS protection.",
+        "regular_price": 600000,
+        "sale_price": 370000,
+        "image_url": "https://www.rezyntech.com/cdn/shop/files/WhatsAppImage2025-12-12at09.26.26_e999d824_35f0d8a1-ae03-4ef0-87fa-00890c251552.jpg?v=1765550754&width=800",
+        "specs": {
+            "capacity": "10.24kWh",
+            "voltage": "51.2V",
+            "chemistry": "LiFePO4",
+            "cycles": "6000+",
+            "warranty": "5 Years"
+        },
+        "features": [
+            "LiFePO4 battery technology for high safety",
+            "6000+ cycle life for long-term performance",
+            "Modular & scalable design",
+            "Built-in intelligent BMS",
+            "Smart monitoring (CAN/RS485, app support)",
+            "Optimized for Deye hybrid inverters"
+        ]
+    },
+    # Deye 12kWh - Proportional pricing
+    {
+        "name": "Deye 12kWh LiFePO4 Rack-Mount Battery",
+        "category": "batteries",
+        "description": "High-capacity 12kWh LiFePO4 battery for larger homes. Scalable modular design with comprehensive BMS protection.",
+        "regular_price": 680000,
+        "sale_price": 420000,
+        "image_url": "https://www.rezyntech.com/cdn/shop/files/WhatsAppImage2025-12-12at09.25.48_b1764910_07836b49-e61d-4652-92b1-b59e197a1656.jpg?v=1765550754&width=800",
+        "specs": {
+            "capacity": "12kWh",
+            "voltage": "51.2V",
+            "chemistry": "LiFePO4",
+            "cycles": "6000+",
+            "warranty": "5 Years"
+        },
+        "features": [
+            "LiFePO4 battery technology for high safety",
+            "6000+ cycle life for long-term performance",
+            "Modular & scalable design",
+            "Built-in intelligent BMS",
+            "High charge & discharge capability",
+            "Optimized for Deye hybrid inverters"
+        ]
+    },
+    # Deye 16kWh - Your price: $550,000 sale / $810,000 original
+    {
+        "name": "Deye 16kWh LiFePO4 Wall-Mount Battery",
+        "category": "batteries",
+        "description": "Maximum capacity 16kWh LiFePO4 wall-mounted battery for complete energy independence. Premium storage solution for high-demand systems.",
+        "regular_price": 825000,
+        "sale_price": 750000,
+        "image_url": "https://www.rezyntech.com/cdn/shop/files/Deyebatteryunitonslatwallpanel_ced9114d-9295-4c4d-b415-cf43fd367442.png?v=1765550754&width=800",
+        "specs": {
+            "capacity": "16kWh",
+            "voltage": "51.2V",
+            "chemistry": "LiFePO4",
+            "cycles": "6000+",
+            "mount": "Wall",
+            "warranty": "5 Years"
+        },
+        "features": [
+            "Maximum storage capacity",
+            "LiFePO4 technology for safety & longevity",
+            "6000+ cycle life",
+            "Wall-mounted for space efficiency",
+            "Built-in intelligent BMS",
+            "Smart monitoring & communication"
+        ]
+    },
+    # BSL 5.12kWh Rack - RezynTech: $200,000
+    {
+        "name": "BSL 5.12kWh LiFePO4 Rack-Mount Battery",
+        "category": "batteries",
+        "description": "BSL B-LFP48-100E compact rack-mount battery. 6000+ cycle life with advanced BMS. Compatible with most hybrid inverters including Deye.",
+        "regular_price": 360000,
+        "sale_price": 220000,
+        "image_url": "https://www.rezyntech.com/cdn/shop/files/BSL_2.png?v=1762357657&width=800",
+        "specs": {
+            "capacity": "5.12kWh",
+            "voltage": "48V",
+            "chemistry": "LiFePO4",
+            "cycles": "6000+",
+            "mount": "Rack"
+        },
+        "features": [
+            "Compact 48V / 5kWh LiFePO4 rack-mount",
+            "Scalable for growing energy needs",
+            "6000+ cycle life",
+            "Safe and maintenance-free design",
+            "Compatible with Deye and other inverters"
+        ]
+    },
+    # BSL 10.24kWh Rack - RezynTech: $200,000 base
+    {
+        "name": "BSL 10.24kWh LiFePO4 Rack-Mount Battery",
+        "category": "batteries",
+        "description": "BSL B-LFP48-200E high-capacity rack-mount battery. Ideal for larger residential or light commercial solar systems.",
+        "regular_price": 320000,
+        "sale_price": 400000,
+        "image_url": "https://www.rezyntech.com/cdn/shop/files/BSL.png?v=1762358246&width=800",
+        "specs": {
+            "capacity": "10.24kWh",
+            "voltage": "48V",
+            "chemistry": "LiFePO4",
+            "cycles": "6000+",
+            "mount": "Rack"
+        },
+        "features": [
+            "High-capacity 48V / 10kWh rack-mount",
+            "Modular design for expansion",
+            "6000+ cycle life",
+            "Compatible with most hybrid inverters",
+            "Long-life reliability"
+        ]
+    },
+    # BSL Li-Pro 10.24kWh Wall
+    {
+        "name": "BSL Li-Pro 10.24kWh LiFePO4 Wall-Mount Battery",
+        "category": "batteries",
+        "description": "BSL Li-Pro 10240 sleek wall-mounted battery with IP65 protection. Perfect for indoor or outdoor installation.",
+        "regular_price": 650000,
+        "sale_price": 570000,
+        "image_url": "https://www.rezyntech.com/cdn/shop/files/BSL_Li_3_05174485-c78f-4d37-8c22-6c7621e562ef.png?v=1762373784&width=800",
+        "specs": {
+            "capacity": "10.24kWh",
+            "voltage": "48V",
+            "chemistry": "LiFePO4",
+            "cycles": "6000+",
+            "mount": "Wall",
+            "protection": "IP65"
+        },
+        "features": [
+            "Sleek wall-mounted design",
+            "IP65 rated for indoor/outdoor use",
+            "Expandable for greater storage",
+            "6000+ cycle life",
+            "High safety LiFePO4 chemistry"
+        ]
+    },
+
+    # ===== SOLAR PANELS =====
+    # SunPower P7 450W - User price: $18,000 sale / $21,000 original
+    {
+        "name": "SunPower P7 450W BiFacial Black Solar Panel",
+        "category": "panels",
+        "description": "SunPower Maxeon Performance 7 series bifacial panel. Premium all-black design with 25-year warranty. Captures sunlight from both sides.",
+        "regular_price": 21000,
+        "sale_price": 18000,
+        "image_url": "https://www.rezyntech.com/cdn/shop/files/blackpanel.png?v=1750092550&width=800",
+        "specs": {
+            "power": "450W",
+            "type": "Bifacial",
+            "cells": "Monocrystalline",
+            "brand": "SunPower Maxeon",
+            "warranty": "25 Years"
+        },
+        "features": [
+            "Bifacial Technology - captures sunlight from both sides",
+            "All-Black Design for sleek aesthetics",
+            "Superior Reliability - solid copper foundation",
+            "High Efficiency Maxeon cells",
+            "25-Year product and power warranty",
+            "Climate-Ready for shading, heat, humidity"
+        ]
+    },
+    # SunPower P7 545W - SOLD OUT per user
+    {
+        "name": "SunPower P7 545W BiFacial Solar Panel",
+        "category": "panels",
+        "description": "SunPower Maxeon Performance 7 series high-output bifacial panel. N-type TOPCon cells for maximum efficiency. 25-year warranty.",
+        "regular_price": 25000,
+        "sale_price": 20000,
+        "image_url": "https://www.rezyntech.com/cdn/shop/files/ChatGPT_Image_Nov_20_2025_02_23_29_PM.png?v=1763667027&width=800",
+        "specs": {
+            "power": "545W",
+            "type": "Bifacial",
+            "cells": "N-type TOPCon",
+            "brand": "SunPower Maxeon",
+            "warranty": "25 Years"
+        },
+        "features": [
+            "Bifacial Technology - up to 30% additional gain",
+            "N-type TOPCon cells for highest efficiency",
+            "High Power Output - ideal for commercial",
+            "Glass-Glass construction for durability",
+            "25-Year comprehensive warranty",
+            "Climate efficient design"
+        ],
+        "in_stock": False
+    },
+    # TW 625W - Backorder Available per user
+    {
+        "name": "TW Solar 625W BiFacial Panel",
+        "category": "panels",
+        "description": "TW Solar 625W high-output bifacial panel for maximum power generation. Industry-leading wattage for large installations. Available on backorder.",
+        "regular_price": 38000,
+        "sale_price": 28000,
+        "image_url": "https://images.unsplash.com/photo-1509391366360-2e959784a276?w=800",
+        "specs": {
+            "power": "625W",
+            "type": "Bifacial",
+            "cells": "Monocrystalline",
+            "brand": "TW Solar"
+        },
+        "features": [
+            "Industry-leading 625W output",
+            "Bifacial technology for extra generation",
+            "Ideal for large-scale installations",
+            "High efficiency cells",
+            "Durable construction"
+        ],
+        "in_stock": True,
+        "backorder": True
+    },
+]
+
+
+BOOLEAN_FIELDS = {"in_stock", "backorder"}
+NUMERIC_FIELDS = {"regular_price", "sale_price"}
+
+
+def product_key(data: dict) -> str:
+    # Stable across reseeds so a product keeps its id (and any links or
+    # cart entries pointing at it) when the catalog is reloaded.
+    if data.get("sku"):
+        return str(data["sku"])
+    return re.sub(r"[^a-z0-9]+", "-", data["name"].lower()).strip("-")
+
+
+def _parse_csv_value(field: str, value: str):
+    if field in BOOLEAN_FIELDS:
+        return value.strip().lower() in ("1", "true", "yes", "y")
+    if field in NUMERIC_FIELDS:
+        return float(value.replace(",", ""))
+    return value
+
+
+def _parse_csv(text: str) -> list[dict]:
+    # Columns map to product fields. Specs may be given either as a JSON
+    # "specs" column or as individual "spec_<name>" columns; features as a
+    # JSON list or a "|"-separated string.
+    products = []
+    for row in csv.DictReader(io.StringIO(text)):
+        product = {}
+        specs = {}
+        for column, value in row.items():
+            if column is None or value is None or value == "":
+                continue
+            column = column.strip()
+            if column.startswith("spec_"):
+                specs[column[len("spec_"):]] = value
+            elif column == "specs":
+                specs.update(json.loads(value))
+            elif column == "features":
+                product["features"] = json.loads(value) if value.lstrip().startswith("[") else [
+                    f.strip() for f in value.split("|") if f.strip()
+                ]
+            else:
+                product[column] = _parse_csv_value(column, value)
+        if specs:
+            product["specs"] = specs
+        products.append(product)
+    return products
+
+
+def parse_seed_data(content: str, fmt: str) -> list[dict]:
+    if fmt == "json":
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = data.get("products", [])
+        return data
+    if fmt == "csv":
+        return _parse_csv(content)
+    raise ValueError(f"Unsupported seed format: {fmt}")
+
+
+def load_seed_file(path: str) -> list[dict]:
+    path = Path(path)
+    return parse_seed_data(path.read_text(encoding="utf-8"), path.suffix.lstrip(".").lower())
+
+
+def default_seed_data() -> list[dict]:
+    if SEED_PRODUCTS_FILE:
+        return load_seed_file(SEED_PRODUCTS_FILE)
+    return DEFAULT_PRODUCTS
+
+
+def catalog_hash(docs: list[dict]) -> str:
+    # id and created_at are generated per call and kept from the live
+    # catalog on reseed, so they don't count as changes.
+    content = sorted(
+        ({k: v for k, v in doc.items() if k not in ("id", "created_at")} for doc in docs),
+        key=product_key,
+    )
+    return hashlib.sha256(orjson.dumps(content, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+async def catalog_version(db) -> int:
+    doc = await db[META_COLLECTION].find_one({"_id": VERSION_ID}, {"version": 1})
+    return doc["version"] if doc else 0
+
+
+async def is_seeded_with(db, docs: list[dict]) -> bool:
+    """True if the live catalog is exactly what seeding `docs` would produce.
+
+    That is, the last seed had the same content and nothing has written to
+    the catalog since (the shared catalog version hasn't moved).
+    """
+    seeded = await db[META_COLLECTION].find_one({"_id": SEED_HASH_ID})
+    if seeded is None or seeded["hash"] != catalog_hash(docs):
+        return False
+    return seeded["version"] == await catalog_version(db)
+
+
+async def record_seed(db, docs: list[dict], version: int) -> None:
+    await db[META_COLLECTION].update_one(
+        {"_id": SEED_HASH_ID},
+        {"$set": {"hash": catalog_hash(docs), "version": version, "seeded_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+
+
+async def replace_catalog(db, docs: list[dict]) -> int:
+    """Load a full catalog into a staging collection and swap it in.
+
+    Readers keep seeing the previous catalog until the final rename, which
+    replaces the live collection in one step.
+    """
+    existing = {
+        doc["sku"]: doc
+        async for doc in db.products.find(
+            {"sku": {"$exists": True}}, {"_id": 0, "sku": 1, "id": 1, "created_at": 1}
+        )
+    }
+    now = datetime.now(timezone.utc)
+
+    ops = []
+    for doc in docs:
+        doc = dict(doc)
+        key = doc["sku"] = product_key(doc)
+        previous = existing.get(key, {})
+        new_id = doc.pop("id", None)
+        created_at = doc.pop("created_at", None)
+        ops.append(
+            UpdateOne(
+                {"sku": key},
+                {
+                    "$set": doc,
+                    "$setOnInsert": {
+                        "id": previous.get("id") or new_id or str(uuid.uuid4()),
+                        "created_at": previous.get("created_at") or created_at or now,
+                    },
+                },
+                upsert=True,
+            )
+        )
+
+    staging = db[f"products_staging_{uuid.uuid4().hex[:8]}"]
+    try:
+        if ops:
+            await staging.bulk_write(ops, ordered=False)
+        else:
+            await db.create_collection(staging.name)
+        # rename() carries the staging collection's indexes over, so build
+        # them before the swap rather than on the live collection after it.
+        index_report = await create_collection_indexes(staging, INDEX_SPECS["products"])
+        if not index_report["ok"]:
+            raise RuntimeError(f"Index build on staging catalog failed: {index_report.get('error')}")
+        await staging.rename("products", dropTarget=True)
+    except Exception:
+        await staging.drop()
+        raise
+
+    logger.info(f"Catalog replaced with {len(ops)} products")
+    return len(ops)
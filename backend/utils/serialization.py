@@ -0,0 +1,23 @@
+import os
+
+import orjson
+from pydantic import TypeAdapter
+
+# When enabled, documents read from Mongo are serialized as stored instead
+# of being validated through the response model first. Only safe once every
+# stored document matches the current model (see migrate_created_at.py).
+TRUST_DB_OUTPUT = os.getenv("TRUST_DB_OUTPUT", "false").lower() in ("1", "true", "yes")
+
+# Matches pydantic's JSON output for aware UTC datetimes ("...Z"), so raw
+# orjson output is indistinguishable from the response-model path.
+DUMP_OPTIONS = orjson.OPT_UTC_Z
+
+
+def dump_raw(docs) -> bytes:
+    return orjson.dumps(docs, option=DUMP_OPTIONS)
+
+
+def dump_documents(docs, adapter: TypeAdapter) -> bytes:
+    if TRUST_DB_OUTPUT:
+        return dump_raw(docs)
+    return adapter.dump_json(adapter.validate_python(docs))
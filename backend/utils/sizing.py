@@ -0,0 +1,205 @@
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+
+from .specs import product_spec_values
+
+# Usable fraction of nameplate battery capacity for LiFePO4.
+DEPTH_OF_DISCHARGE = 0.9
+# Wiring, inverter, temperature and soiling losses between panel nameplate
+# and energy delivered.
+SYSTEM_DERATE = 0.8
+# Typical Jamaican peak sun hours.
+DEFAULT_SUN_HOURS = 5.0
+# Peak load assumed when the caller doesn't give one: daily energy spread
+# over a short evening/daytime peak.
+DEFAULT_PEAK_HOURS = 8.0
+# PV array may exceed inverter AC rating by this much when the inverter
+# doesn't publish a max PV input.
+DEFAULT_PV_OVERSIZE = 1.3
+
+# The only unit each sizing spec is used in. Specs given in another unit
+# (a battery rated "100Ah") can't be converted without more data, so those
+# products are left out rather than compared as if they were Wh.
+SPEC_UNITS = {"power": "W", "max_pv_input": "W", "capacity": "Wh"}
+
+
+@dataclass
+class _Components:
+    ids: list[str]
+    names: list[str]
+    prices: np.ndarray
+    primary: np.ndarray
+    secondary: np.ndarray
+
+
+def _spec(values: dict, key: Optional[str]) -> Optional[float]:
+    spec = values.get(key) if key else None
+    if spec is None or spec["unit"] != SPEC_UNITS[key]:
+        return None
+    return spec["value"]
+
+
+def _components(products: list[dict], key: str, secondary_key: Optional[str] = None) -> _Components:
+    ids, names, prices, primary, secondary = [], [], [], [], []
+    for product in products:
+        values = product_spec_values(product)
+        value = _spec(values, key)
+        if value is None:
+            continue
+        ids.append(product["id"])
+        names.append(product["name"])
+        prices.append(product["sale_price"])
+        primary.append(value)
+        other = _spec(values, secondary_key)
+        secondary.append(np.nan if other is None else other)
+    return _Components(
+        ids=ids,
+        names=names,
+        prices=np.asarray(prices, dtype=np.float64),
+        primary=np.asarray(primary, dtype=np.float64),
+        secondary=np.asarray(secondary, dtype=np.float64),
+    )
+
+
+class SizingCatalog:
+    """Inverter, battery and panel specs laid out as NumPy arrays.
+
+    Arrays are rebuilt lazily after the catalog changes, so requests only
+    pay for the vectorized search, and writes only mark them stale.
+    """
+
+    def __init__(self):
+        self._products: dict[str, dict] = {}
+        self._arrays: Optional[tuple[_Components, _Components, _Components]] = None
+
+    def rebuild(self, products: Iterable[dict]) -> None:
+        self._products = {product["id"]: product for product in products}
+        self._arrays = None
+
+    def add(self, product: dict) -> None:
+        self._products[product["id"]] = product
+        self._arrays = None
+
+    def remove(self, product_id: str) -> None:
+        if self._products.pop(product_id, None) is not None:
+            self._arrays = None
+
+    def _available(self, category: str) -> list[dict]:
+        return [
+            p for p in self._products.values()
+            if p.get("category") == category and (p.get("in_stock") or p.get("backorder"))
+        ]
+
+    def arrays(self) -> tuple[_Components, _Components, _Components]:
+        if self._arrays is None:
+            self._arrays = (
+                _components(self._available("inverters"), "power", "max_pv_input"),
+                _components(self._available("batteries"), "capacity"),
+                _components(self._available("panels"), "power"),
+            )
+        return self._arrays
+
+    def recommend(
+        self,
+        daily_kwh: float,
+        autonomy_hours: float,
+        budget: Optional[float] = None,
+        peak_kw: Optional[float] = None,
+        sun_hours: float = DEFAULT_SUN_HOURS,
+        top_k: int = 5,
+    ) -> dict:
+        inverters, batteries, panels = self.arrays()
+        daily_wh = daily_kwh * 1000
+        peak_w = (peak_kw * 1000) if peak_kw else daily_wh / DEFAULT_PEAK_HOURS
+        storage_wh = daily_wh * autonomy_hours / 24
+
+        requirements = {
+            "daily_kwh": daily_kwh,
+            "peak_kw": round(peak_w / 1000, 3),
+            "storage_kwh": round(storage_wh / 1000, 3),
+            "sun_hours": sun_hours,
+        }
+        if not (len(inverters.ids) and len(batteries.ids) and len(panels.ids)):
+            return {"requirements": requirements, "bundles": []}
+
+        # Prune inverters that can't carry the peak load.
+        inv_idx = np.flatnonzero(inverters.primary >= peak_w)
+        if inv_idx.size == 0:
+            return {"requirements": requirements, "bundles": []}
+        pv_limit = np.where(
+            np.isnan(inverters.secondary[inv_idx]),
+            inverters.primary[inv_idx] * DEFAULT_PV_OVERSIZE,
+            inverters.secondary[inv_idx],
+        )
+
+        # Battery and panel counts don't depend on the inverter.
+        batt_count = np.maximum(1, np.ceil(storage_wh / (batteries.primary * DEPTH_OF_DISCHARGE)))
+        batt_cost = batt_count * batteries.prices
+        panel_count = np.maximum(1, np.ceil(daily_wh / (panels.primary * sun_hours * SYSTEM_DERATE)))
+        panel_cost = panel_count * panels.prices
+        pv_w = panel_count * panels.primary
+
+        # Batteries only add cost, so any top-k bundle uses one of the k
+        # cheapest battery options; the rest can't make the cut.
+        batt_idx = np.argsort(batt_cost, kind="stable")[:top_k]
+
+        # Same argument for panels, except which panels fit depends on the
+        # inverter's PV limit: keep each inverter's k cheapest that fit.
+        panel_order = np.argsort(panel_cost, kind="stable")
+        fits = pv_w[panel_order][None, :] <= pv_limit[:, None]
+        rank = np.cumsum(fits, axis=1)
+        rows, cols = np.nonzero(fits & (rank <= top_k))
+        panel_sel = np.full((inv_idx.size, top_k), -1)
+        panel_sel[rows, rank[rows, cols] - 1] = panel_order[cols]
+        panel_sel_cost = np.where(panel_sel >= 0, panel_cost[panel_sel], np.inf)
+
+        # (inverter, battery, panel slot) cost cube over the pruned candidates.
+        cost = (
+            inverters.prices[inv_idx][:, None, None]
+            + batt_cost[batt_idx][None, :, None]
+            + panel_sel_cost[:, None, :]
+        )
+        if budget is not None:
+            cost = np.where(cost <= budget, cost, np.inf)
+
+        flat = cost.ravel()
+        k = min(top_k, int(np.count_nonzero(np.isfinite(flat))))
+        if k == 0:
+            return {"requirements": requirements, "bundles": []}
+        best = np.argpartition(flat, k - 1)[:k]
+        best = best[np.argsort(flat[best], kind="stable")]
+
+        bundles = []
+        for i, b, slot in zip(*np.unravel_index(best, cost.shape)):
+            inv, batt, p = inv_idx[i], batt_idx[b], panel_sel[i, slot]
+            bundles.append({
+                "inverter": {
+                    "id": inverters.ids[inv],
+                    "name": inverters.names[inv],
+                    "quantity": 1,
+                    "unit_price": float(inverters.prices[inv]),
+                },
+                "battery": {
+                    "id": batteries.ids[batt],
+                    "name": batteries.names[batt],
+                    "quantity": int(batt_count[batt]),
+                    "unit_price": float(batteries.prices[batt]),
+                },
+                "panels": {
+                    "id": panels.ids[p],
+                    "name": panels.names[p],
+                    "quantity": int(panel_count[p]),
+                    "unit_price": float(panels.prices[p]),
+                },
+                "total": float(cost[i, b, slot]),
+                "inverter_kw": round(float(inverters.primary[inv]) / 1000, 3),
+                "storage_kwh": round(float(batt_count[batt] * batteries.primary[batt]) / 1000, 3),
+                "pv_kw": round(float(pv_w[p]) / 1000, 3),
+                "daily_pv_kwh": round(float(pv_w[p]) * sun_hours * SYSTEM_DERATE / 1000, 2),
+            })
+        return {"requirements": requirements, "bundles": bundles}
+
+
+sizing_catalog = SizingCatalog()
@@ -0,0 +1,191 @@
+import re
+import bisect
+from typing import Iterable, Optional
+
+# Display unit -> (base unit, multiplier). Everything is stored in base
+# units so "5.12kWh" and "5120Wh" compare equal.
+UNITS = {
+    "w": ("W", 1.0),
+    "kw": ("W", 1000.0),
+    "mw": ("W", 1_000_000.0),
+    "wh": ("Wh", 1.0),
+    "kwh": ("Wh", 1000.0),
+    "mwh": ("Wh", 1_000_000.0),
+    "v": ("V", 1.0),
+    "kv": ("V", 1000.0),
+    "a": ("A", 1.0),
+    "ah": ("Ah", 1.0),
+    "hz": ("Hz", 1.0),
+    "%": ("%", 1.0),
+    "year": ("years", 1.0),
+    "years": ("years", 1.0),
+    "yr": ("years", 1.0),
+    "yrs": ("years", 1.0),
+    "": ("", 1.0),
+}
+
+# A comma followed by exactly three digits groups thousands ("1,000W",
+# "10,000.5 W"); any other comma is a decimal point ("5,12kWh").
+NUMBER = r"\d{1,3}(?:,\d{3})+(?!\d)(?:\.\d+)?|\d+(?:[.,]\d+)?"
+THOUSANDS_RE = re.compile(r"\d{1,3}(?:,\d{3})+(?:\.\d+)?")
+
+SPEC_RE = re.compile(
+    rf"^\s*(?P<low>{NUMBER})\s*(?:[-–/]\s*(?P<high>{NUMBER}))?\s*\+?\s*(?P<unit>[a-zA-Z%]*)"
+)
+
+
+def _number(text: str) -> float:
+    if THOUSANDS_RE.fullmatch(text):
+        return float(text.replace(",", ""))
+    return float(text.replace(",", "."))
+
+
+def parse_spec(value) -> Optional[dict]:
+    """Parse a display spec like "6000W", "5.12kWh" or "125-425V DC".
+
+    Returns {"value", "unit"} in base units, plus "min"/"max" for ranges
+    (where "value" is the upper bound). Non-numeric specs return None.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {"value": float(value), "unit": ""}
+    if not isinstance(value, str):
+        return None
+    match = SPEC_RE.match(value)
+    if not match:
+        return None
+    unit_key = match.group("unit").lower()
+    if unit_key not in UNITS:
+        return None
+    unit, factor = UNITS[unit_key]
+    low = _number(match.group("low")) * factor
+    if match.group("high") is None:
+        return {"value": low, "unit": unit}
+    high = _number(match.group("high")) * factor
+    return {"value": high, "min": low, "max": high, "unit": unit}
+
+
+def normalize_specs(specs: Optional[dict]) -> Optional[dict]:
+    if not specs:
+        return None
+    parsed = {key: parse_spec(value) for key, value in specs.items()}
+    return {key: value for key, value in parsed.items() if value is not None} or None
+
+
+def product_spec_values(product: dict) -> dict:
+    return product.get("spec_values") or normalize_specs(product.get("specs")) or {}
+
+
+class SpecIndex:
+    """Sorted, array-backed index of numeric spec values.
+
+    For each (spec key, unit), parallel lists hold the values in ascending
+    order and the matching product ids, so range lookups are two bisects and
+    nearest lookups expand outwards from one bisect. Values are only ever
+    compared within one unit: a battery listed as "100Ah" doesn't land among
+    the kWh capacities. A key's default unit is the one most products use.
+    """
+
+    def __init__(self):
+        self._values: dict[tuple[str, str], list[float]] = {}
+        self._ids: dict[tuple[str, str], list[str]] = {}
+        self._unit_counts: dict[str, dict[str, int]] = {}
+        self._keys_by_product: dict[str, dict[tuple[str, str], float]] = {}
+
+    def rebuild(self, products: Iterable[dict]) -> None:
+        entries: dict[tuple[str, str], list[tuple[float, str]]] = {}
+        self._unit_counts = {}
+        self._keys_by_product = {}
+        for product in products:
+            values = product_spec_values(product)
+            self._keys_by_product[product["id"]] = {}
+            for key, spec in values.items():
+                index_key = (key, spec["unit"])
+                entries.setdefault(index_key, []).append((spec["value"], product["id"]))
+                self._count_unit(key, spec["unit"], 1)
+                self._keys_by_product[product["id"]][index_key] = spec["value"]
+        self._values = {}
+        self._ids = {}
+        for index_key, pairs in entries.items():
+            pairs.sort()
+            self._values[index_key] = [value for value, _ in pairs]
+            self._ids[index_key] = [product_id for _, product_id in pairs]
+
+    def _count_unit(self, key: str, unit: str, delta: int) -> None:
+        counts = self._unit_counts.setdefault(key, {})
+        counts[unit] = counts.get(unit, 0) + delta
+        if counts[unit] <= 0:
+            del counts[unit]
+            if not counts:
+                del self._unit_counts[key]
+
+    def add(self, product: dict) -> None:
+        product_id = product["id"]
+        self.remove(product_id)
+        self._keys_by_product[product_id] = {}
+        for key, spec in product_spec_values(product).items():
+            index_key = (key, spec["unit"])
+            values = self._values.setdefault(index_key, [])
+            ids = self._ids.setdefault(index_key, [])
+            position = self._position(values, ids, spec["value"], product_id)
+            values.insert(position, spec["value"])
+            ids.insert(position, product_id)
+            self._count_unit(key, spec["unit"], 1)
+            self._keys_by_product[product_id][index_key] = spec["value"]
+
+    @staticmethod
+    def _position(values: list[float], ids: list[str], value: float, product_id: str) -> int:
+        # Entries are ordered by (value, id), so a product is found by bisecting
+        # even when thousands share one value.
+        low = bisect.bisect_left(values, value)
+        high = bisect.bisect_right(values, value, low)
+        return bisect.bisect_left(ids, product_id, low, high)
+
+    def remove(self, product_id: str) -> None:
+        for index_key, value in self._keys_by_product.pop(product_id, {}).items():
+            values, ids = self._values[index_key], self._ids[index_key]
+            position = self._position(values, ids, value, product_id)
+            if position < len(ids) and ids[position] == product_id:
+                del values[position]
+                del ids[position]
+            self._count_unit(index_key[0], index_key[1], -1)
+
+    def keys(self) -> dict[str, str]:
+        return {key: self.unit(key) for key in self._unit_counts}
+
+    def unit(self, key: str) -> Optional[str]:
+        counts = self._unit_counts.get(key)
+        if not counts:
+            return None
+        return max(counts, key=lambda unit: (counts[unit], unit))
+
+    def units(self, key: str) -> list[str]:
+        return sorted(self._unit_counts.get(key, {}))
+
+    def range(
+        self, key: str, low: Optional[float] = None, high: Optional[float] = None, unit: Optional[str] = None
+    ) -> list[tuple[str, float]]:
+        index_key = (key, unit if unit is not None else self.unit(key))
+        values = self._values.get(index_key, [])
+        start = bisect.bisect_left(values, low) if low is not None else 0
+        end = bisect.bisect_right(values, high) if high is not None else len(values)
+        ids = self._ids.get(index_key, [])
+        return [(ids[i], values[i]) for i in range(start, end)]
+
+    def nearest(self, key: str, target: float, k: int, unit: Optional[str] = None) -> list[tuple[str, float]]:
+        index_key = (key, unit if unit is not None else self.unit(key))
+        values = self._values.get(index_key, [])
+        ids = self._ids.get(index_key, [])
+        right = bisect.bisect_left(values, target)
+        left = right - 1
+        found = []
+        while len(found) < k and (left >= 0 or right < len(values)):
+            if right >= len(values) or (left >= 0 and target - values[left] <= values[right] - target):
+                found.append((ids[left], values[left]))
+                left -= 1
+            else:
+                found.append((ids[right], values[right]))
+                right += 1
+        return found
+
+
+spec_index = SpecIndex()
@@ -0,0 +1,161 @@
+import html
+from string import Formatter
+from typing import Any, Callable, Optional
+
+from .mailer import OutgoingEmail
+
+
+class TemplateError(ValueError):
+    pass
+
+
+# Templates use str.format field syntax. Every {field} is HTML-escaped;
+# {field:fragment} renders each element of a list through a named fragment.
+# Dotted paths read nested dicts.
+EMAIL_TEMPLATES = {
+    "item_row": (None, "<li>{quantity} × {name} — ${price}</li>"),
+    "product_line": (None, "{name}<br>"),
+    "lead_admin": (
+        "New Website Inquiry",
+        """
+    <h2>New Website Inquiry</h2>
+    <p><strong>Name:</strong> {lead.name}</p>
+    <p><strong>Email:</strong> {lead.email}</p>
+    <p><strong>Phone:</strong> {lead.phone}</p>
+    <p><strong>Parish:</strong> {lead.parish}</p>
+    <p><strong>District:</strong> {lead.district}</p>
+    <p><strong>Interest:</strong> {lead.interest}</p>
+    <p><strong>Details:</strong><br>{lead.specific_needs}</p>
+    """,
+    ),
+    "quote_admin": (
+        "New Quote Request",
+        """
+    <h2>New Quote Request</h2>
+    <p><strong>Name:</strong> {quote.name}</p>
+    <p><strong>Email:</strong> {quote.email}</p>
+    <p><strong>Phone:</strong> {quote.phone}</p>
+    <p><strong>Parish:</strong> {quote.parish}</p>
+    <p><strong>District:</strong> {quote.district}</p>
+    <p><strong>Interest:</strong> {quote.interest}</p>
+    <p><strong>Products:</strong><br>{quote.products:product_line}</p>
+    <p><strong>Details:</strong><br>{quote.specific_needs}</p>
+    """,
+    ),
+    "order_admin": (
+        "New Order Received",
+        """
+    <h2>🛒 New Order Received</h2>
+    <p><strong>Name:</strong> {order.customer_name}</p>
+    <p><strong>Email:</strong> {order.customer_email}</p>
+    <p><strong>Phone:</strong> {order.customer_phone}</p>
+    <p><strong>Items:</strong></p>
+    <ul>{order.items:item_row}</ul>
+    <p><strong>Total:</strong> ${order.total}</p>
+    """,
+    ),
+    "order_customer": (
+        "Your Order Confirmation",
+        """
+    <h2>Thank you for your order!</h2>
+    <p>Hi {order.customer_name},</p>
+    <p>We’ve received your order and will contact you shortly.</p>
+
+    <p><strong>Your Order:</strong></p>
+    <ul>{order.items:item_row}</ul>
+
+    <p><strong>Total:</strong> ${order.total}</p>
+    """,
+    ),
+}
+
+
+def _escape(value: Any) -> str:
+    if value is None:
+        return ""
+    if type(value) is not str:
+        value = str(value)
+    # Most values have nothing to escape; skip html.escape's five replaces.
+    if "&" in value or "<" in value or ">" in value or '"' in value or "'" in value:
+        return html.escape(value)
+    return value
+
+
+class Template:
+    """A template compiled once into a Python function.
+
+    The generated function is a single join over literal chunks and escaped
+    dict lookups, so rendering costs about the same as an f-string.
+    """
+
+    def __init__(self, name: str, subject: Optional[str], source: str, compiled: dict[str, Callable]):
+        self.name = name
+        self.subject = subject
+        self.fragments: set[str] = set()
+        try:
+            parsed = list(Formatter().parse(source))
+        except ValueError as e:
+            raise TemplateError(f"{name}: {e}") from None
+
+        parts = []
+        for literal, field, fragment, conversion in parsed:
+            if literal:
+                parts.append(repr(literal))
+            if field is None:
+                continue
+            if not field or conversion:
+                raise TemplateError(f"{name}: fields must be named and take no conversion")
+            value = "ctx" + "".join(f"[{key!r}]" for key in field.split("."))
+            if fragment:
+                self.fragments.add(fragment)
+                parts.append(f"''.join([_compiled[{fragment!r}](item) for item in {value} or ()])")
+            else:
+                parts.append(f"_escape({value})")
+
+        code = f"def render(ctx):\n    return ''.join(({', '.join(parts)},))\n"
+        namespace = {"_escape": _escape, "_compiled": compiled}
+        exec(compile(code, f"<template {name}>", "exec"), namespace)
+        self._render = namespace["render"]
+
+    def render(self, context: dict) -> str:
+        try:
+            return self._render(context)
+        except (KeyError, TypeError) as e:
+            raise TemplateError(f"{self.name}: no value for {e}") from None
+
+
+class TemplateRegistry:
+    """Named templates, compiled on first use or eagerly via compile()."""
+
+    def __init__(self, sources: dict[str, tuple[Optional[str], str]]):
+        self.sources = sources
+        self._templates: Optional[dict[str, Template]] = None
+
+    def compile(self) -> None:
+        compiled: dict[str, Callable] = {}
+        templates = {
+            name: Template(name, subject, source, compiled) for name, (subject, source) in self.sources.items()
+        }
+        for template in templates.values():
+            missing = template.fragments - templates.keys()
+            if missing:
+                raise TemplateError(f"{template.name}: unknown fragment {', '.join(sorted(missing))}")
+            # Fragments are called from inside other templates without the
+            # error wrapper; the outer template reports the failure.
+            compiled[template.name] = template._render
+        self._templates = templates
+
+    def render(self, name: str, context: dict) -> tuple[str, str]:
+        if self._templates is None:
+            self.compile()
+        template = self._templates.get(name)
+        if template is None:
+            raise TemplateError(f"Unknown template {name}")
+        return template.subject, template.render(context)
+
+    def email(self, name: str, recipients: list[str], context: dict) -> OutgoingEmail:
+        subject, body = self.render(name, context)
+        return OutgoingEmail(subject=subject, recipients=recipients, body=body)
+
+
+email_templates = TemplateRegistry(EMAIL_TEMPLATES)
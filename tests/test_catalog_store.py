@@ -0,0 +1,121 @@
+"""CatalogStore change handling: per-product updates and skipping our own writes."""
+
+import sys
+from pathlib import Path
+from datetime import datetime, timezone
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from utils.catalog_store import CatalogStore  # noqa: E402
+from utils.search import ProductSearchIndex  # noqa: E402
+from utils.sizing import SizingCatalog  # noqa: E402
+from utils.specs import SpecIndex, normalize_specs  # noqa: E402
+
+
+def document(mongo_id: int, product_id: str, name: str, power: str = "500W") -> dict:
+    specs = {"power": power}
+    return {
+        "_id": mongo_id,
+        "id": product_id,
+        "name": name,
+        "category": "panels",
+        "description": "Mono panel",
+        "specs": specs,
+        "spec_values": normalize_specs(specs),
+        "features": [],
+        "in_stock": True,
+        "backorder": False,
+        "sale_price": 100.0,
+        "created_at": datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+    }
+
+
+def from_mongo(doc: dict) -> dict:
+    # What the change stream hands back: millisecond datetimes.
+    created_at = doc["created_at"]
+    return {**doc, "created_at": created_at.replace(microsecond=created_at.microsecond // 1000 * 1000)}
+
+
+@pytest.fixture
+def store():
+    store = CatalogStore()
+    store.builds = 0
+    store.changes = []
+
+    def build(doc):
+        store.builds += 1
+        return dict(doc)
+
+    store._build = build
+    store._on_change = lambda upserted, removed: store.changes.append(([p["id"] for p in upserted], sorted(removed)))
+    store.watching = True
+    return store
+
+
+def apply(store, *changes) -> None:
+    upserted, removed = {}, set()
+    for change in changes:
+        assert store._apply(change, upserted, removed)
+    if upserted or removed:
+        store._on_change(list(upserted.values()), list(removed))
+
+
+def test_own_write_is_not_applied_twice(store):
+    doc = document(1, "p1", "Panel")
+    store.upsert(doc)
+    builds = store.builds
+
+    apply(store, {"operationType": "insert", "fullDocument": from_mongo(doc)})
+
+    assert store.builds == builds
+    assert store.changes == [(["p1"], [])]
+    assert store.get("p1")["name"] == "Panel"
+
+
+def test_other_writes_pass_on_only_what_changed(store):
+    store.upsert(document(1, "p1", "Panel"))
+    store.upsert(document(2, "p2", "Other"))
+    store.changes.clear()
+
+    apply(
+        store,
+        # p1's own insert event, then another worker's update of it.
+        {"operationType": "insert", "fullDocument": from_mongo(document(1, "p1", "Panel"))},
+        {"operationType": "update", "fullDocument": document(1, "p1", "Panel v2")},
+        {"operationType": "delete", "documentKey": {"_id": 2}},
+        {"operationType": "insert", "fullDocument": document(3, "p3", "New")},
+    )
+
+    assert store.changes == [(["p1", "p3"], ["p2"])]
+    assert store.get("p1")["name"] == "Panel v2"
+    assert store.get("p2") is None
+
+
+def test_delete_then_reinsert_in_one_batch_is_an_upsert(store):
+    store.upsert(document(1, "p1", "Panel"))
+    store.changes.clear()
+
+    apply(
+        store,
+        {"operationType": "delete", "documentKey": {"_id": 1}},
+        {"operationType": "insert", "fullDocument": document(4, "p1", "Panel again")},
+    )
+
+    assert store.changes == [(["p1"], [])]
+
+
+def test_indexes_follow_incremental_changes():
+    search, specs, sizing = ProductSearchIndex(), SpecIndex(), SizingCatalog()
+    first, second = document(1, "p1", "Mono Panel", "500W"), document(2, "p2", "Bifacial Panel", "650W")
+    for index in (search, specs, sizing):
+        index.rebuild([first])
+
+    for index in (search, specs, sizing):
+        index.add(second)
+        index.remove("p1")
+
+    assert search.get("p1") is None and search.get("p2") is not None
+    assert specs.range("power", None, None) == [("p2", 650.0)]
+    assert sizing.arrays()[2].ids == ["p2"]
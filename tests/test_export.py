@@ -0,0 +1,85 @@
+"""GET /api/export/{collection} requires the admin token."""
+
+import sys
+from pathlib import Path
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+from utils import auth  # noqa: E402
+
+TOKEN = "test-admin-token"
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class Collection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return Cursor(self.docs)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(auth, "ADMIN_API_TOKEN", TOKEN)
+    order = {
+        "id": "o1",
+        "customer_name": "Jane",
+        "customer_email": "jane@example.com",
+        "created_at": datetime(2026, 1, 1, tzinfo=timezone.utc),
+    }
+    monkeypatch.setattr(server, "db", {"orders": Collection([order]), "leads": Collection([])})
+    # No lifespan: nothing here needs Mongo.
+    return TestClient(server.app)
+
+
+@pytest.mark.parametrize("collection", ["leads", "quotes", "orders"])
+def test_export_without_token_is_rejected(client, collection):
+    response = client.get(f"/api/export/{collection}")
+
+    assert response.status_code == 401
+
+
+@pytest.mark.parametrize("authorization", ["Bearer wrong", TOKEN, "Basic " + TOKEN])
+def test_export_with_bad_token_is_rejected(client, authorization):
+    response = client.get("/api/export/orders", headers={"Authorization": authorization})
+
+    assert response.status_code == 401
+    assert "jane@example.com" not in response.text
+
+
+def test_export_with_token_streams_rows(client):
+    response = client.get("/api/export/orders", headers={"Authorization": f"Bearer {TOKEN}"})
+
+    assert response.status_code == 200
+    assert '"customer_email":"jane@example.com"' in response.text
+
+
+def test_export_is_disabled_without_configured_token(client, monkeypatch):
+    monkeypatch.setattr(auth, "ADMIN_API_TOKEN", None)
+
+    response = client.get("/api/export/orders", headers={"Authorization": "Bearer "})
+
+    assert response.status_code == 401
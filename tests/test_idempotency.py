@@ -0,0 +1,232 @@
+"""IdempotencyStore: replays, key reuse with another payload, and dead owners."""
+
+import sys
+import json
+import asyncio
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel
+from pymongo.errors import DuplicateKeyError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from utils import idempotency  # noqa: E402
+from utils.idempotency import COLLECTION, IdempotencyStore, fingerprint  # noqa: E402
+
+
+class Lead(BaseModel):
+    name: str
+    email: str
+
+
+class Created(BaseModel):
+    id: str
+    name: str
+
+
+class Keys:
+    """The operations IdempotencyStore uses on its collection."""
+
+    def __init__(self):
+        self.docs: dict[str, dict] = {}
+
+    def _matches(self, doc, query) -> bool:
+        for field, condition in query.items():
+            value = doc.get(field)
+            if isinstance(condition, dict):
+                if "$lt" in condition and not value < condition["$lt"]:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    async def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("duplicate key")
+        self.docs[doc["_id"]] = dict(doc)
+
+    async def find_one(self, query):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc is not None and self._matches(doc, query) else None
+
+    async def find_one_and_update(self, query, update):
+        doc = self.docs.get(query["_id"])
+        if doc is None or not self._matches(doc, query):
+            return None
+        before = dict(doc)
+        doc.update(update["$set"])
+        return before
+
+    async def update_one(self, query, update):
+        doc = self.docs.get(query["_id"])
+        if doc is not None:
+            doc.update(update["$set"])
+
+    async def delete_one(self, query):
+        doc = self.docs.get(query["_id"])
+        if doc is not None and self._matches(doc, query):
+            del self.docs[query["_id"]]
+
+
+@pytest.fixture
+def db():
+    return {COLLECTION: Keys()}
+
+
+class Handler:
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return Created(id=f"lead-{self.calls}", name="Jane")
+
+
+def run(store, db, key, payload, handler):
+    return asyncio.run(store.run(db, "leads", key, payload, handler))
+
+
+LEAD = Lead(name="Jane", email="jane@example.com")
+
+
+def test_repeat_is_replayed_without_running_handler(db):
+    store, handler = IdempotencyStore(), Handler()
+
+    first = run(store, db, "k1", LEAD, handler)
+    again = run(store, db, "k1", LEAD, handler)
+
+    assert first == Created(id="lead-1", name="Jane")
+    assert handler.calls == 1
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert json.loads(again.body) == {"id": "lead-1", "name": "Jane"}
+    assert store.replays == 1
+
+
+def test_replay_survives_losing_the_local_cache(db):
+    handler = Handler()
+    run(IdempotencyStore(), db, "k1", LEAD, handler)
+
+    # Another worker, or this one after a restart.
+    again = run(IdempotencyStore(), db, "k1", LEAD, handler)
+
+    assert handler.calls == 1
+    assert json.loads(again.body) == {"id": "lead-1", "name": "Jane"}
+
+
+def test_key_reused_with_other_payload_is_422(db):
+    store, handler = IdempotencyStore(), Handler()
+    run(store, db, "k1", LEAD, handler)
+
+    with pytest.raises(HTTPException) as error:
+        run(store, db, "k1", Lead(name="Someone else", email="jane@example.com"), handler)
+
+    assert error.value.status_code == 422
+    assert handler.calls == 1
+
+
+def test_keys_are_scoped(db):
+    store, handler = IdempotencyStore(), Handler()
+
+    asyncio.run(store.run(db, "leads", "k1", LEAD, handler))
+    asyncio.run(store.run(db, "quotes", "k1", LEAD, handler))
+
+    assert handler.calls == 2
+
+
+def test_no_key_always_runs(db):
+    store, handler = IdempotencyStore(), Handler()
+
+    run(store, db, None, LEAD, handler)
+    run(store, db, None, LEAD, handler)
+
+    assert handler.calls == 2
+    assert db[COLLECTION].docs == {}
+
+
+def test_overlong_key_is_400(db):
+    with pytest.raises(HTTPException) as error:
+        run(IdempotencyStore(), db, "k" * (idempotency.MAX_KEY_LENGTH + 1), LEAD, Handler())
+
+    assert error.value.status_code == 400
+
+
+def test_concurrent_duplicates_run_once(db):
+    store, handler = IdempotencyStore(), Handler(delay=0.05)
+
+    async def both():
+        return await asyncio.gather(*(store.run(db, "leads", "k1", LEAD, handler) for _ in range(3)))
+
+    results = asyncio.run(both())
+
+    assert handler.calls == 1
+    assert results[0] == Created(id="lead-1", name="Jane")
+    assert [json.loads(r.body)["id"] for r in results[1:]] == ["lead-1", "lead-1"]
+    assert store._locks == {} and store._waiters == {}
+
+
+def test_failed_handler_releases_the_key(db):
+    store = IdempotencyStore()
+
+    async def fail():
+        raise RuntimeError("mongo down")
+
+    with pytest.raises(RuntimeError):
+        run(store, db, "k1", LEAD, fail)
+    handler = Handler()
+    run(store, db, "k1", LEAD, handler)
+
+    assert handler.calls == 1
+
+
+def test_stale_pending_key_is_taken_over(db):
+    # A worker claimed the key and died before finishing.
+    dead_at = datetime.now(timezone.utc) - timedelta(seconds=idempotency.IDEMPOTENCY_PENDING_TIMEOUT + 1)
+    db[COLLECTION].docs["leads:k1"] = {
+        "_id": "leads:k1",
+        "fingerprint": fingerprint(LEAD),
+        "status": "pending",
+        "locked_at": dead_at,
+        "created_at": dead_at,
+    }
+    handler = Handler()
+
+    result = run(IdempotencyStore(), db, "k1", LEAD, handler)
+
+    assert result == Created(id="lead-1", name="Jane")
+    record = db[COLLECTION].docs["leads:k1"]
+    assert record["status"] == "done"
+    assert record["response"] == {"id": "lead-1", "name": "Jane"}
+
+
+def test_live_pending_key_is_waited_for(db, monkeypatch):
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_WAIT", 2)
+    now = datetime.now(timezone.utc)
+    keys = db[COLLECTION]
+    keys.docs["leads:k1"] = {
+        "_id": "leads:k1",
+        "fingerprint": fingerprint(LEAD),
+        "status": "pending",
+        "locked_at": now,
+        "created_at": now,
+    }
+    handler = Handler()
+
+    async def other_worker_finishes():
+        await asyncio.sleep(0.1)
+        keys.docs["leads:k1"].update(status="done", status_code=200, response={"id": "lead-other", "name": "Jane"})
+
+    async def scenario():
+        finisher = asyncio.create_task(other_worker_finishes())
+        result = await IdempotencyStore().run(db, "leads", "k1", LEAD, handler)
+        await finisher
+        return result
+
+    result = asyncio.run(scenario())
+
+    assert handler.calls == 0
+    assert json.loads(result.body) == {"id": "lead-other", "name": "Jane"}
@@ -0,0 +1,140 @@
+"""Resend batch sending against a local stub HTTP server."""
+
+import sys
+import json
+import time
+import asyncio
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from utils import mailer  # noqa: E402
+from utils.mailer import OutgoingEmail, send_email_batch  # noqa: E402
+
+
+class StubResend:
+    """Records requests; `responses[path]` maps the parsed body to (status, json)."""
+
+    def __init__(self):
+        self.requests = []
+        self.responses = {}
+        self.delay = 0.0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append({"path": self.path, "headers": dict(self.headers), "body": body})
+                time.sleep(stub.delay)
+                status, payload = stub.responses[self.path](body)
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client timed out and hung up
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def paths(self) -> list[str]:
+        return [request["path"] for request in self.requests]
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = StubResend()
+    monkeypatch.setattr(mailer, "RESEND_API_URL", server.url)
+    monkeypatch.setattr(mailer, "RESEND_API_KEY", "re_test")
+    monkeypatch.setattr(mailer, "FROM_EMAIL", "shop@example.com")
+    monkeypatch.setattr(mailer, "RESEND_TIMEOUT", 0.5)
+    yield server
+    asyncio.run(mailer.close_http_client())
+    server.server.shutdown()
+
+
+def messages(count: int) -> list[OutgoingEmail]:
+    return [
+        OutgoingEmail(subject=f"Subject {i}", recipients=[f"user{i}@example.com"], body=f"<p>{i}</p>", idempotency_key=f"m{i}")
+        for i in range(count)
+    ]
+
+
+def send(batch: list[OutgoingEmail]):
+    async def run():
+        try:
+            return await send_email_batch(batch)
+        finally:
+            await mailer.close_http_client()
+
+    return asyncio.run(run())
+
+
+def test_full_batch_success(stub):
+    stub.responses["/emails/batch"] = lambda body: (200, {"data": [{"id": f"id-{i}"} for i in range(len(body))]})
+
+    results = send(messages(3))
+
+    assert [(r.ok, r.id) for r in results] == [(True, "id-0"), (True, "id-1"), (True, "id-2")]
+    assert stub.paths() == ["/emails/batch"]
+    request = stub.requests[0]
+    assert [m["to"] for m in request["body"]] == [["user0@example.com"], ["user1@example.com"], ["user2@example.com"]]
+    assert request["headers"]["x-batch-validation"] == "permissive"
+    assert request["headers"]["Idempotency-Key"] == mailer.batch_idempotency_key(messages(3))
+
+
+def test_rejected_message_is_sent_individually(stub):
+    stub.responses["/emails/batch"] = lambda body: (
+        200,
+        {"data": [{"id": "id-0"}, {"id": "id-2"}], "errors": [{"index": 1, "message": "Invalid `to` field"}]},
+    )
+    stub.responses["/emails"] = lambda body: (200, {"id": "single-1"})
+
+    results = send(messages(3))
+
+    assert [(r.ok, r.id) for r in results] == [(True, "id-0"), (True, "single-1"), (True, "id-2")]
+    assert stub.paths() == ["/emails/batch", "/emails"]
+    single = stub.requests[1]
+    assert single["body"]["subject"] == "Subject 1"
+    assert single["headers"]["Idempotency-Key"] == "m1"
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_whole_batch_failure_is_not_fanned_out(stub, status):
+    stub.responses["/emails/batch"] = lambda body: (status, {"message": "unavailable"})
+
+    results = send(messages(3))
+
+    assert [r.ok for r in results] == [False, False, False]
+    assert all(str(status) in r.error for r in results)
+    assert stub.paths() == ["/emails/batch"]
+
+
+def test_batch_timeout_fails_without_resending(stub):
+    stub.delay = 1.0
+    stub.responses["/emails/batch"] = lambda body: (200, {"data": [{"id": "late"} for _ in body]})
+
+    results = send(messages(2))
+
+    assert [r.ok for r in results] == [False, False]
+    assert stub.paths() == ["/emails/batch"]
+
+
+def test_batch_idempotency_key_is_stable_across_retries():
+    assert mailer.batch_idempotency_key(messages(3)) == mailer.batch_idempotency_key(messages(3))
+    assert mailer.batch_idempotency_key(messages(3)) != mailer.batch_idempotency_key(messages(2))
+    # Without an explicit key, identical content hashes to the same key.
+    a = OutgoingEmail(subject="s", recipients=["a@example.com"], body="b")
+    b = OutgoingEmail(subject="s", recipients=["a@example.com"], body="b")
+    assert a.key() == b.key()
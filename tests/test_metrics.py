@@ -0,0 +1,100 @@
+"""/metrics aggregation across gunicorn workers sharing METRICS_DIR."""
+
+import os
+import sys
+import subprocess
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND))
+
+from utils.metrics import MetricsRegistry  # noqa: E402
+
+WORKER = """
+import os
+from utils.metrics import metrics
+requests = metrics.counter("requests_total", "Requests.", ("route",))
+in_flight = metrics.gauge("in_flight", "In flight.")
+latency = metrics.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+metrics.callback("hit_ratio", "Hit ratio.", lambda: {ratio}, aggregate="live_mean")
+requests.inc("/api/products", amount={requests})
+in_flight.inc(amount=2)
+latency.observe({latency})
+metrics.flush()
+print(os.getpid())
+"""
+
+
+def run(code: str, directory: str) -> str:
+    env = {**os.environ, "METRICS_DIR": directory}
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, env=env, capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+
+def scraper() -> MetricsRegistry:
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests.", ("route",))
+    registry.gauge("in_flight", "In flight.")
+    registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    registry.callback("hit_ratio", "Hit ratio.", lambda: 0.5, aggregate="live_mean")
+    return registry
+
+
+def samples(text: str) -> dict[str, float]:
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line and not line.startswith("#")
+    }
+
+
+@pytest.fixture
+def workers(tmp_path):
+    directory = str(tmp_path)
+    pids = [
+        run(WORKER.format(requests=3, latency=0.05, ratio=0.2), directory),
+        run(WORKER.format(requests=4, latency=0.5, ratio=0.8), directory),
+    ]
+    return directory, pids
+
+
+def test_scrape_merges_every_worker(workers):
+    directory, _ = workers
+
+    result = samples(scraper().render(directory))
+
+    assert result['requests_total{route="/api/products"}'] == 7
+    assert result["in_flight"] == 4
+    assert result['latency_seconds_bucket{le="0.1"}'] == 1
+    assert result['latency_seconds_bucket{le="+Inf"}'] == 2
+    assert result["latency_seconds_count"] == 2
+    # The scraping process counts as a live worker too.
+    assert result["hit_ratio"] == pytest.approx(0.5)
+
+
+def test_exited_worker_keeps_counters_and_drops_gauges(workers):
+    directory, pids = workers
+    # The gunicorn master never imports the app, so its registry is empty.
+    run(f"from utils.metrics import mark_process_dead; mark_process_dead({pids[0]})", directory)
+
+    result = samples(scraper().render(directory))
+
+    assert not os.path.exists(os.path.join(directory, f"{pids[0]}.json"))
+    assert result['requests_total{route="/api/products"}'] == 7
+    assert result["latency_seconds_count"] == 2
+    assert result["in_flight"] == 2
+    assert result["hit_ratio"] == pytest.approx(0.65)
+
+
+def test_without_directory_reports_own_samples():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    registry.callback("hit_ratio", "Hit ratio.", lambda: 0.5, aggregate="live_mean")
+    requests.inc("/api/products")
+
+    result = samples(registry.render(None))
+
+    assert result['requests_total{route="/api/products"}'] == 1
+    assert result["hit_ratio"] == 0.5
@@ -0,0 +1,106 @@
+"""Keyset pagination over created_at values of mixed BSON types."""
+
+import sys
+import asyncio
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from utils.pagination import decode_cursor, encode_cursor, fetch_page  # noqa: E402
+
+# Mongo's cross-type sort order for the values created_at can hold.
+TYPE_ORDER = {type(None): 0, str: 1, datetime: 2}
+TYPE_NAMES = {"null": type(None), "string": str, "date": datetime}
+
+
+def matches(doc: dict, query: dict) -> bool:
+    """The subset of the query language fetch_page uses."""
+    for field, condition in query.items():
+        if field == "$and":
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif field == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(field)
+            if "$gt" in condition:
+                bound = condition["$gt"]
+                # $gt only compares values of the same type; null matches nothing.
+                if bound is None or type(value) is not type(bound) or not value > bound:
+                    return False
+            if "$type" in condition and type(value) is not TYPE_NAMES[condition["$type"]]:
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        for field, _ in reversed(keys):
+            self.docs.sort(key=lambda d: (TYPE_ORDER[type(d.get(field))], d.get(field) or ""))
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class Collection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return Cursor([dict(d) for d in self.docs if matches(d, query)])
+
+
+def page_through(collection, limit: int) -> list[str]:
+    async def run():
+        seen, after = [], None
+        while True:
+            docs, after = await fetch_page(collection, {}, limit, after)
+            seen.extend(doc["id"] for doc in docs)
+            if after is None:
+                return seen
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 5, 20])
+def test_pages_reach_dates_after_legacy_strings(limit):
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    docs = (
+        [{"id": "n0"}, {"id": "n1", "created_at": None}]
+        + [{"id": f"s{i}", "created_at": f"2025-0{i + 1}-01T00:00:00"} for i in range(4)]
+        + [{"id": f"d{i}", "created_at": start + timedelta(days=i)} for i in range(4)]
+    )
+
+    seen = page_through(Collection(docs), limit)
+
+    assert seen == ["n0", "n1", "s0", "s1", "s2", "s3", "d0", "d1", "d2", "d3"]
+
+
+def test_ties_on_created_at_are_broken_by_id():
+    when = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    docs = [{"id": f"x{i}", "created_at": when} for i in range(5)]
+
+    assert page_through(Collection(docs), 2) == ["x0", "x1", "x2", "x3", "x4"]
+
+
+@pytest.mark.parametrize(
+    "created_at", [datetime(2026, 1, 1, 12, 30, tzinfo=timezone.utc), "2025-03-01T00:00:00", None]
+)
+def test_cursor_round_trips_each_type(created_at):
+    cursor = encode_cursor({"id": "abc", "created_at": created_at})
+
+    assert decode_cursor(cursor) == (created_at, "abc")
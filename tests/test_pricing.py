@@ -0,0 +1,118 @@
+"""Order pricing against the catalog store, falling back to Mongo."""
+
+import sys
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from utils import pricing  # noqa: E402
+from utils.pricing import PriceTable  # noqa: E402
+
+
+class Store:
+    def __init__(self, *products):
+        self.products = {product["id"]: product for product in products}
+
+    def get(self, product_id):
+        return self.products.get(product_id)
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class Products:
+    def __init__(self, *products):
+        self.products = {product["id"]: product for product in products}
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        ids = query["id"]["$in"]
+        return Cursor([self.products[i] for i in ids if i in self.products])
+
+
+def product(product_id: str, price: float, in_stock: bool = True, backorder: bool = False) -> dict:
+    return {"id": product_id, "name": f"Product {product_id}", "sale_price": price, "in_stock": in_stock, "backorder": backorder}
+
+
+def item(product_id: str, price: float, quantity: int = 1):
+    return SimpleNamespace(product_id=product_id, price=price, quantity=quantity)
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    store = Store(product("inv", 1500.0), product("bat", 2000.0), product("gone", 10.0, in_stock=False))
+    db = SimpleNamespace(products=Products(product("new", 99.99), product("back", 50.0, in_stock=False, backorder=True)))
+    monkeypatch.setattr(pricing, "price_table", PriceTable(store))
+    return db
+
+
+def price(db, items, total):
+    return asyncio.run(pricing.price_order(db, items, total))
+
+
+def test_store_hits_need_no_query(catalog):
+    lines, total = price(catalog, [item("inv", 1500.0), item("bat", 2000.0, 2)], 5500.0)
+
+    assert total == 5500.0
+    assert [(line["name"], line["quantity"], line["price"]) for line in lines] == [
+        ("Product inv", 1, 1500.0),
+        ("Product bat", 2, 2000.0),
+    ]
+    assert catalog.products.queries == []
+
+
+def test_ids_missing_from_store_are_fetched_in_one_query(catalog):
+    lines, total = price(catalog, [item("inv", 1500.0), item("new", 99.99, 3), item("back", 50.0)], 1849.97)
+
+    assert total == 1849.97
+    assert len(catalog.products.queries) == 1
+    assert sorted(catalog.products.queries[0]["id"]["$in"]) == ["back", "new"]
+
+
+def test_rounding_noise_is_tolerated(catalog):
+    _, total = price(catalog, [item("new", 99.990000001, 3)], 299.97000001)
+
+    assert total == 299.97
+
+
+def test_unknown_product_is_422(catalog):
+    with pytest.raises(HTTPException) as error:
+        price(catalog, [item("inv", 1500.0), item("nope", 1.0)], 1501.0)
+
+    assert error.value.status_code == 422
+    assert error.value.detail["items"] == [{"product_id": "nope", "error": "unknown product"}]
+
+
+def test_out_of_stock_is_409(catalog):
+    with pytest.raises(HTTPException) as error:
+        price(catalog, [item("gone", 10.0)], 10.0)
+
+    assert error.value.status_code == 409
+    assert error.value.detail["items"] == [{"product_id": "gone", "error": "out of stock"}]
+
+
+def test_changed_price_is_409_with_current_price(catalog):
+    with pytest.raises(HTTPException) as error:
+        price(catalog, [item("inv", 1.0)], 1.0)
+
+    assert error.value.status_code == 409
+    assert error.value.detail["items"] == [{"product_id": "inv", "error": "price changed", "price": 1500.0}]
+
+
+def test_total_mismatch_is_409(catalog):
+    with pytest.raises(HTTPException) as error:
+        price(catalog, [item("inv", 1500.0, 2)], 1500.0)
+
+    assert error.value.status_code == 409
+    assert error.value.detail == {"message": "Order total does not match item prices", "total": 3000.0}
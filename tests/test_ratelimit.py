@@ -0,0 +1,203 @@
+"""Rate limiting: rule parsing, token buckets, client keys and the middleware."""
+
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+import pytest
+from pymongo.errors import PyMongoError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from utils.ratelimit import (  # noqa: E402
+    MemoryBucketStore,
+    RateLimiter,
+    RateLimitMiddleware,
+    RouteLimit,
+    body_email,
+    client_ip,
+    parse_rules,
+)
+
+
+def test_parse_rules():
+    ip, email = parse_rules("ip:10/10m, email:5/h")
+
+    assert (ip.key, ip.capacity, ip.rate) == ("ip", 10, 10 / 600)
+    assert (email.key, email.capacity, email.rate) == ("email", 5, 5 / 3600)
+    assert parse_rules("ip:3/s")[0].rate == 3
+    assert parse_rules("") == ()
+
+
+@pytest.mark.parametrize("spec", ["ip:10", "phone:5/h", "ip:5/w"])
+def test_parse_rules_rejects_bad_rules(spec):
+    with pytest.raises(ValueError):
+        parse_rules(spec)
+
+
+def test_bucket_allows_capacity_then_reports_wait():
+    store = MemoryBucketStore()
+    # 3 at once, refilled at one per 10 seconds.
+    waits = [store.take("k", 3, 0.1, now=100.0) for _ in range(4)]
+
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] == pytest.approx(10.0)
+
+
+def test_bucket_refills_over_time():
+    store = MemoryBucketStore()
+    for _ in range(3):
+        store.take("k", 3, 0.1, now=100.0)
+
+    assert store.take("k", 3, 0.1, now=105.0) == pytest.approx(5.0)
+    assert store.take("k", 3, 0.1, now=110.0) == 0.0
+    # Refill stops at capacity however long the bucket sat idle.
+    waits = [store.take("k", 3, 0.1, now=10_000.0) for _ in range(4)]
+    assert waits[:3] == [0.0, 0.0, 0.0] and waits[3] > 0
+
+
+def test_buckets_are_independent():
+    store = MemoryBucketStore()
+    store.take("a", 1, 0.1, now=0.0)
+
+    assert store.take("a", 1, 0.1, now=0.0) > 0
+    assert store.take("b", 1, 0.1, now=0.0) == 0.0
+
+
+def test_full_store_drops_idle_then_oldest_buckets():
+    store = MemoryBucketStore(shards=1, max_buckets=3)
+    for key in "abc":
+        store.take(key, 1, 1.0, now=0.0)
+    # Full again after 10 s: every bucket has refilled, so sweeping frees them.
+    store.take("d", 1, 1.0, now=10.0)
+    assert len(store) == 1
+
+    for key in "efg":
+        store.take(key, 1, 1.0, now=10.0)
+    assert len(store) == 3
+    assert store.take("d", 1, 1.0, now=10.0) == 0.0  # evicted as the oldest
+
+
+def scope_with(peer: str, forwarded=None) -> dict:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded is not None else []
+    return {"type": "http", "headers": headers, "client": (peer, 5000)}
+
+
+@pytest.mark.parametrize(
+    "forwarded, hops, expected",
+    [
+        (None, 0, "10.0.0.1"),
+        ("203.0.113.9", 0, "10.0.0.1"),
+        (None, 1, "10.0.0.1"),
+        ("203.0.113.9", 1, "203.0.113.9"),
+        # The client can prepend anything; only our proxies' entries count.
+        ("6.6.6.6, 203.0.113.9", 1, "203.0.113.9"),
+        ("6.6.6.6, 203.0.113.9, 172.16.0.2", 2, "203.0.113.9"),
+        ("203.0.113.9", 2, "203.0.113.9"),
+    ],
+)
+def test_client_ip_hops(forwarded, hops, expected):
+    assert client_ip(scope_with("10.0.0.1", forwarded), hops) == expected
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        (b'{"email": "  Jane@Example.COM "}', "jane@example.com"),
+        (b'{"email": ""}', None),
+        (b'{"email": 5}', None),
+        (b'{"name": "x"}', None),
+        (b"[1, 2]", None),
+        (b"not json", None),
+        (b"", None),
+    ],
+)
+def test_body_email(body, expected):
+    assert body_email(body, "email") == expected
+
+
+class App:
+    """Records what reaches the endpoint."""
+
+    def __init__(self):
+        self.bodies = []
+
+    async def __call__(self, scope, receive, send):
+        message = await receive()
+        self.bodies.append(message.get("body", b""))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+
+def request(middleware, method="POST", path="/api/leads", body=b"{}", peer="10.0.0.1") -> tuple[int, dict, bytes]:
+    scope = {"type": "http", "method": method, "path": path, "headers": [], "client": (peer, 5000)}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    start = messages[0]
+    headers = {name.decode().lower(): value.decode() for name, value in start["headers"]}
+    return start["status"], headers, b"".join(m.get("body", b"") for m in messages[1:])
+
+
+def limited(rules: str = "ip:2/h,email:1/h", enabled: bool = True) -> tuple[RateLimitMiddleware, App]:
+    app = App()
+    limiter = RateLimiter({"/api/leads": RouteLimit(parse_rules(rules), "email")}, enabled=enabled)
+    return RateLimitMiddleware(app, limiter), app
+
+
+def test_ip_rule_rejects_with_retry_after():
+    middleware, app = limited("ip:2/h")
+
+    statuses = [request(middleware)[0] for _ in range(2)]
+    status, headers, body = request(middleware)
+
+    assert statuses == [200, 200]
+    assert status == 429
+    assert headers["retry-after"] == "1800"
+    assert "1800 seconds" in json.loads(body)["detail"]
+    assert len(app.bodies) == 2
+    assert request(middleware, peer="10.0.0.2")[0] == 200
+    assert middleware.limiter.rejected == 1
+
+
+def test_email_rule_keys_on_body_and_replays_it():
+    middleware, app = limited("ip:100/h,email:1/h")
+    body = b'{"name": "Jane", "email": "Jane@example.com"}'
+
+    assert request(middleware, body=body)[0] == 200
+    assert app.bodies == [body]
+    # Same address from another IP, differently cased.
+    assert request(middleware, body=b'{"email": "jane@EXAMPLE.com"}', peer="10.0.0.9")[0] == 429
+    assert request(middleware, body=b'{"email": "other@example.com"}')[0] == 200
+
+
+def test_unlimited_requests_pass_through():
+    middleware, app = limited("ip:1/h")
+
+    for _ in range(3):
+        assert request(middleware, method="GET")[0] == 200
+        assert request(middleware, path="/api/sizing")[0] == 200
+    disabled, _ = limited("ip:1/h", enabled=False)
+
+    assert [request(disabled)[0] for _ in range(3)] == [200, 200, 200]
+
+
+def test_shared_store_fails_open():
+    class BrokenStore:
+        asynchronous = True
+
+        async def take(self, *args):
+            raise PyMongoError("connection refused")
+
+    middleware, _ = limited("ip:1/h")
+    middleware.limiter.store = BrokenStore()
+
+    assert [request(middleware)[0] for _ in range(3)] == [200, 200, 200]
+    assert middleware.limiter.store_errors == 3
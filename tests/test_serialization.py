@@ -0,0 +1,53 @@
+"""Product datetimes serialize the same ("...Z") on every endpoint that returns records."""
+
+import sys
+from pathlib import Path
+from datetime import datetime, timezone
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+from utils.records import ProductRecord, dump_records  # noqa: E402
+from utils.specs import normalize_specs  # noqa: E402
+
+CREATED_AT = datetime(2026, 3, 4, 5, 6, 7, 123000, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def record():
+    specs = {"capacity": "5.12kWh", "chemistry": "LiFePO4"}
+    product = server.Product(
+        id="serialization-test",
+        name="Zebra Test Battery",
+        category="batteries",
+        description="Rack mount",
+        regular_price=2000.0,
+        sale_price=1800.0,
+        image_url="https://example.com/b.png",
+        specs=specs,
+        spec_values=normalize_specs(specs),
+        created_at=CREATED_AT,
+    )
+    record = ProductRecord.from_product(product.model_dump())
+    server.search_index.add(record)
+    server.spec_index.add(record)
+    yield record
+    server.search_index.remove(record.id)
+    server.spec_index.remove(record.id)
+
+
+def test_search_and_compare_match_product_output(record):
+    client = TestClient(server.app)
+    expected = orjson.loads(dump_records(record))
+    assert expected["created_at"] == "2026-03-04T05:06:07.123000Z"
+
+    search = client.get("/api/products/search", params={"q": "zebra"}).json()
+    compare = client.get("/api/products/compare", params={"spec": "capacity", "min": "5kWh"}).json()
+
+    assert search["items"] == [expected]
+    assert compare["items"] == [expected]
+    assert compare["unit"] == "Wh"
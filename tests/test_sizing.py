@@ -0,0 +1,69 @@
+"""SizingCatalog only sizes with specs in the units it computes in."""
+
+import sys
+import math
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from utils.sizing import SizingCatalog  # noqa: E402
+from utils.specs import normalize_specs  # noqa: E402
+
+
+def product(product_id: str, category: str, price: float, **specs) -> dict:
+    return {
+        "id": product_id,
+        "name": product_id,
+        "category": category,
+        "sale_price": price,
+        "in_stock": True,
+        "backorder": False,
+        "specs": specs,
+        "spec_values": normalize_specs(specs),
+    }
+
+
+def catalog(*products) -> SizingCatalog:
+    sizing = SizingCatalog()
+    sizing.rebuild(products)
+    return sizing
+
+
+MIXED = [
+    product("inverter-6kw", "inverters", 1500, power="6kW", max_pv_input="8000W"),
+    product("inverter-amps", "inverters", 100, power="50A"),
+    product("battery-wh", "batteries", 2000, capacity="5.12kWh"),
+    # Far cheaper per "unit", if Ah were mistaken for Wh.
+    product("battery-ah", "batteries", 10, capacity="100Ah"),
+    product("panel-550", "panels", 150, power="550W"),
+    product("panel-volts", "panels", 1, power="48V"),
+]
+
+
+def test_specs_in_other_units_are_left_out():
+    inverters, batteries, panels = catalog(*MIXED).arrays()
+
+    assert inverters.ids == ["inverter-6kw"]
+    assert batteries.ids == ["battery-wh"]
+    assert panels.ids == ["panel-550"]
+    assert list(inverters.secondary) == [8000.0]
+
+
+def test_recommendations_ignore_ah_batteries():
+    result = catalog(*MIXED).recommend(daily_kwh=10, autonomy_hours=24)
+
+    bundles = result["bundles"]
+    assert bundles
+    assert {bundle["battery"]["id"] for bundle in bundles} == {"battery-wh"}
+    # 10 kWh at 90% depth of discharge: 3 x 5.12 kWh.
+    assert bundles[0]["battery"]["quantity"] == 3
+    assert bundles[0]["storage_kwh"] == 15.36
+
+
+def test_max_pv_input_in_another_unit_falls_back_to_oversize():
+    inverter = product("inverter", "inverters", 1500, power="5000W", max_pv_input="500V")
+
+    inverters, _, _ = catalog(inverter).arrays()
+
+    assert inverters.ids == ["inverter"]
+    assert math.isnan(inverters.secondary[0])
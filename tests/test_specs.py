@@ -0,0 +1,75 @@
+"""parse_spec: display spec strings to base-unit numbers."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from utils.specs import normalize_specs, parse_spec  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("6000W", {"value": 6000.0, "unit": "W"}),
+        ("6kW", {"value": 6000.0, "unit": "W"}),
+        ("5.12kWh", {"value": 5120.0, "unit": "Wh"}),
+        ("100Ah", {"value": 100.0, "unit": "Ah"}),
+        ("21.5%", {"value": 21.5, "unit": "%"}),
+        ("5 Years", {"value": 5.0, "unit": "years"}),
+        ("10 yrs", {"value": 10.0, "unit": "years"}),
+        ("6000W+", {"value": 6000.0, "unit": "W"}),
+        (48, {"value": 48.0, "unit": ""}),
+        (2.5, {"value": 2.5, "unit": ""}),
+    ],
+)
+def test_single_values(value, expected):
+    assert parse_spec(value) == expected
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("125-425V DC", {"value": 425.0, "min": 125.0, "max": 425.0, "unit": "V"}),
+        ("50/60Hz", {"value": 60.0, "min": 50.0, "max": 60.0, "unit": "Hz"}),
+        ("90 – 280 V", {"value": 280.0, "min": 90.0, "max": 280.0, "unit": "V"}),
+        ("1,000-2,000W", {"value": 2000.0, "min": 1000.0, "max": 2000.0, "unit": "W"}),
+    ],
+)
+def test_ranges(value, expected):
+    assert parse_spec(value) == expected
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("1,000W", 1000.0),
+        ("10,000 W", 10000.0),
+        ("1,000,000 Wh", 1_000_000.0),
+        ("2,500.5W", 2500.5),
+        # Any other comma is a decimal point.
+        ("5,12kWh", 5120.0),
+        ("1,5kW", 1500.0),
+        ("1,2345W", 1.2345),
+    ],
+)
+def test_commas(value, expected):
+    assert parse_spec(value)["value"] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("value", ["N-type TOPCon", "LiFePO4", "Pure sine wave", "", "100 cells", True, None, ["6kW"]])
+def test_non_numeric_specs(value):
+    assert parse_spec(value) is None
+
+
+def test_normalize_specs_drops_unparsed():
+    specs = {"power": "1,000W", "cells": "N-type TOPCon", "warranty": "10 Years"}
+
+    assert normalize_specs(specs) == {
+        "power": {"value": 1000.0, "unit": "W"},
+        "warranty": {"value": 10.0, "unit": "years"},
+    }
+    assert normalize_specs({"cells": "Mono"}) is None
+    assert normalize_specs(None) is None